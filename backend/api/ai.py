@@ -1,8 +1,8 @@
 from fastapi import APIRouter, HTTPException, Header
 from pydantic import BaseModel
 from typing import Optional
-import openai
 import os
+from api.metrics import track_ai_upstream
 
 router = APIRouter()
 
@@ -30,6 +30,12 @@ async def generate_subtasks(
     
     api_key = authorization.replace("Bearer ", "")
     
+    # Imported on first use so the OpenAI SDK stays out of app startup
+    try:
+        import openai
+    except ImportError:
+        raise HTTPException(status_code=503, detail="AI features are not available")
+    
     try:
         # Use the provided API key for OpenAI
         client = openai.OpenAI(api_key=api_key)
@@ -46,15 +52,16 @@ etc.
 Keep subtasks concise and specific.
 """
         
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that breaks down tasks into actionable subtasks."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=300,
-            temperature=0.7
-        )
+        with track_ai_upstream():
+            response = client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant that breaks down tasks into actionable subtasks."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=300,
+                temperature=0.7
+            )
         
         subtasks = response.choices[0].message.content.strip()
         return SubtaskResponse(subtasks=subtasks)
@@ -0,0 +1,217 @@
+"""Retention: moves completed todos to `todos_archive` and deletes old archived ones.
+
+Archived todos and todos completed more than ARCHIVE_COMPLETED_AFTER_DAYS ago are
+moved from `todos` to `todos_archive`, and todos archived more than
+ARCHIVE_DELETE_AFTER_DAYS ago are deleted. Users can override both (see
+PUT /retention). Runs shard by shard, in batches of ARCHIVE_BATCH_SIZE with one
+short transaction per batch and a pause in between, by the elected leader only
+(see database/leader.py). List, stats and search queries then scan only active
+rows; `include_archived=true` unions the archive back in.
+
+After a run that removed rows, SQLite shards are compacted: ANALYZE refreshes
+the planner statistics, and once at least ARCHIVE_VACUUM_FREE_RATIO of the pages
+are free, incremental vacuum returns them to the file system,
+ARCHIVE_VACUUM_STEP_PAGES per short write transaction, so writers never wait for
+long. A full VACUUM locks the file for the whole rewrite, so it is only run on
+demand, which also switches databases created before incremental auto-vacuum.
+PostgreSQL is left to autovacuum, which keeps up with dead rows created in small,
+paced batches.
+
+    python -m api.archiver              # one run now, printing the report
+    python -m api.archiver --vacuum     # maintenance window: VACUUM every SQLite shard
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from api.metrics import RETENTION_ROWS
+from database.database import todo_db
+from database.db_models import SessionLocal, shard_engines
+from database.leader import LeaderElection
+
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "true").lower() == "true"
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+ARCHIVE_COMPLETED_AFTER_DAYS = int(os.getenv("ARCHIVE_COMPLETED_AFTER_DAYS", "30"))
+# 0 keeps archived todos forever
+ARCHIVE_DELETE_AFTER_DAYS = int(os.getenv("ARCHIVE_DELETE_AFTER_DAYS", "0"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+# Pause between batches so the mover does not monopolize the database
+ARCHIVE_BATCH_PAUSE_SECONDS = float(os.getenv("ARCHIVE_BATCH_PAUSE_SECONDS", "0.1"))
+ARCHIVE_VACUUM_FREE_RATIO = float(os.getenv("ARCHIVE_VACUUM_FREE_RATIO", "0.2"))
+ARCHIVE_VACUUM_STEP_PAGES = int(os.getenv("ARCHIVE_VACUUM_STEP_PAGES", "1000"))
+
+
+def _days_ago(days: int) -> Optional[datetime]:
+    return datetime.utcnow() - timedelta(days=days) if days else None
+
+
+def archive_batch(shard: int = 0, after_days: int = ARCHIVE_COMPLETED_AFTER_DAYS, **users) -> int:
+    """Move one batch on `shard`; returns the number of todos moved"""
+    with SessionLocal(info={"shard": shard}) as db:
+        return todo_db.archive_todos(db, _days_ago(after_days), ARCHIVE_BATCH_SIZE, **users)
+
+
+def delete_batch(shard: int = 0, after_days: int = ARCHIVE_DELETE_AFTER_DAYS, **users) -> int:
+    """Delete one batch of expired archived todos on `shard`; returns the number deleted"""
+    archived_before = _days_ago(after_days)
+    if archived_before is None:
+        return 0
+    with SessionLocal(info={"shard": shard}) as db:
+        return todo_db.delete_archived_todos(db, archived_before, ARCHIVE_BATCH_SIZE, **users)
+
+
+def retention_batches(shard: int = 0) -> List[Tuple[str, Callable[[], int]]]:
+    """(action, batch) pairs covering every policy on `shard`: the default one for everyone
+    without their own settings, then one pair per user with them"""
+    with SessionLocal(info={"shard": shard}) as db:
+        overrides = todo_db.get_retention_overrides(db, shard)
+    exclude = [user_id for user_id, _, _ in overrides]
+    batches = [
+        ("archived", partial(archive_batch, shard, exclude_user_ids=exclude)),
+        ("deleted", partial(delete_batch, shard, exclude_user_ids=exclude)),
+    ]
+    for user_id, archive_after, delete_after in overrides:
+        batches += [
+            ("archived", partial(
+                archive_batch, shard, ARCHIVE_COMPLETED_AFTER_DAYS if archive_after is None else archive_after,
+                user_ids=[user_id]
+            )),
+            ("deleted", partial(
+                delete_batch, shard, ARCHIVE_DELETE_AFTER_DAYS if delete_after is None else delete_after,
+                user_ids=[user_id]
+            )),
+        ]
+    return batches
+
+
+def _pragma(sqlite, name: str) -> int:
+    return sqlite.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+def compact(shard: int = 0) -> int:
+    """ANALYZE a SQLite shard and, when enough pages are free, reclaim them with incremental
+    vacuum steps; returns the bytes reclaimed"""
+    engine = shard_engines[shard]
+    if engine.dialect.name != "sqlite":
+        return 0
+    connection = engine.raw_connection()
+    try:
+        sqlite = connection.driver_connection
+        sqlite.execute("ANALYZE")
+        page_size, pages, free = (_pragma(sqlite, name) for name in ("page_size", "page_count", "freelist_count"))
+        if not pages or free / pages < ARCHIVE_VACUUM_FREE_RATIO:
+            return 0
+        if _pragma(sqlite, "auto_vacuum") != 2:
+            print(f"Shard {shard}: {free} of {pages} pages are free; run `python -m api.archiver --vacuum` "
+                  f"while the app is idle to reclaim them")
+            return 0
+        reclaimed = 0
+        while free:
+            # executescript steps the pragma to completion; one step is one short write transaction
+            sqlite.executescript(f"PRAGMA incremental_vacuum({ARCHIVE_VACUUM_STEP_PAGES})")
+            left = _pragma(sqlite, "freelist_count")
+            if left >= free:
+                break
+            reclaimed += (free - left) * page_size
+            free = left
+            time.sleep(ARCHIVE_BATCH_PAUSE_SECONDS)
+        return reclaimed
+    finally:
+        connection.close()
+
+
+def vacuum(shard: int = 0) -> int:
+    """Rewrite a SQLite shard with VACUUM, switching it to incremental auto-vacuum; returns the
+    bytes reclaimed. Locks the database for the whole rewrite, so run it while the app is idle"""
+    engine = shard_engines[shard]
+    if engine.dialect.name != "sqlite":
+        return 0
+    connection = engine.raw_connection()
+    try:
+        sqlite = connection.driver_connection
+        page_size, pages = _pragma(sqlite, "page_size"), _pragma(sqlite, "page_count")
+        sqlite.executescript("PRAGMA auto_vacuum=INCREMENTAL; VACUUM")
+        return (pages - _pragma(sqlite, "page_count")) * page_size
+    finally:
+        connection.close()
+
+
+class ArchiveService:
+    """Runs the leader-only retention job as an asyncio task"""
+
+    def __init__(self):
+        self.election = LeaderElection("todo-archiver", lease_seconds=3 * ARCHIVE_INTERVAL_SECONDS)
+        self._task = None
+        # Report of the latest run that changed anything
+        self.last_report: Optional[Dict[str, int]] = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await run_in_threadpool(self.election.release)
+
+    async def run_once(self) -> Dict[str, int]:
+        """Apply every retention policy, batch by batch; returns rows archived and deleted and bytes reclaimed"""
+        report = {"archived": 0, "deleted": 0, "reclaimed_bytes": 0}
+        for shard in range(len(shard_engines)):
+            removed = 0
+            for action, batch in await run_in_threadpool(retention_batches, shard):
+                while True:
+                    rows = await run_in_threadpool(batch)
+                    report[action] += rows
+                    removed += rows
+                    RETENTION_ROWS.labels(action).inc(rows)
+                    if rows < ARCHIVE_BATCH_SIZE:
+                        break
+                    await asyncio.sleep(ARCHIVE_BATCH_PAUSE_SECONDS)
+            if removed:
+                reclaimed = await run_in_threadpool(compact, shard)
+                report["reclaimed_bytes"] += reclaimed
+                RETENTION_ROWS.labels("reclaimed_bytes").inc(reclaimed)
+        return report
+
+    async def _loop(self):
+        while True:
+            try:
+                if await run_in_threadpool(self.election.acquire):
+                    report = await self.run_once()
+                    if any(report.values()):
+                        self.last_report = report
+                        print(f"Retention: archived {report['archived']} todos, deleted {report['deleted']}, "
+                              f"reclaimed {report['reclaimed_bytes']} bytes")
+            except Exception as e:
+                print(f"Retention failed: {e}")
+            await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
+
+
+# Global archive service instance, started from the app lifespan
+archive_service = ArchiveService()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vacuum", action="store_true",
+                        help="Run a full VACUUM on every SQLite shard instead of the retention job")
+    args = parser.parse_args()
+
+    if args.vacuum:
+        report = {f"shard_{shard}_reclaimed_bytes": vacuum(shard) for shard in range(len(shard_engines))}
+    else:
+        report = asyncio.run(archive_service.run_once())
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
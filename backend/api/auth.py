@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Header, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
@@ -7,11 +7,14 @@ from datetime import datetime, timedelta
 import jwt
 import bcrypt
 import os
-from database.db_models import get_db
+from database.db_models import get_db, use_shard
 from database.database import todo_db
+from database.purge import purge_account_task
+from api.metrics import track_bcrypt
 
 router = APIRouter()
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 # JWT Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production")
@@ -43,12 +46,14 @@ class Token(BaseModel):
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    with track_bcrypt("verify"):
+        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
 def get_password_hash(password: str) -> str:
     """Hash a password"""
     salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+    with track_bcrypt("hash"):
+        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token"""
@@ -79,6 +84,32 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     user = todo_db.get_user_by_id(db, user_id)
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
+    _use_user_shard(db, user)
+    return user
+
+def _use_user_shard(db: Session, user):
+    """Point the request's session at the shard holding the user's todos"""
+    if user.shard_moving:
+        raise HTTPException(
+            status_code=503, detail="Account is being moved, retry shortly", headers={"Retry-After": "5"}
+        )
+    use_shard(db, user.shard or 0)
+
+def get_stream_user(
+    token: Optional[str] = Query(None, description="JWT, for clients such as EventSource that cannot set headers"),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_db)
+):
+    """Get current user from the Authorization header or a `token` query parameter"""
+    if credentials is not None:
+        token = credentials.credentials
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    user_id = verify_token(token)
+    user = todo_db.get_user_by_id(db, user_id)
+    if user is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    _use_user_shard(db, user)
     return user
 
 @router.post(
@@ -172,3 +203,37 @@ def login(user_data: UserLogin, db: Session = Depends(get_db)):
 def get_me(current_user: User = Depends(get_current_user)):
     """Get current user information"""
     return current_user
+
+@router.delete(
+    "/me",
+    status_code=202,
+    tags=["Authentication"],
+    summary="Delete your account",
+    description="""
+    Delete the current user's account together with all of their todos, categories and notifications.
+
+    The account is removed before responding, so its tokens stop working immediately; its data is then
+    purged in the background, in short transactions of PURGE_BATCH_SIZE rows.
+
+    **Requires Authentication**: This endpoint requires a valid JWT token in the Authorization header.
+    """,
+    responses={
+        202: {
+            "description": "Account deleted, data purge started",
+            "content": {
+                "application/json": {
+                    "example": {"message": "Account deleted"}
+                }
+            }
+        }
+    }
+)
+def delete_me(
+    background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+):
+    """Delete the current user's account and purge their data"""
+    shard = todo_db.delete_account(db, current_user.id)
+    if shard is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    background_tasks.add_task(purge_account_task, current_user.id, shard)
+    return {"message": "Account deleted"}
@@ -0,0 +1,222 @@
+"""Two-tier read cache with version-bump invalidation.
+
+Cached results live in a per-process LRU and, when CACHE_BACKEND names one, in a
+shared tier every worker can read: "sqlite" (a file shared by the workers on one
+host; the default under gunicorn.conf.py) or "redis" (shared across hosts). Any
+client speaking the small Redis subset used here (get/set/incr) can be passed to
+RedisCacheBackend, e.g. fakeredis in tests.
+
+Keys embed a version per user (and a global one). TodoDatabase writes bump those
+versions after commit, so every worker stops reading the old entries at once
+without having to find and delete them; they age out of the LRU and the shared TTL.
+"""
+import functools
+import inspect
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import typing
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+
+from api.metrics import CACHE_REQUESTS
+from database.pending import defer, on_commit
+
+# "none", "memory" (this process only), "sqlite" or "redis"
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+GLOBAL_NAMESPACE = "global"
+
+
+class LRUCache:
+    """Thread-safe LRU with per-entry expiry"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class RedisCacheBackend:
+    """Shared tier in Redis, or anything with the same get/set/incr calls"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self.client.set(key, value, ex=max(1, int(ttl)))
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(key))
+
+
+class SQLiteCacheBackend:
+    """Shared tier in a SQLite file, for the workers of a single host"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # A lost cache is only a cold cache
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires REAL)"
+            )
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes, ttl: float):
+        connection = self._connection()
+        connection.execute(
+            "INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires",
+            (key, value, time.time() + ttl)
+        )
+        if random.random() < 0.01:
+            connection.execute("DELETE FROM cache WHERE expires < ?", (time.time(),))
+
+    def incr(self, key: str) -> int:
+        row = self._connection().execute(
+            "INSERT INTO cache (key, value, expires) VALUES (?, '1', NULL) "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1 RETURNING value",
+            (key,)
+        ).fetchone()
+        return int(row[0])
+
+
+class Cache:
+    def __init__(self, shared=None, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.shared = shared
+        self.ttl = ttl
+        self.local = LRUCache(max_entries)
+        # Versions when there is no shared tier
+        self._versions = {}
+
+    def version(self, namespace: str) -> int:
+        if self.shared is None:
+            return self._versions.get(namespace, 0)
+        value = self.shared.get(f"version:{namespace}")
+        return int(value) if value is not None else 0
+
+    def bump(self, namespace: str):
+        if self.shared is None:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+        else:
+            self.shared.incr(f"version:{namespace}")
+
+    def get_or_compute(self, name: str, namespace: str, key: str, compute: Callable[[], Any], adapter: TypeAdapter):
+        versioned_key = f"{name}:{namespace}:{self.version(namespace)}:{key}"
+        value = self.local.get(versioned_key)
+        if value is not None:
+            CACHE_REQUESTS.labels(name, "local").inc()
+            return value
+        if self.shared is not None:
+            raw = self.shared.get(versioned_key)
+            if raw is not None:
+                CACHE_REQUESTS.labels(name, "shared").inc()
+                value = adapter.validate_json(raw)
+                self.local.set(versioned_key, value, self.ttl)
+                return value
+        CACHE_REQUESTS.labels(name, "miss").inc()
+        value = compute()
+        self.local.set(versioned_key, value, self.ttl)
+        if self.shared is not None:
+            self.shared.set(versioned_key, adapter.dump_json(value), self.ttl)
+        return value
+
+
+def create_cache(name: str = CACHE_BACKEND) -> Optional[Cache]:
+    if name == "none":
+        return None
+    if name == "sqlite":
+        path = os.getenv("CACHE_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "todo-cache.db"))
+        return Cache(SQLiteCacheBackend(path))
+    if name == "redis":
+        import redis
+        return Cache(RedisCacheBackend(redis.Redis.from_url(os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0"))))
+    return Cache()
+
+
+# Global cache instance; None when CACHE_BACKEND=none
+cache = create_cache()
+
+
+def cached(name: str, user_arg: Optional[str] = "user_id"):
+    """Decorator caching a read under the version of its `user_arg` (or the global one).
+
+    The return annotation is used to serialize results for the shared tier.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+        adapter = TypeAdapter(typing.get_type_hints(fn)["return"])
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if cache is None:
+                return fn(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            user_id = bound.arguments.get(user_arg) if user_arg else None
+            namespace = f"user:{user_id}" if user_id is not None else GLOBAL_NAMESPACE
+            key = repr([
+                value for arg, value in bound.arguments.items()
+                if arg not in ("self", user_arg) and not isinstance(value, Session)
+            ])
+            return cache.get_or_compute(name, namespace, key, lambda: fn(*args, **kwargs), adapter)
+        return wrapper
+    return decorator
+
+
+def invalidate_on_commit(db: Session, user_id: Optional[int]):
+    """Bump the user's and the global cache version once the session commits"""
+    defer(db, "cache_invalidations", user_id)
+
+
+@on_commit("cache_invalidations")
+def _bump_versions(user_ids: list):
+    if cache is None:
+        return
+    for user_id in set(user_ids):
+        if user_id is not None:
+            cache.bump(f"user:{user_id}")
+    cache.bump(GLOBAL_NAMESPACE)
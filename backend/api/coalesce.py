@@ -0,0 +1,94 @@
+"""Single-flight coalescing for expensive reads.
+
+Concurrent identical calls (same function, same arguments apart from the DB
+session) share one computation: the first caller runs it and the others wait for
+its result or exception. Sync endpoints run in the threadpool, so callers are
+threads. With a TTL the result is also reused for that long after it is computed.
+"""
+import functools
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+from sqlalchemy.orm import Session
+
+from api.metrics import COALESCED_CALLS
+
+# Reuse results for this long after they are computed; 0 shares in-flight calls only
+COALESCE_TTL_SECONDS = float(os.getenv("COALESCE_TTL_SECONDS", "0"))
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, ttl: float = 0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._calls: Dict[Tuple, _Call] = {}
+        self._results: Dict[Tuple, Tuple[float, Any]] = {}
+
+    def do(self, key: Tuple, fn: Callable[[], Any], name: str = "") -> Any:
+        with self._lock:
+            if self.ttl:
+                cached = self._results.get(key)
+                if cached is not None and cached[0] > time.monotonic():
+                    COALESCED_CALLS.labels(name, "ttl").inc()
+                    return cached[1]
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            COALESCED_CALLS.labels(name, "in_flight").inc()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if self.ttl and call.error is None:
+                    self._expire()
+                    self._results[key] = (time.monotonic() + self.ttl, call.result)
+            call.done.set()
+
+    def _expire(self):
+        now = time.monotonic()
+        for key in [key for key, (expires, _) in self._results.items() if expires <= now]:
+            del self._results[key]
+
+
+def coalesce(ttl: float = COALESCE_TTL_SECONDS):
+    """Decorator: identical concurrent calls share one execution.
+
+    Session arguments are left out of the key, so calls from different requests match.
+    """
+    def decorator(fn):
+        flight = SingleFlight(ttl)
+        name = fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (
+                tuple(arg for arg in args if not isinstance(arg, Session)),
+                tuple(sorted((k, v) for k, v in kwargs.items() if not isinstance(v, Session)))
+            )
+            return flight.do(key, lambda: fn(*args, **kwargs), name)
+
+        wrapper.single_flight = flight
+        return wrapper
+    return decorator
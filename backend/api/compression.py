@@ -0,0 +1,130 @@
+"""Response compression.
+
+Responses of at least COMPRESSION_MIN_BYTES are Brotli-encoded when the client
+accepts `br` and the optional `brotli` package is installed, gzip-encoded
+otherwise. Event streams and already-encoded responses pass through untouched.
+"""
+import os
+import zlib
+from typing import Optional
+
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # Optional: pip install brotli
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+# Compress bodies larger than this in a worker thread instead of on the event loop
+THREAD_MIN_BYTES = 256 * 1024
+# Streamed event by event, or already compressed
+SKIP_CONTENT_TYPES = ("text/event-stream", "image/", "application/gzip", "application/zip")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick "br" or "gzip" from an Accept-Encoding header, or None"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def _compressor(encoding: str):
+    if encoding == "br":
+        return brotli.Compressor(quality=BROTLI_QUALITY)
+    # wbits=31: gzip container
+    return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+
+def _compress(encoding: str, body: bytes) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    compressor = _compressor(encoding)
+    return compressor.compress(body) + compressor.flush()
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses above a size threshold"""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        # None until the first body chunk decides: False = pass through, else a streaming compressor
+        compressor = None
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                content_type = headers.get("content-type", "")
+                if (
+                    "content-encoding" in headers
+                    or content_type.startswith(SKIP_CONTENT_TYPES)
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    compressor = False
+                    await send(start_message)
+                    await send(message)
+                    return
+                headers["content-encoding"] = encoding
+                headers.add_vary_header("accept-encoding")
+                if not more_body:
+                    # Whole body in one message (JSONResponse): compress it in one go
+                    if len(body) >= THREAD_MIN_BYTES:
+                        body = await anyio.to_thread.run_sync(_compress, encoding, body)
+                    else:
+                        body = _compress(encoding, body)
+                    headers["content-length"] = str(len(body))
+                    compressor = False
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                del headers["content-length"]
+                compressor = _compressor(encoding)
+                await send(start_message)
+            elif compressor is False:
+                await send(message)
+                return
+
+            if encoding == "br":
+                chunk = compressor.process(body) + (b"" if more_body else compressor.finish())
+            else:
+                chunk = compressor.compress(body) + (b"" if more_body else compressor.flush())
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
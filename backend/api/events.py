@@ -0,0 +1,203 @@
+"""In-process pub/sub for pushing per-user events to streaming clients.
+
+Subscribers are asyncio queues owned by the event loop that serves the stream;
+`publish` may be called from any thread (sync endpoints run in the threadpool)
+and hands the event to the loop with call_soon_threadsafe.
+
+Todo changes are queued on the session with `publish_change` and delivered only
+once the transaction commits. On PostgreSQL they are sent with NOTIFY instead, in
+the same transaction, and every worker's `ChangeFeedListener` relays them to its
+own subscribers, so a client sees edits made through any worker.
+"""
+import asyncio
+import json
+import os
+import select
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select as sql_select
+from sqlalchemy.orm import Session
+
+from database.db_models import engine, shard_engines
+from database.pending import defer, on_commit
+
+# Events buffered per subscriber before the oldest are dropped; a client that
+# falls this far behind resynchronizes from Last-Event-ID on reconnect
+SUBSCRIBER_QUEUE_SIZE = 256
+STREAM_KEEPALIVE_SECONDS = 15
+
+# Fan out todo changes across workers with LISTEN/NOTIFY (PostgreSQL only)
+CHANGE_FEED_PG_NOTIFY = (
+    engine.dialect.name == "postgresql"
+    and os.getenv("CHANGE_FEED_PG_NOTIFY", "true").lower() == "true"
+)
+CHANGE_FEED_CHANNEL = "todo_changes"
+TODOS_TOPIC = "todos"
+# NOTIFY payloads are limited to 8000 bytes; larger deltas are sent without the todo body
+MAX_NOTIFY_PAYLOAD = 7900
+
+
+class EventBroker:
+    """Per-user subscriber queues, one set per topic ("todos", "notifications")"""
+
+    def __init__(self):
+        self._subscribers: Dict[Tuple[str, int], Set[asyncio.Queue]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def subscribe(self, topic: str, user_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._subscribers[(topic, user_id)].add(queue)
+        return queue
+
+    def unsubscribe(self, topic: str, user_id: int, queue: asyncio.Queue):
+        with self._lock:
+            queues = self._subscribers.get((topic, user_id))
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[(topic, user_id)]
+
+    def has_subscribers(self, topic: str, user_id: int) -> bool:
+        return (topic, user_id) in self._subscribers
+
+    def publish(self, topic: str, user_id: int, event: dict):
+        """Send an event ({"id", "event", "data"}) to every `topic` stream of one user"""
+        with self._lock:
+            queues = list(self._subscribers.get((topic, user_id), ()))
+            loop = self._loop
+        if not queues or loop is None:
+            return
+        for queue in queues:
+            loop.call_soon_threadsafe(_put_dropping_oldest, queue, event)
+
+
+def _put_dropping_oldest(queue: asyncio.Queue, event: dict):
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+def format_sse(event: dict) -> str:
+    """Render an event in text/event-stream framing"""
+    lines = []
+    if event.get("id") is not None:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['event']}")
+    lines.append(f"data: {json.dumps(event['data'], default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def stream_response(
+    request: Request,
+    topic: str,
+    user_id: int,
+    queue: asyncio.Queue,
+    backlog: List[dict] = ()
+) -> StreamingResponse:
+    """SSE response replaying `backlog`, then relaying `queue` until the client disconnects"""
+    async def events():
+        try:
+            for item in backlog:
+                yield format_sse(item)
+            while not await request.is_disconnected():
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(item)
+        finally:
+            broker.unsubscribe(topic, user_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def publish_change(db: Session, user_id: Optional[int], data: dict):
+    """Queue a todo delta for `user_id`, delivered when the session's transaction commits"""
+    if user_id is None:
+        return
+    change = {"event": "todo", "data": data}
+    if CHANGE_FEED_PG_NOTIFY:
+        payload = json.dumps({"user_id": user_id, **change}, default=str)
+        if len(payload) > MAX_NOTIFY_PAYLOAD:
+            slim = {key: value for key, value in data.items() if key != "todo"}
+            payload = json.dumps({"user_id": user_id, "event": "todo", "data": slim}, default=str)
+        # Delivered by PostgreSQL on commit, discarded on rollback
+        db.execute(sql_select(func.pg_notify(CHANGE_FEED_CHANNEL, payload)))
+    else:
+        defer(db, "changes", (user_id, change))
+
+
+@on_commit("changes")
+def _dispatch_changes(changes: List[Tuple[int, dict]]):
+    for user_id, change in changes:
+        broker.publish(TODOS_TOPIC, user_id, change)
+
+
+class ChangeFeedListener:
+    """LISTENs on the change channel of every shard in background threads and relays
+    to local subscribers (changes are NOTIFYed on the shard that was written)"""
+
+    def __init__(self, channel: str = CHANGE_FEED_CHANNEL):
+        self.channel = channel
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._run, args=(shard_engine,), name="change-feed-listener", daemon=True)
+            for shard_engine in shard_engines
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def _run(self, shard_engine):
+        while not self._stop.is_set():
+            try:
+                self._listen(shard_engine)
+            except Exception as e:
+                print(f"Change feed listener failed, reconnecting: {e}")
+                self._stop.wait(1)
+
+    def _listen(self, shard_engine):
+        # A dedicated connection: it sits in autocommit LISTEN mode and is never
+        # returned to the pool
+        raw = shard_engine.raw_connection()
+        try:
+            connection = raw.driver_connection
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {self.channel}")
+            while not self._stop.is_set():
+                if select.select([connection], [], [], 1.0) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    notify = connection.notifies.pop(0)
+                    message = json.loads(notify.payload)
+                    broker.publish(TODOS_TOPIC, message.pop("user_id"), message)
+        finally:
+            raw.invalidate()
+
+
+# Global broker instance
+broker = EventBroker()
+change_feed_listener = ChangeFeedListener()
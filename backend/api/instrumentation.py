@@ -0,0 +1,160 @@
+"""Per-request timing and SQL instrumentation.
+
+`TimingMiddleware` opens a `RequestStats` for each HTTP request; SQLAlchemy event
+hooks installed by `instrument_engine` and `record_conversion` calls from the
+database layer add to it. When the response starts the totals are sent as a
+`Server-Timing` header and written as one JSON log line per request.
+"""
+import json
+import logging
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+
+def json_logger(name: str) -> logging.Logger:
+    """Logger writing its messages (JSON objects) one per line, ready for CloudWatch/ELK without a parser"""
+    json_log = logging.getLogger(name)
+    if not json_log.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        json_log.addHandler(handler)
+        json_log.setLevel(os.getenv("REQUEST_LOG_LEVEL", "INFO"))
+        json_log.propagate = False
+    return json_log
+
+
+logger = json_logger("todo.requests")
+
+# Same SQL statement executed this many times in one request is reported as N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+
+class RequestStats:
+    __slots__ = ("start", "sql_count", "sql_time", "rows", "conversion_time", "statements")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.rows = 0
+        self.conversion_time = 0.0
+        self.statements = Counter()
+
+    def repeated_statements(self) -> dict:
+        """Statements executed often enough in this request to look like an N+1 loop"""
+        return {sql: n for sql, n in self.statements.items() if n >= N_PLUS_ONE_THRESHOLD}
+
+
+# The stats object is shared by reference, so updates made in threadpool
+# workers (sync endpoints) land on the request that started them
+_current_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def record_conversion(seconds: float):
+    """Add time spent converting ORM rows to Pydantic models"""
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.conversion_time += seconds
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start"].pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.sql_count += 1
+        stats.sql_time += time.perf_counter() - started
+        stats.statements[statement] += 1
+
+
+def _handle_error(context):
+    if context.connection is not None:
+        starts = context.connection.info.get("query_start")
+        if starts:
+            starts.pop()
+
+
+def _on_load(target, context, attrs=None):
+    # Shared by "load" (target, context) and "refresh" (target, context, attrs)
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.rows += 1
+
+
+def instrument_engine(engine, base):
+    """Attach the timing hooks to an engine and row counting to a declarative base"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    if not event.contains(base, "load", _on_load):
+        event.listen(base, "load", _on_load, propagate=True)
+        event.listen(base, "refresh", _on_load, propagate=True)
+
+
+def server_timing_header(stats: RequestStats, total: float) -> str:
+    return (
+        f'app;dur={total * 1000:.2f}, '
+        f'db;dur={stats.sql_time * 1000:.2f};desc="{stats.sql_count} queries, {stats.rows} rows", '
+        f'convert;dur={stats.conversion_time * 1000:.2f}'
+    )
+
+
+class TimingMiddleware:
+    """ASGI middleware that records timing and SQL stats for every HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = server_timing_header(stats, time.perf_counter() - stats.start)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", header.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
+            self._log(scope, status, stats)
+
+    @staticmethod
+    def _log(scope, status: int, stats: RequestStats):
+        repeated = stats.repeated_statements()
+        record = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status,
+            "duration_ms": round((time.perf_counter() - stats.start) * 1000, 2),
+            "sql_count": stats.sql_count,
+            "sql_ms": round(stats.sql_time * 1000, 2),
+            "rows": stats.rows,
+            "convert_ms": round(stats.conversion_time * 1000, 2),
+        }
+        if repeated:
+            record["n_plus_one"] = [{"statement": sql, "count": n} for sql, n in repeated.items()]
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
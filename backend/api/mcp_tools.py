@@ -0,0 +1,136 @@
+"""Todo tools and resources shared by the MCP servers (mcp/mcp_server.py and mcp/unified_server.py)"""
+from datetime import date
+from typing import List, Optional
+
+from fastapi.encoders import jsonable_encoder
+
+from database.db_models import SessionLocal
+
+# Upper bound on todos returned by a single tool call
+MAX_PAGE_SIZE = 100
+
+
+def get_tasks(
+    user_id: Optional[int] = None,
+    completed: Optional[bool] = None,
+    priority: Optional[str] = None,
+    category: Optional[str] = None,
+    due_before: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    cursor: Optional[int] = None,
+    limit: int = 20
+) -> dict:
+    """Fetches a filtered page of todos from the database."""
+    from database.database import todo_db
+    from api.models import Priority
+    from api.utils import parse_fields
+
+    # Only the requested columns are selected; raises ValueError for unknown fields
+    projection = parse_fields(",".join(fields)) if fields else None
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    db = SessionLocal()
+    try:
+        if user_id is not None:
+            todo_db.use_user_shard(db, user_id)
+        todos, next_cursor = todo_db.get_todos_page(
+            db,
+            user_id=user_id,
+            completed=completed,
+            priority=Priority(priority) if priority else None,
+            category=category,
+            due_before=date.fromisoformat(due_before) if due_before else None,
+            cursor=cursor,
+            limit=limit,
+            fields=projection
+        )
+    finally:
+        db.close()
+    return {"todos": jsonable_encoder(todos), "next_cursor": next_cursor}
+
+
+def get_tasks_summary(user_id: Optional[int] = None) -> dict:
+    """Returns a constant-size summary of the todo database."""
+    from database.database import todo_db
+    db = SessionLocal()
+    try:
+        if user_id is not None:
+            todo_db.use_user_shard(db, user_id)
+        summary = todo_db.get_summary(db, user_id=user_id)
+    finally:
+        db.close()
+    return summary
+
+
+def get_todo_by_id(todo_id: int) -> dict:
+    """Fetches a todo by its ID."""
+    from database.database import todo_db
+    db = SessionLocal()
+    try:
+        todo = todo_db.get_todo(db, todo_id)
+    finally:
+        db.close()
+    return todo.model_dump(mode="json") if todo else {}
+
+
+def get_sample_requests() -> dict:
+    """Samples for request json structures"""
+    return {
+        "create_todo": {
+            "title": "Buy groceries",
+            "description": "Milk, Bread, Eggs",
+            "priority": "medium",
+            "due_date": "2025-08-05",
+            "category": "Shopping"
+        },
+        "update_todo": {
+            "title": "Buy groceries and fruits",
+            "description": "Milk, Bread, Eggs, Apples",
+            "priority": "high",
+            "due_date": "2025-08-06",
+            "category": "Shopping"
+        },
+        "bulk_update": {
+            "todo_ids": [1, 2],
+            "updates": {
+                "priority": "urgent",
+                "completed": True
+            }
+        },
+        "import_todos": [
+            {
+                "title": "Read a book",
+                "description": "Start reading 'Atomic Habits'",
+                "priority": "low",
+                "due_date": "2025-08-15",
+                "category": "Personal"
+            },
+            {
+                "title": "Finish project report",
+                "description": "Complete the final draft and send to manager",
+                "priority": "high",
+                "due_date": "2025-08-10",
+                "category": "Work"
+            }
+        ],
+        "search_todos": {
+            "q": "project",
+            "include_completed": True,
+            "limit": 10
+        }
+    }
+
+
+def register_tools(mcp) -> None:
+    """Add the todo tools and the request samples resource to a FastMCP server"""
+    mcp.tool(
+        name="get_all_tasks",
+        description="get tasks from the todo database, newest first, one page at a time. "
+                    "Filter by user_id, completed, priority, category or due_before (YYYY-MM-DD), "
+                    "pick the returned fields with `fields`, and pass `next_cursor` back as `cursor` for the next page."
+    )(get_tasks)
+    mcp.tool(
+        name="get_tasks_summary",
+        description="get counts, overdue total and top categories of tasks, optionally for one user_id"
+    )(get_tasks_summary)
+    mcp.tool(name="get_todo_by_id", description="get a todo by its ID")(get_todo_by_id)
+    mcp.resource("request://structures")(get_sample_requests)
@@ -0,0 +1,216 @@
+"""Prometheus metrics for the API, the DB pool, bcrypt and the AI upstream.
+
+With several gunicorn workers set PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py does
+this) so every worker writes its samples to a shared directory and /metrics
+aggregates all of them, whichever worker answers the scrape.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from starlette.responses import Response
+
+# Queries slower than this are counted in db_slow_queries_total
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_SECONDS", "0.1"))
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served",
+    multiprocess_mode="livesum",
+)
+REQUESTS_REJECTED = Counter(
+    "http_requests_rejected_total",
+    "Requests refused by rate limiting (rate_limited) or admission control (overloaded)",
+    ["reason"],
+)
+COALESCED_CALLS = Counter(
+    "coalesced_calls_total",
+    "Reads answered by another caller's in-flight computation (in_flight) or a recent result (ttl)",
+    ["function", "source"],
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cached reads by where they were answered: local LRU, shared tier or miss",
+    ["cache", "result"],
+)
+RETENTION_ROWS = Counter(
+    "retention_rows_total",
+    "Todos archived and deleted by the retention job, and bytes reclaimed by compacting SQLite",
+    ["action"],
+)
+DB_POOL_OPEN = Gauge(
+    "db_pool_connections_open",
+    "Database connections held by the pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use",
+    "Database connections checked out of the pool",
+    multiprocess_mode="livesum",
+)
+DB_SLOW_QUERIES = Counter(
+    "db_slow_queries_total",
+    "SQL statements slower than SLOW_QUERY_SECONDS",
+)
+BCRYPT_IN_PROGRESS = Gauge(
+    "auth_bcrypt_in_progress",
+    "bcrypt hash/verify calls running or waiting for a CPU",
+    multiprocess_mode="livesum",
+)
+BCRYPT_LATENCY = Histogram(
+    "auth_bcrypt_duration_seconds",
+    "bcrypt hash/verify duration",
+    ["operation"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+AI_UPSTREAM_LATENCY = Histogram(
+    "ai_upstream_duration_seconds",
+    "Latency of calls to the AI provider",
+    ["outcome"],
+    buckets=(0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+
+def route_template(scope) -> str:
+    """Path with its parameters put back as placeholders: /api/todos/7 -> /api/todos/{todo_id}
+
+    Rebuilt from the request path rather than read from the matched route, whose
+    path does not include the include_router prefix on every FastAPI version.
+    """
+    if "endpoint" not in scope:
+        return "unmatched"
+    segments = scope["path"].split("/")
+    for name, value in scope.get("path_params", {}).items():
+        value = str(value)
+        for i in range(len(segments) - 1, -1, -1):
+            if segments[i] == value:
+                segments[i] = "{" + name + "}"
+                break
+    return "/".join(segments)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and in-flight requests per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+            # Label by route template so /todos/1 and /todos/2 share one series
+            REQUEST_LATENCY.labels(
+                scope["method"],
+                route_template(scope),
+                str(status),
+            ).observe(time.perf_counter() - started)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if time.perf_counter() - conn.info["metrics_query_start"].pop() >= SLOW_QUERY_SECONDS:
+        DB_SLOW_QUERIES.inc()
+
+
+def _handle_error(context):
+    if context.connection is not None:
+        starts = context.connection.info.get("metrics_query_start")
+        if starts:
+            starts.pop()
+
+
+def instrument_pool(engine):
+    """Track pool usage and slow statements for an engine"""
+    if event.contains(engine, "checkout", _on_checkout):
+        return
+    event.listen(engine, "connect", _on_connect)
+    event.listen(engine, "close", _on_close)
+    event.listen(engine, "checkout", _on_checkout)
+    event.listen(engine, "checkin", _on_checkin)
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def _on_connect(dbapi_connection, connection_record):
+    DB_POOL_OPEN.inc()
+
+
+def _on_close(dbapi_connection, connection_record):
+    DB_POOL_OPEN.dec()
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    DB_POOL_IN_USE.inc()
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    DB_POOL_IN_USE.dec()
+
+
+@contextmanager
+def track_bcrypt(operation: str):
+    BCRYPT_IN_PROGRESS.inc()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        BCRYPT_LATENCY.labels(operation).observe(time.perf_counter() - started)
+        BCRYPT_IN_PROGRESS.dec()
+
+
+@contextmanager
+def track_ai_upstream():
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        AI_UPSTREAM_LATENCY.labels(outcome).observe(time.perf_counter() - started)
+
+
+def metrics_response() -> Response:
+    """Render all metrics, aggregated across workers in multiprocess mode"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
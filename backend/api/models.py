@@ -1,6 +1,6 @@
 from datetime import datetime, date
 from enum import Enum
-from typing import List, Optional, Dict
+from typing import Annotated, List, Literal, Optional, Dict, Union
 
 from pydantic import BaseModel, Field
 
@@ -61,3 +61,77 @@ class TodoStats(BaseModel):
 class BulkUpdateRequest(BaseModel):
     todo_ids: List[int]
     updates: TodoUpdate
+
+
+class BulkUpdateResult(BaseModel):
+    updated_count: int
+    updated_todos: List[int]
+    errors: List[str]
+
+
+class ImportResult(BaseModel):
+    imported_count: int
+    imported_todo_ids: List[int]
+    errors: List[str]
+
+
+class Notification(BaseModel):
+    id: int
+    user_id: int
+    todo_id: int
+    kind: str
+    title: str
+    due_date: date
+    created_at: datetime
+
+
+class RetentionPolicy(BaseModel):
+    # Days; None uses the server default, 0 keeps todos forever
+    archive_completed_after_days: Optional[int] = Field(None, ge=0)
+    delete_archived_after_days: Optional[int] = Field(None, ge=0)
+
+
+class TodoChanges(BaseModel):
+    changed: List[Todo]
+    deleted: List[int]
+    next_token: str
+    has_more: bool
+
+
+class BatchCreate(BaseModel):
+    op: Literal["create"]
+    data: TodoCreate
+
+
+class BatchUpdate(BaseModel):
+    op: Literal["update"]
+    id: int
+    data: TodoUpdate
+
+
+class BatchDelete(BaseModel):
+    op: Literal["delete"]
+    id: int
+
+
+BatchOperation = Annotated[Union[BatchCreate, BatchUpdate, BatchDelete], Field(discriminator="op")]
+
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(..., min_length=1, max_length=100)
+    # "atomic": all operations commit or none do; "best_effort": failed operations are skipped
+    mode: Literal["atomic", "best_effort"] = "atomic"
+
+
+class BatchOperationResult(BaseModel):
+    index: int
+    op: str
+    status: int
+    todo: Optional[Todo] = None
+    error: Optional[str] = None
+
+
+class BatchResult(BaseModel):
+    mode: str
+    committed: bool
+    results: List[BatchOperationResult]
@@ -0,0 +1,179 @@
+"""Due-date reminders pushed to clients instead of polled.
+
+Every worker runs two background tasks from the app lifespan:
+
+- the reminder sweep: the elected leader (see database/leader.py) records
+  "due_soon" and "overdue" notifications for todos entering those windows, using
+  bounded indexed range scans;
+- the relay: reads notifications newer than the last one it saw on each shard (a
+  primary key range) and publishes them to this worker's stream subscribers, so clients
+  connected to any worker are notified whichever worker is leader.
+"""
+import asyncio
+import os
+from datetime import date, timedelta
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, Query, Request
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from api.auth import get_current_user, get_stream_user
+from api.events import broker, stream_response
+from api.models import Notification
+from database.database import todo_db
+from database.db_models import SessionLocal, get_db, shard_engines
+from database.leader import LeaderElection
+
+REMINDERS_ENABLED = os.getenv("REMINDERS_ENABLED", "true").lower() == "true"
+REMINDER_INTERVAL_SECONDS = float(os.getenv("REMINDER_INTERVAL_SECONDS", "60"))
+# "due_soon" covers todos due today up to this many days ahead
+DUE_SOON_DAYS = int(os.getenv("DUE_SOON_DAYS", "1"))
+# Overdue todos older than this are not notified (e.g. after a long outage)
+OVERDUE_LOOKBACK_DAYS = int(os.getenv("OVERDUE_LOOKBACK_DAYS", "7"))
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "1000"))
+NOTIFICATION_RELAY_SECONDS = float(os.getenv("NOTIFICATION_RELAY_SECONDS", "2"))
+NOTIFICATIONS_TOPIC = "notifications"
+
+router = APIRouter()
+
+
+def sweep_due_dates() -> List[Notification]:
+    """Record notifications for todos that became due soon or overdue"""
+    today = date.today()
+    created = []
+    windows = [
+        ("due_soon", today, today + timedelta(days=DUE_SOON_DAYS + 1)),
+        ("overdue", today - timedelta(days=OVERDUE_LOOKBACK_DAYS), today),
+    ]
+    for shard in range(len(shard_engines)):
+        with SessionLocal(info={"shard": shard}) as db:
+            for kind, due_from, due_before in windows:
+                # Drain the window in bounded batches so one sweep never holds a long transaction
+                while True:
+                    batch = todo_db.record_due_notifications(db, kind, due_from, due_before, REMINDER_BATCH_SIZE)
+                    created.extend(batch)
+                    if len(batch) < REMINDER_BATCH_SIZE:
+                        break
+    return created
+
+
+def _notification_event(notification: Notification) -> dict:
+    return {
+        "id": notification.id,
+        "event": "notification",
+        "data": notification.model_dump(mode="json")
+    }
+
+
+class ReminderService:
+    """Runs the leader-only sweep and the per-worker relay as asyncio tasks"""
+
+    def __init__(self):
+        self.election = LeaderElection("due-date-reminders", lease_seconds=3 * REMINDER_INTERVAL_SECONDS)
+        self._tasks: List[asyncio.Task] = []
+        # Per shard: notification ids are only ordered within a shard
+        self._last_relayed_ids: List[int] = []
+
+    async def start(self):
+        self._last_relayed_ids = await run_in_threadpool(self._last_notification_ids)
+        self._tasks = [
+            asyncio.create_task(self._sweep_loop()),
+            asyncio.create_task(self._relay_loop()),
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await run_in_threadpool(self.election.release)
+
+    @staticmethod
+    def _last_notification_ids() -> List[int]:
+        last_ids = []
+        for shard in range(len(shard_engines)):
+            with SessionLocal(info={"shard": shard}) as db:
+                last_ids.append(todo_db.get_last_notification_id(db))
+        return last_ids
+
+    async def _sweep_loop(self):
+        while True:
+            try:
+                if await run_in_threadpool(self.election.acquire):
+                    created = await run_in_threadpool(sweep_due_dates)
+                    if created:
+                        print(f"Reminder sweep recorded {len(created)} notifications")
+            except Exception as e:
+                print(f"Reminder sweep failed: {e}")
+            await asyncio.sleep(REMINDER_INTERVAL_SECONDS)
+
+    def _fetch_new(self, shard: int) -> List[Notification]:
+        with SessionLocal(info={"shard": shard}) as db:
+            return todo_db.get_notifications(db, after_id=self._last_relayed_ids[shard], limit=500)
+
+    async def _relay_loop(self):
+        while True:
+            try:
+                for shard in range(len(shard_engines)):
+                    notifications = await run_in_threadpool(self._fetch_new, shard)
+                    for notification in notifications:
+                        broker.publish(NOTIFICATIONS_TOPIC, notification.user_id, _notification_event(notification))
+                        self._last_relayed_ids[shard] = notification.id
+            except Exception as e:
+                print(f"Notification relay failed: {e}")
+            await asyncio.sleep(NOTIFICATION_RELAY_SECONDS)
+
+
+# Global reminder service instance, started from the app lifespan
+reminder_service = ReminderService()
+
+
+@router.get(
+    "/notifications",
+    response_model=List[Notification],
+    tags=["Notifications"],
+    summary="List due-date notifications",
+    description="""
+    Get the authenticated user's due-date notifications with an id greater than `after_id`, oldest first.
+
+    **Authentication Required**: This endpoint requires a valid JWT token.
+    """
+)
+def list_notifications(
+    after_id: int = Query(0, ge=0, description="Return notifications newer than this id"),
+    limit: int = Query(100, ge=1, le=500, description="Limit number of results"),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """List notifications for the current user"""
+    return todo_db.get_notifications(db, user_id=current_user.id, after_id=after_id, limit=limit)
+
+
+@router.get(
+    "/notifications/stream",
+    tags=["Notifications"],
+    summary="Stream due-date notifications",
+    description="""
+    Server-Sent Events stream of the authenticated user's due-date notifications.
+
+    Authenticate with the Authorization header or, for `EventSource`, the `token` query parameter.
+    On reconnect the browser sends `Last-Event-ID` and missed notifications are replayed first.
+    """
+)
+async def stream_notifications(
+    request: Request,
+    last_event_id: Optional[int] = Header(None),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_stream_user)
+):
+    """Push notifications to the client as they are recorded"""
+    user_id = current_user.id
+    queue = broker.subscribe(NOTIFICATIONS_TOPIC, user_id)
+    missed = []
+    if last_event_id is not None:
+        missed = await run_in_threadpool(todo_db.get_notifications, db, user_id, last_event_id, 500)
+    # Do not pin a pooled connection for the lifetime of the stream
+    db.close()
+    backlog = [_notification_event(notification) for notification in missed]
+    return stream_response(request, NOTIFICATIONS_TOPIC, user_id, queue, backlog)
@@ -0,0 +1,284 @@
+"""Per-client rate limiting and overload shedding.
+
+`RateLimitMiddleware` runs before routing:
+
+1. Token bucket per client: the user id from the JWT, or the client IP for /api/auth
+   and unauthenticated calls. Each request takes ROUTE_COSTS["METHOD path"] or
+   ROUTE_COSTS[path] tokens (default 1), so table-scanning endpoints such as /api/export
+   drain the bucket faster. An empty
+   bucket answers 429 with Retry-After.
+2. Admission control per worker: at most MAX_CONCURRENT_REQUESTS run at once and at
+   most MAX_QUEUED_REQUESTS wait for a slot (up to QUEUE_TIMEOUT_SECONDS). Beyond
+   that the request is shed with 503 and Retry-After instead of queueing unboundedly.
+
+Buckets live in the RATE_LIMIT_BACKEND: "memory" (per process), "sqlite" (a file
+shared by every worker on the host; the default under gunicorn.conf.py) or "redis"
+(shared across hosts, needs the `redis` package and RATE_LIMIT_REDIS_URL).
+"""
+import asyncio
+import json
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+import anyio.to_thread
+import jwt
+from starlette.datastructures import Headers, QueryParams
+
+from api.auth import ALGORITHM, SECRET_KEY
+from api.metrics import REQUESTS_REJECTED
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+# Sustained requests per second and burst size per user
+RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "20"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "60"))
+# Per IP on /api/auth (bcrypt makes each call expensive) and for anonymous requests
+AUTH_RATE_LIMIT_PER_SECOND = float(os.getenv("AUTH_RATE_LIMIT_PER_SECOND", "1"))
+AUTH_RATE_LIMIT_BURST = float(os.getenv("AUTH_RATE_LIMIT_BURST", "10"))
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "64"))
+MAX_QUEUED_REQUESTS = int(os.getenv("MAX_QUEUED_REQUESTS", "128"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("QUEUE_TIMEOUT_SECONDS", "5"))
+
+# Tokens taken per request, by "METHOD path" or path; everything else costs 1
+ROUTE_COSTS = {
+    "/api/search": 5,
+    "/api/export": 10,
+    "/api/statistics": 3,
+    "/api/todos/import": 5,
+    "/api/todos/bulk-update": 5,
+    "/api/batch": 5,
+    "/api/todos/purge": 10,
+    "DELETE /api/todos": 10,
+    # Account deletion and its purge; GET /api/auth/me stays at 1
+    "DELETE /api/auth/me": 10,
+    "/api/ai/subtasks": 10,
+}
+# Never limited: probes, scrapes and docs
+EXEMPT_PATHS = ("/", "/api/health", "/metrics", "/docs", "/redoc", "/openapi.json")
+
+
+class MemoryBucketBackend:
+    """Token buckets in this process only, dropping the least recently used beyond max_keys"""
+    blocking = False
+    max_keys = 100_000
+
+    def __init__(self):
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, cost: float, rate: float, burst: float) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_keys:
+                # A dropped client starts again from a full bucket
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+
+class SQLiteBucketBackend:
+    """Token buckets in a SQLite file shared by all worker processes on one host"""
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # Losing buckets on a crash only resets limits
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)"
+            )
+            self._local.connection = connection
+        return connection
+
+    def take(self, key: str, cost: float, rate: float, burst: float) -> Tuple[bool, float]:
+        connection = self._connection()
+        now = time.time()
+        # IMMEDIATE takes the write lock up front, so read-modify-write is atomic across processes
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            connection.execute(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now)
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+
+class RedisBucketBackend:
+    """Token buckets in Redis, shared across hosts; one atomic script call per request"""
+    blocking = True
+    script = """
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local rate, burst, cost, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+    local tokens = tonumber(bucket[1]) or burst
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+    local allowed = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url: str):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(self.script)
+
+    def take(self, key: str, cost: float, rate: float, burst: float) -> Tuple[bool, float]:
+        allowed, tokens = self._take(keys=[f"ratelimit:{key}"], args=[rate, burst, cost, time.time()])
+        tokens = float(tokens)
+        return bool(allowed), 0.0 if allowed else (cost - tokens) / rate
+
+
+def create_backend(name: str = RATE_LIMIT_BACKEND):
+    if name == "sqlite":
+        return SQLiteBucketBackend(
+            os.getenv("RATE_LIMIT_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "todo-ratelimit.db"))
+        )
+    if name == "redis":
+        return RedisBucketBackend(os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0"))
+    return MemoryBucketBackend()
+
+
+def client_key(scope) -> Tuple[str, bool]:
+    """("user:<id>" or "ip:<address>", is_user) for the request"""
+    path = scope["path"]
+    if not path.startswith("/api/auth/"):
+        token = None
+        authorization = Headers(scope=scope).get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            token = authorization[7:]
+        elif path.endswith("/stream"):
+            token = QueryParams(scope.get("query_string", b"")).get("token")
+        if token:
+            try:
+                # Signature check only; get_current_user still verifies the user exists
+                user_id = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+                if user_id is not None:
+                    return f"user:{user_id}", True
+            except jwt.PyJWTError:
+                pass
+    # The proxy headers middleware (FORWARDED_ALLOW_IPS) has already replaced the proxy's
+    # address with the client's from a trusted X-Forwarded-For
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}", False
+
+
+class AdmissionController:
+    """Bounds concurrent and queued requests in this worker"""
+
+    def __init__(self, max_concurrent: int, max_queued: int, timeout: float):
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.queued = 0
+        self._semaphore = None
+        self._max_concurrent = max_concurrent
+
+    async def acquire(self) -> bool:
+        if self._semaphore is None:
+            # Created lazily, inside the worker's event loop
+            self._semaphore = asyncio.Semaphore(self._max_concurrent)
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            return True
+        if self.queued >= self.max_queued:
+            return False
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.queued -= 1
+
+    def release(self):
+        self._semaphore.release()
+
+
+async def _reject(send, status: int, detail: str, retry_after: float):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying the token buckets and admission control"""
+
+    def __init__(self, app, backend=None):
+        self.app = app
+        self.backend = backend or create_backend()
+        self.admission = AdmissionController(MAX_CONCURRENT_REQUESTS, MAX_QUEUED_REQUESTS, QUEUE_TIMEOUT_SECONDS)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        key, is_user = client_key(scope)
+        rate, burst = (
+            (RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST) if is_user
+            else (AUTH_RATE_LIMIT_PER_SECOND, AUTH_RATE_LIMIT_BURST)
+        )
+        cost = ROUTE_COSTS.get(f"{scope['method']} {scope['path']}", ROUTE_COSTS.get(scope["path"], 1))
+        if self.backend.blocking:
+            allowed, retry_after = await anyio.to_thread.run_sync(self.backend.take, key, cost, rate, burst)
+        else:
+            allowed, retry_after = self.backend.take(key, cost, rate, burst)
+        if not allowed:
+            REQUESTS_REJECTED.labels("rate_limited").inc()
+            await _reject(send, 429, "Rate limit exceeded", retry_after)
+            return
+
+        # Event streams stay open indefinitely; they must not hold an admission slot
+        if scope["path"].endswith("/stream"):
+            await self.app(scope, receive, send)
+            return
+        if not await self.admission.acquire():
+            REQUESTS_REJECTED.labels("overloaded").inc()
+            await _reject(send, 503, "Server is overloaded, retry later", 1)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.admission.release()
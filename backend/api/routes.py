@@ -1,19 +1,43 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Depends, Request, Response
 from typing import List, Optional
 from datetime import datetime, date
 from sqlalchemy.orm import Session
-from api.models import Todo, TodoCreate, TodoUpdate, TodoStats, BulkUpdateRequest, Priority
+from api.models import (
+    Todo, TodoCreate, TodoUpdate, TodoStats, BulkUpdateRequest, BulkUpdateResult, ImportResult, Priority,
+    TodoChanges, BatchRequest, BatchResult, RetentionPolicy
+)
 from database.database import todo_db
 from database.db_models import get_db
-from api.auth import get_current_user
+from database.purge import purge_todos_task
+from database.writer import write
+from api.auth import get_current_user, get_stream_user
+from api.events import TODOS_TOPIC, broker, stream_response
 from api.utils import (
-    filter_todos, paginate_todos, search_todos, get_overdue_todos,
-    get_due_soon_todos, get_unique_categories, bulk_update_todos, import_todos
+    search_todos, get_overdue_todos,
+    get_due_soon_todos, get_unique_categories, bulk_update_todos, import_todos,
+    encode_sync_token, decode_sync_token, run_batch, parse_fields, projected_response
 )
 
+FIELDS_DESCRIPTION = "Comma-separated Todo fields to return, e.g. `id,title,completed` (default: all)"
+
 router = APIRouter()
 
 
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    try:
+        return parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _missing_todo_error(db: Session, todo_id: int) -> HTTPException:
+    """404 or 403 for a todo the current user could not update or delete"""
+    # Only requests that miss pay for this extra lookup
+    if todo_db.todo_exists(db, todo_id):
+        return HTTPException(status_code=403, detail="Access denied")
+    return HTTPException(status_code=404, detail="Todo not found")
+
+
 @router.post(
     "/todos",
     response_model=Todo,
@@ -59,7 +83,7 @@ def create_todo(todo: TodoCreate, db: Session = Depends(get_db), current_user=De
     todo_data = todo.dict()
     # Automatically set the user_id to the current user
     todo_data["user_id"] = current_user.id
-    return todo_db.create_todo(db, todo_data)
+    return write(db, lambda session: todo_db.create_todo(session, todo_data, commit=False))
 
 
 @router.get(
@@ -103,18 +127,222 @@ def get_todos(
     due_before: Optional[date] = Query(None, description="Filter by due date before this date"),
     limit: Optional[int] = Query(None, ge=1, le=100, description="Limit number of results"),
     offset: Optional[int] = Query(0, ge=0, description="Offset for pagination"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    include_archived: bool = Query(False, description="Also return todos moved to the archive"),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user)
 ):
     """Get todos for the current user with optional filters and pagination"""
-    # Get todos only for the current user
-    todos = todo_db.get_todos_by_user(db, current_user.id)
+    projection = _parse_fields(fields)
+    # Filters, pagination and projection run in SQL, scoped to the current user
+    todos = todo_db.get_todos_filtered(
+        db, current_user.id, completed, priority, category, due_before, offset, limit, projection, include_archived
+    )
+    return projected_response(todos) if projection else todos
+
+
+@router.get(
+    "/todos/overdue",
+    response_model=List[Todo],
+    tags=["Date Queries"],
+    summary="Get overdue todos",
+    description="""
+    Get the authenticated user's incomplete todos that are past their due date, oldest due date first.
     
-    # Apply filters
-    todos = filter_todos(todos, completed, priority, category, due_before)
+    Results are paginated: when more remain, the response carries an `X-Next-Cursor`
+    header to pass back as `cursor`.
+    """,
+    responses={
+        200: {
+            "description": "List of overdue todos",
+            "content": {
+                "application/json": {
+                    "example": [
+                        {
+                            "id": 3,
+                            "title": "Pay electricity bill",
+                            "description": "Due last week",
+                            "completed": False,
+                            "priority": "urgent",
+                            "due_date": "2025-07-27",
+                            "category": "Bills",
+                            "created_at": "2025-07-01T10:00:00",
+                            "updated_at": "2025-07-28T12:00:00"
+                        }
+                    ]
+                }
+            }
+        }
+    }
+)
+def get_overdue(
+    response: Response,
+    limit: int = Query(50, ge=1, le=100, description="Limit number of results"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """Get the current user's todos that are past their due date"""
+    try:
+        todos, next_cursor = get_overdue_todos(db, current_user.id, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return todos
+
+
+@router.get(
+    "/todos/due-soon",
+    response_model=List[Todo],
+    tags=["Date Queries"],
+    summary="Get todos due soon",
+    description="""
+    Get the authenticated user's incomplete todos due within the specified number of days, soonest first.
     
-    # Apply pagination
-    return paginate_todos(todos, offset, limit)
+    Results are paginated: when more remain, the response carries an `X-Next-Cursor`
+    header to pass back as `cursor`.
+    """,
+    responses={
+        200: {
+            "description": "List of todos due soon",
+            "content": {
+                "application/json": {
+                    "example": [
+                        {
+                            "id": 4,
+                            "title": "Submit tax documents",
+                            "description": "Due in 3 days",
+                            "completed": False,
+                            "priority": "high",
+                            "due_date": "2025-08-06",
+                            "category": "Finance",
+                            "created_at": "2025-08-01T10:00:00",
+                            "updated_at": "2025-08-03T12:00:00"
+                        }
+                    ]
+                }
+            }
+        }
+    }
+)
+def get_due_soon(
+    response: Response,
+    days: int = Query(7, ge=1, le=30, description="Number of days to look ahead"),
+    limit: int = Query(50, ge=1, le=100, description="Limit number of results"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """Get the current user's todos due within the specified number of days"""
+    try:
+        todos, next_cursor = get_due_soon_todos(db, current_user.id, days, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return todos
+
+
+@router.get(
+    "/todos/changes",
+    response_model=TodoChanges,
+    tags=["Todos"],
+    summary="Get todo changes since a sync token",
+    description="""
+    Delta sync for offline-capable clients. Without `since`, returns all of the authenticated
+    user's todos; afterwards pass the returned `next_token` to get only the todos created or
+    updated, and the ids deleted, since then.
+
+    Apply `deleted` first, then `changed`. While `has_more` is true, call again with
+    `next_token` straight away. Changes from the last few seconds are sent again on the
+    next sync, so apply them idempotently.
+    """,
+    responses={
+        200: {
+            "description": "Changes since the token",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "changed": [
+                            {
+                                "id": 7,
+                                "title": "Buy groceries",
+                                "description": "Milk, eggs, bread",
+                                "completed": True,
+                                "priority": "medium",
+                                "due_date": "2025-08-05",
+                                "category": "Shopping",
+                                "created_at": "2025-08-01T10:00:00",
+                                "updated_at": "2025-08-03T12:00:00"
+                            }
+                        ],
+                        "deleted": [3, 5],
+                        "next_token": "2025-08-03T12:00:00_7_12",
+                        "has_more": False
+                    }
+                }
+            }
+        },
+        400: {"description": "Invalid sync token"}
+    }
+)
+def get_todo_changes(
+    since: Optional[str] = Query(None, description="next_token from the previous sync"),
+    limit: int = Query(500, ge=1, le=1000, description="Maximum changed todos and deletions per response"),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """Get the current user's todo changes since a sync token"""
+    try:
+        position = decode_sync_token(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    changed, deleted, next_position, has_more = todo_db.get_changes(db, current_user.id, position, limit)
+    return TodoChanges(
+        changed=changed,
+        deleted=deleted,
+        next_token=encode_sync_token(next_position),
+        has_more=has_more
+    )
+
+
+@router.get(
+    "/todos/stream",
+    tags=["Todos"],
+    summary="Stream todo changes",
+    description="""
+    Server-Sent Events stream of changes to the authenticated user's todos, made from any tab,
+    device or worker. Each `todo` event carries a compact delta to apply to the local list:
+
+    - `{"op": "created" | "updated", "id": 1, "todo": {...}}`
+    - `{"op": "deleted", "id": 1}`
+    - `{"op": "cleared"}`
+
+    `todo` may be missing from large deltas; fetch `GET /todos/{id}` in that case.
+    Authenticate with the Authorization header or, for `EventSource`, the `token` query parameter.
+    """,
+    responses={
+        200: {
+            "description": "Event stream",
+            "content": {
+                "text/event-stream": {
+                    "example": 'event: todo\ndata: {"op": "deleted", "id": 3}\n\n'
+                }
+            }
+        }
+    }
+)
+async def stream_todo_changes(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_stream_user)
+):
+    """Push changes to the current user's todos as they are committed"""
+    queue = broker.subscribe(TODOS_TOPIC, current_user.id)
+    # Do not pin a pooled connection for the lifetime of the stream
+    db.close()
+    return stream_response(request, TODOS_TOPIC, current_user.id, queue)
 
 
 @router.get(
@@ -202,16 +430,12 @@ def get_todo(todo_id: int, db: Session = Depends(get_db), current_user=Depends(g
 )
 def update_todo(todo_id: int, todo_update: TodoUpdate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
     """Update a specific todo for the current user"""
-    todo = todo_db.get_todo(db, todo_id)
-    if not todo:
-        raise HTTPException(status_code=404, detail="Todo not found")
-    
-    # Check if todo belongs to current user
-    if todo.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
     update_data = todo_update.dict(exclude_unset=True)
-    updated_todo = todo_db.update_todo(db, todo_id, update_data)
+    # Ownership is part of the UPDATE's WHERE clause, so there is no separate ownership check
+    user_id = current_user.id
+    updated_todo = write(db, lambda session: todo_db.update_user_todo(session, todo_id, user_id, update_data, commit=False))
+    if updated_todo is None:
+        raise _missing_todo_error(db, todo_id)
     return updated_todo
 
 
@@ -241,15 +465,10 @@ def update_todo(todo_id: int, todo_update: TodoUpdate, db: Session = Depends(get
 )
 def delete_todo(todo_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
     """Delete a specific todo for the current user"""
-    todo = todo_db.get_todo(db, todo_id)
-    if not todo:
-        raise HTTPException(status_code=404, detail="Todo not found")
-    
-    # Check if todo belongs to current user
-    if todo.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    deleted_todo = todo_db.delete_todo(db, todo_id)
+    user_id = current_user.id
+    deleted_todo = write(db, lambda session: todo_db.delete_user_todo(session, todo_id, user_id, commit=False))
+    if deleted_todo is None:
+        raise _missing_todo_error(db, todo_id)
     return {"message": f"Todo '{deleted_todo.title}' deleted successfully"}
 
 
@@ -293,7 +512,7 @@ def get_todos_by_status(completed: bool, db: Session = Depends(get_db)):
     response_model=TodoStats,
     tags=["Statistics"],
     summary="Get todo statistics",
-    description="Get comprehensive todo statistics.",
+    description="Get comprehensive statistics of the authenticated user's todos.",
     responses={
         200: {
             "description": "Todo statistics",
@@ -311,35 +530,27 @@ def get_todos_by_status(completed: bool, db: Session = Depends(get_db)):
         }
     }
 )
-def get_statistics(db: Session = Depends(get_db)):
-    """Get comprehensive todo statistics"""
-    return todo_db.get_stats(db)
+def get_statistics(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+    """Get comprehensive statistics of the current user's todos"""
+    return todo_db.get_stats(db, current_user.id)
 
 
 @router.post(
     "/todos/bulk-update",
-    response_model=List[Todo],
+    response_model=BulkUpdateResult,
     tags=["Bulk Operations"],
     summary="Bulk update todos",
     description="Update multiple todos at once by providing a list of todo IDs and the fields to update.",
     responses={
         200: {
-            "description": "List of updated todos",
+            "description": "IDs of the updated todos and any per-todo errors",
             "content": {
                 "application/json": {
-                    "example": [
-                        {
-                            "id": 1,
-                            "title": "Buy groceries",
-                            "description": "Milk, Bread, Eggs",
-                            "completed": False,
-                            "priority": "medium",
-                            "due_date": "2025-08-05",
-                            "category": "Shopping",
-                            "created_at": "2025-08-01T10:00:00",
-                            "updated_at": "2025-08-03T12:00:00"
-                        }
-                    ]
+                    "example": {
+                        "updated_count": 2,
+                        "updated_todos": [1, 2],
+                        "errors": ["Todo 3 not found"]
+                    }
                 }
             }
         }
@@ -351,12 +562,53 @@ def bulk_update(bulk_request: BulkUpdateRequest = Depends(), db: Session = Depen
     return bulk_update_todos(db, bulk_request.todo_ids, update_data)
 
 
+@router.post(
+    "/batch",
+    response_model=BatchResult,
+    tags=["Bulk Operations"],
+    summary="Run several todo operations in one request",
+    description="""
+    Run up to 100 create, update and delete operations on the authenticated user's todos
+    in one request and one database transaction. `data` is validated like the body of
+    `POST /todos` (create) and `PUT /todos/{id}` (update).
+
+    - `atomic` (default): if any operation fails, none are applied and `committed` is false
+    - `best_effort`: failed operations are skipped and the rest are committed
+
+    Each result carries the HTTP status the single-item endpoint would have returned.
+    """,
+    responses={
+        200: {
+            "description": "Per-operation results",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "mode": "best_effort",
+                        "committed": True,
+                        "results": [
+                            {"index": 0, "op": "update", "status": 200, "todo": {
+                                "id": 1, "title": "Buy groceries", "completed": True, "priority": "medium",
+                                "created_at": "2025-08-01T10:00:00", "updated_at": "2025-08-03T12:00:00"
+                            }, "error": None},
+                            {"index": 1, "op": "delete", "status": 404, "todo": None, "error": "Todo not found"}
+                        ]
+                    }
+                }
+            }
+        }
+    }
+)
+def batch(batch_request: BatchRequest, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+    """Run a batch of operations for the current user"""
+    return run_batch(db, current_user.id, batch_request.operations, batch_request.mode)
+
+
 @router.get(
     "/search",
     response_model=List[Todo],
     tags=["Search"],
     summary="Search todos",
-    description="Search todos by title, description, and category.",
+    description="Search the authenticated user's todos by title, description, and category.",
     responses={
         200: {
             "description": "List of todos matching the search query",
@@ -384,10 +636,15 @@ def search(
     q: str = Query(..., min_length=1, description="Search query"),
     include_completed: bool = Query(True, description="Include completed todos in search"),
     limit: Optional[int] = Query(50, ge=1, le=100, description="Limit number of results"),
-    db: Session = Depends(get_db)
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    include_archived: bool = Query(False, description="Also return todos moved to the archive"),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user)
 ):
-    """Search todos by title, description, and category"""
-    return search_todos(db, q, include_completed, limit)
+    """Search the current user's todos by title, description, and category"""
+    projection = _parse_fields(fields)
+    todos = search_todos(db, current_user.id, q, include_completed, limit, projection, include_archived)
+    return projected_response(todos) if projection else todos
 
 
 @router.get(
@@ -395,7 +652,7 @@ def search(
     response_model=List[str],
     tags=["Metadata"],
     summary="Get all unique categories",
-    description="Get all unique categories.",
+    description="Get the categories used by the authenticated user's todos.",
     responses={
         200: {
             "description": "List of categories",
@@ -407,9 +664,9 @@ def search(
         }
     }
 )
-def get_categories(db: Session = Depends(get_db)):
-    """Get all unique categories"""
-    return get_unique_categories(db)
+def get_categories(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+    """Get the current user's categories"""
+    return get_unique_categories(db, current_user.id)
 
 
 @router.get(
@@ -434,60 +691,53 @@ def get_priorities():
     return [priority.value for priority in Priority]
 
 
-@router.get(
-    "/todos/overdue",
-    response_model=List[Todo],
-    tags=["Date Queries"],
-    summary="Get overdue todos",
-    description="Get todos that are past their due date.",
+@router.post(
+    "/todos/import",
+    response_model=ImportResult,
+    tags=["Import/Export"],
+    summary="Import todos",
+    description="Import multiple todos at once.",
     responses={
         200: {
-            "description": "List of overdue todos",
+            "description": "IDs of the imported todos and any per-todo errors",
             "content": {
                 "application/json": {
-                    "example": [
-                        {
-                            "id": 3,
-                            "title": "Pay electricity bill",
-                            "description": "Due last week",
-                            "completed": False,
-                            "priority": "urgent",
-                            "due_date": "2025-07-27",
-                            "category": "Bills",
-                            "created_at": "2025-07-01T10:00:00",
-                            "updated_at": "2025-07-28T12:00:00"
-                        }
-                    ]
+                    "example": {
+                        "imported_count": 2,
+                        "imported_todo_ids": [5, 6],
+                        "errors": []
+                    }
                 }
             }
         }
     }
 )
-def get_overdue(db: Session = Depends(get_db)):
-    """Get todos that are past their due date"""
-    return get_overdue_todos(db)
+def import_todos_endpoint(todos: List[TodoCreate], db: Session = Depends(get_db)):
+    """Import multiple todos at once"""
+    todos_data = [todo.dict() for todo in todos]
+    return import_todos(db, todos_data)
 
 
 @router.get(
-    "/todos/due-soon",
+    "/export",
     response_model=List[Todo],
-    tags=["Date Queries"],
-    summary="Get todos due soon",
-    description="Get todos due within the specified number of days.",
+    tags=["Import/Export"],
+    summary="Export your todos",
+    description="Export all of the authenticated user's todos, newest first.",
     responses={
         200: {
-            "description": "List of todos due soon",
+            "description": "List of all todos",
             "content": {
                 "application/json": {
                     "example": [
                         {
-                            "id": 4,
-                            "title": "Submit tax documents",
-                            "description": "Due in 3 days",
+                            "id": 1,
+                            "title": "Buy groceries",
+                            "description": "Milk, Bread, Eggs",
                             "completed": False,
-                            "priority": "high",
-                            "due_date": "2025-08-06",
-                            "category": "Finance",
+                            "priority": "medium",
+                            "due_date": "2025-08-05",
+                            "category": "Shopping",
                             "created_at": "2025-08-01T10:00:00",
                             "updated_at": "2025-08-03T12:00:00"
                         }
@@ -497,98 +747,109 @@ def get_overdue(db: Session = Depends(get_db)):
         }
     }
 )
-def get_due_soon(days: int = Query(7, ge=1, le=30, description="Number of days to look ahead"), db: Session = Depends(get_db)):
-    """Get todos due within the specified number of days"""
-    return get_due_soon_todos(db, days)
+def export_todos(
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    include_archived: bool = Query(False, description="Also return todos moved to the archive"),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """Export the current user's todos"""
+    projection = _parse_fields(fields)
+    todos = todo_db.get_todos_filtered(db, current_user.id, fields=projection, include_archived=include_archived)
+    return projected_response(todos) if projection else todos
+
+
+@router.delete(
+    "/todos",
+    status_code=202,
+    tags=["Bulk Operations"],
+    summary="Clear all of your todos",
+    description="Clear all of the current user's todos (use with caution!). Like `POST /todos/purge`, they are "
+                "deleted in the background after the response, in short transactions of PURGE_BATCH_SIZE todos.",
+    responses={
+        202: {
+            "description": "Clearing started",
+            "content": {
+                "application/json": {
+                    "example": {"message": "Purge started"}
+                }
+            }
+        }
+    }
+)
+def clear_all_todos(background_tasks: BackgroundTasks, current_user=Depends(get_current_user)):
+    """Clear all todos of the current user (use with caution!)"""
+    background_tasks.add_task(purge_todos_task, current_user.id)
+    return {"message": "Purge started"}
 
 
 @router.post(
-    "/todos/import",
-    response_model=List[Todo],
-    tags=["Import/Export"],
-    summary="Import todos",
-    description="Import multiple todos at once.",
+    "/todos/purge",
+    status_code=202,
+    tags=["Bulk Operations"],
+    summary="Delete all of your todos",
+    description="Delete all of the current user's todos, archived ones included. The purge runs in the background "
+                "after the response, in short transactions of PURGE_BATCH_SIZE todos so it does not hold locks for "
+                "long, and logs its progress per batch; clients see a `cleared` event once it is done.",
     responses={
-        200: {
-            "description": "List of imported todos",
+        202: {
+            "description": "Purge started",
             "content": {
                 "application/json": {
-                    "example": [
-                        {
-                            "id": 5,
-                            "title": "Read a book",
-                            "description": "Start reading 'Atomic Habits'",
-                            "completed": False,
-                            "priority": "low",
-                            "due_date": "2025-08-15",
-                            "category": "Personal",
-                            "created_at": "2025-08-03T10:00:00",
-                            "updated_at": "2025-08-03T10:00:00"
-                        }
-                    ]
+                    "example": {"message": "Purge started"}
                 }
             }
         }
     }
 )
-def import_todos_endpoint(todos: List[TodoCreate], db: Session = Depends(get_db)):
-    """Import multiple todos at once"""
-    todos_data = [todo.dict() for todo in todos]
-    return import_todos(db, todos_data)
+def purge_todos(background_tasks: BackgroundTasks, current_user=Depends(get_current_user)):
+    """Delete all todos of the current user"""
+    background_tasks.add_task(purge_todos_task, current_user.id)
+    return {"message": "Purge started"}
 
 
 @router.get(
-    "/export",
-    response_model=List[Todo],
-    tags=["Import/Export"],
-    summary="Export all todos",
-    description="Export all todos.",
+    "/retention",
+    response_model=RetentionPolicy,
+    tags=["Retention"],
+    summary="Get your retention policy",
+    description="Your own retention settings, in days. `null` uses the server default "
+                "(ARCHIVE_COMPLETED_AFTER_DAYS and ARCHIVE_DELETE_AFTER_DAYS), 0 keeps todos forever.",
     responses={
         200: {
-            "description": "List of all todos",
+            "description": "Retention policy",
             "content": {
                 "application/json": {
-                    "example": [
-                        {
-                            "id": 1,
-                            "title": "Buy groceries",
-                            "description": "Milk, Bread, Eggs",
-                            "completed": False,
-                            "priority": "medium",
-                            "due_date": "2025-08-05",
-                            "category": "Shopping",
-                            "created_at": "2025-08-01T10:00:00",
-                            "updated_at": "2025-08-03T12:00:00"
-                        }
-                    ]
+                    "example": {"archive_completed_after_days": 30, "delete_archived_after_days": 365}
                 }
             }
         }
     }
 )
-def export_todos(db: Session = Depends(get_db)):
-    """Export all todos"""
-    return todo_db.get_all_todos(db)
+def get_retention(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+    """Get the current user's retention policy"""
+    return todo_db.get_retention_policy(db, current_user.id)
 
 
-@router.delete(
-    "/todos",
-    tags=["Bulk Operations"],
-    summary="Clear all todos",
-    description="Clear all todos (use with caution!)",
+@router.put(
+    "/retention",
+    response_model=RetentionPolicy,
+    tags=["Retention"],
+    summary="Set your retention policy",
+    description="Archive completed todos this many days after their last update, and delete archived todos "
+                "this many days after they were archived. `null` uses the server default, 0 keeps todos forever. "
+                "Applied by the next retention run.",
     responses={
         200: {
-            "description": "Todos cleared",
+            "description": "Retention policy saved",
             "content": {
                 "application/json": {
-                    "example": {"message": "Cleared 10 todos"}
+                    "example": {"archive_completed_after_days": 7, "delete_archived_after_days": 365}
                 }
             }
         }
     }
 )
-def clear_all_todos(db: Session = Depends(get_db)):
-    """Clear all todos (use with caution!)"""
-    count = todo_db.clear_all(db)
-    return {"message": f"Cleared {count} todos"}
-
+def set_retention(policy: RetentionPolicy, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+    """Replace the current user's retention policy"""
+    return todo_db.set_retention_policy(db, current_user.id, policy)
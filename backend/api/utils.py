@@ -1,8 +1,13 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from datetime import datetime, date, timedelta
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from database.database import todo_db
-from api.models import Todo, Priority
+from database.writer import write
+from api.coalesce import coalesce
+from api.models import Todo, Priority, BatchCreate, BatchUpdate, BatchOperationResult
 
 
 def filter_todos(
@@ -46,73 +51,102 @@ def paginate_todos(todos: List[Todo], offset: int = 0, limit: Optional[int] = No
 
 def search_todos(
     db: Session,
+    user_id: int,
     query: str,
     include_completed: bool = True,
-    limit: Optional[int] = 50
+    limit: Optional[int] = 50,
+    fields: Optional[List[str]] = None,
+    include_archived: bool = False
 ) -> List[Todo]:
-    """Search todos by title, description, and category"""
-    query_lower = query.lower()
-    todos = todo_db.get_all_todos(db)
-    
-    # Filter by completion status if needed
-    if not include_completed:
-        todos = [t for t in todos if not t.completed]
-    
-    # Search in title, description, and category
-    matching_todos = []
-    for todo in todos:
-        title_match = query_lower in todo.title.lower()
-        desc_match = todo.description and query_lower in todo.description.lower()
-        category_match = todo.category and query_lower in todo.category.lower()
-        
-        if title_match or desc_match or category_match:
-            matching_todos.append(todo)
-    
-    # Sort by relevance (title matches first)
-    def relevance_score(todo):
-        score = 0
-        if query_lower in todo.title.lower():
-            score += 3
-        if todo.description and query_lower in todo.description.lower():
-            score += 2
-        if todo.category and query_lower in todo.category.lower():
-            score += 1
-        return score
-    
-    matching_todos.sort(key=relevance_score, reverse=True)
-    
-    return matching_todos[:limit] if limit else matching_todos
+    """Search a user's todos by title, description, and category (title matches first)"""
+    return todo_db.search_todos(db, user_id, query, include_completed, limit, fields, include_archived)
 
 
-def get_overdue_todos(db: Session) -> List[Todo]:
-    """Get todos that are past their due date"""
-    today = date.today()
-    todos = todo_db.get_all_todos(db)
-    overdue_todos = [
-        todo for todo in todos
-        if todo.due_date and todo.due_date < today and not todo.completed
-    ]
-    return sorted(overdue_todos, key=lambda x: x.due_date)
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parse a `fields=id,title,...` projection; raises ValueError for unknown fields"""
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in Todo.model_fields]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    # Always include the id so clients can key and merge partial todos
+    return list(dict.fromkeys(["id"] + requested))
+
+
+def projected_response(rows: List[dict]) -> JSONResponse:
+    """Partial todos do not match the Todo response model; send them as they are"""
+    return JSONResponse(jsonable_encoder(rows))
+
+
+def encode_due_cursor(position: Optional[Tuple[date, int]]) -> Optional[str]:
+    """Opaque cursor for date-ordered pages: "<due_date>_<id>" """
+    if position is None:
+        return None
+    due_date, todo_id = position
+    return f"{due_date.isoformat()}_{todo_id}"
+
+
+def decode_due_cursor(cursor: Optional[str]) -> Optional[Tuple[date, int]]:
+    """Inverse of encode_due_cursor; raises ValueError for malformed cursors"""
+    if not cursor:
+        return None
+    due_date, todo_id = cursor.split("_")
+    return date.fromisoformat(due_date), int(todo_id)
+
+
+def encode_sync_token(position: Tuple[datetime, int, int]) -> str:
+    """Sync position (updated_at, todo id, tombstone id) as an opaque string"""
+    updated_at, todo_id, tombstone_id = position
+    return f"{updated_at.isoformat()}_{todo_id}_{tombstone_id}"
+
+
+def decode_sync_token(token: Optional[str]) -> Optional[Tuple[datetime, int, int]]:
+    """Inverse of encode_sync_token; raises ValueError for malformed tokens"""
+    if not token:
+        return None
+    updated_at, todo_id, tombstone_id = token.split("_")
+    return datetime.fromisoformat(updated_at), int(todo_id), int(tombstone_id)
+
+
+@coalesce()
+def get_overdue_todos(
+    db: Session,
+    user_id: int,
+    limit: int = 50,
+    cursor: Optional[str] = None
+) -> Tuple[List[Todo], Optional[str]]:
+    """Get the user's incomplete todos that are past their due date, oldest first"""
+    todos, next_position = todo_db.get_open_todos_by_due_date(
+        db, user_id, due_before=date.today(), after=decode_due_cursor(cursor), limit=limit
+    )
+    return todos, encode_due_cursor(next_position)
 
 
-def get_due_soon_todos(db: Session, days: int = 7) -> List[Todo]:
-    """Get todos due within the specified number of days"""
+@coalesce()
+def get_due_soon_todos(
+    db: Session,
+    user_id: int,
+    days: int = 7,
+    limit: int = 50,
+    cursor: Optional[str] = None
+) -> Tuple[List[Todo], Optional[str]]:
+    """Get the user's incomplete todos due within the specified number of days"""
     today = date.today()
-    future_date = today + timedelta(days=days)
-    
-    todos = todo_db.get_all_todos(db)
-    due_soon_todos = [
-        todo for todo in todos
-        if todo.due_date and today <= todo.due_date <= future_date and not todo.completed
-    ]
-    return sorted(due_soon_todos, key=lambda x: x.due_date)
+    todos, next_position = todo_db.get_open_todos_by_due_date(
+        db, user_id,
+        due_from=today,
+        due_before=today + timedelta(days=days + 1),
+        after=decode_due_cursor(cursor),
+        limit=limit
+    )
+    return todos, encode_due_cursor(next_position)
 
 
-def get_unique_categories(db: Session) -> List[str]:
-    """Get all unique categories"""
-    todos = todo_db.get_all_todos(db)
-    categories = set(todo.category for todo in todos if todo.category)
-    return sorted(list(categories))
+@coalesce()
+def get_unique_categories(db: Session, user_id: int) -> List[str]:
+    """Get the user's categories in use"""
+    return todo_db.get_categories(db, user_id)
 
 
 def bulk_update_todos(db: Session, todo_ids: List[int], update_data: dict) -> dict:
@@ -155,3 +189,82 @@ def import_todos(db: Session, todos_data: List[dict]) -> dict:
         "imported_todo_ids": imported_todos,
         "errors": errors
     }
+
+
+class BatchOperationError(Exception):
+    def __init__(self, status: int, detail: str):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def _run_operation(db: Session, user_id: int, operation) -> BatchOperationResult:
+    """Apply one batch operation without committing"""
+    if isinstance(operation, BatchCreate):
+        todo_data = operation.data.model_dump()
+        todo_data["user_id"] = user_id
+        return BatchOperationResult(index=0, op="create", status=200,
+                                    todo=todo_db.create_todo(db, todo_data, commit=False))
+
+    if isinstance(operation, BatchUpdate):
+        update_data = operation.data.model_dump(exclude_unset=True)
+        todo = todo_db.update_user_todo(db, operation.id, user_id, update_data, commit=False)
+    else:
+        todo = todo_db.delete_user_todo(db, operation.id, user_id, commit=False)
+    if todo is None:
+        if todo_db.todo_exists(db, operation.id):
+            raise BatchOperationError(403, "Access denied")
+        raise BatchOperationError(404, "Todo not found")
+    return BatchOperationResult(index=0, op=operation.op, status=200, todo=todo)
+
+
+class BatchRolledBack(Exception):
+    """Raised inside the write to undo an atomic batch; carries the per-operation results"""
+
+    def __init__(self, results: List[BatchOperationResult]):
+        super().__init__("Batch rolled back")
+        self.results = results
+
+
+def _apply_batch(session: Session, user_id: int, operations: list, mode: str) -> List[BatchOperationResult]:
+    """Apply the operations in `session` without committing; raises BatchRolledBack when an atomic batch fails"""
+    results = []
+    failed = False
+    for index, operation in enumerate(operations):
+        if failed:
+            results.append(BatchOperationResult(index=index, op=operation.op, status=424,
+                                                error="Not run: an earlier operation failed"))
+            continue
+        try:
+            if mode == "best_effort":
+                with session.begin_nested():
+                    result = _run_operation(session, user_id, operation)
+            else:
+                result = _run_operation(session, user_id, operation)
+            result.index = index
+        except (BatchOperationError, SQLAlchemyError) as e:
+            status = e.status if isinstance(e, BatchOperationError) else 500
+            detail = e.detail if isinstance(e, BatchOperationError) else f"Database error: {e.__class__.__name__}"
+            result = BatchOperationResult(index=index, op=operation.op, status=status, error=detail)
+            failed = mode == "atomic"
+        results.append(result)
+    if failed:
+        raise BatchRolledBack(results)
+    return results
+
+
+def run_batch(db: Session, user_id: int, operations: list, mode: str = "atomic") -> dict:
+    """Run create/update/delete operations as one write (through the writer queue when enabled).
+
+    In atomic mode the first failure rolls back every operation; in best_effort mode
+    each operation runs in a savepoint, so only the failed ones are undone.
+    """
+    try:
+        results = write(db, lambda session: _apply_batch(session, user_id, operations, mode))
+    except BatchRolledBack as e:
+        # Operations that succeeded before the failure were rolled back too
+        for result in e.results:
+            if result.error is None:
+                result.status, result.todo, result.error = 424, None, "Rolled back: a later operation failed"
+        return {"mode": mode, "committed": False, "results": e.results}
+    return {"mode": mode, "committed": True, "results": results}
@@ -1,13 +1,55 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
 from datetime import datetime
-import uvicorn
+from sqlalchemy.exc import OperationalError
 import os
 from api.routes import router
 from api.auth import router as auth_router
 from api.ai import router as ai_router
-from database.sample_data import create_sample_data
+from api.instrumentation import TimingMiddleware, instrument_engine
+from api.compression import CompressionMiddleware
+from api.events import CHANGE_FEED_PG_NOTIFY, change_feed_listener
+from api.metrics import MetricsMiddleware, instrument_pool, metrics_response
+from api.ratelimit import RATE_LIMIT_ENABLED, RateLimitMiddleware
+from api.notifications import REMINDERS_ENABLED, reminder_service, router as notifications_router
+from api.archiver import ARCHIVE_ENABLED, archive_service
+from database.db_models import Base, init_db, shard_engines
+from database.writer import stop_writers
+from starlette.concurrency import run_in_threadpool
+
+# Create missing tables on startup; set AUTO_MIGRATE=false when `python -m database.migrate`
+# runs as a separate deploy step
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "true").lower() == "true"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if AUTO_MIGRATE:
+        try:
+            init_db()
+        except OperationalError as e:
+            # Keep serving; /api/health reports the database state until it comes back
+            print(f"Skipping schema creation, database unavailable: {e}")
+    # Due-date reminder sweep (leader only) and the notification relay to SSE clients
+    if REMINDERS_ENABLED:
+        try:
+            await reminder_service.start()
+        except OperationalError as e:
+            print(f"Reminders disabled, database unavailable: {e}")
+    # Leader-only mover of archived and long-completed todos to todos_archive
+    if ARCHIVE_ENABLED:
+        await archive_service.start()
+    # Relay todo changes NOTIFYed by other workers to this worker's streams
+    if CHANGE_FEED_PG_NOTIFY:
+        change_feed_listener.start()
+    yield
+    await reminder_service.stop()
+    await archive_service.stop()
+    change_feed_listener.stop()
+    # Commit writes still queued for the SQLite writer before exiting
+    await run_in_threadpool(stop_writers)
 
 def custom_openapi():
     if app.openapi_schema:
@@ -68,7 +110,8 @@ def custom_openapi():
 app = FastAPI(
     title="Intelligent Todo API", 
     description="A comprehensive todo application with advanced AI features",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.openapi = custom_openapi
@@ -92,6 +135,11 @@ if alb_dns_name:
         f"https://{alb_dns_name}"
     ])
 
+# Per-client token buckets and per-worker admission control (429/503 + Retry-After).
+# Added before CORS so rejections still carry CORS headers.
+if RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
@@ -100,15 +148,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip/Brotli for responses above COMPRESSION_MIN_BYTES
+app.add_middleware(CompressionMiddleware)
+
+# Per-request wall time, SQL count/time, rows and conversion time (Server-Timing + JSON logs)
+if os.getenv("REQUEST_INSTRUMENTATION", "true").lower() == "true":
+    for shard_engine in shard_engines:
+        instrument_engine(shard_engine, Base)
+    app.add_middleware(TimingMiddleware)
+
+# Prometheus metrics, served at /metrics
+for shard_engine in shard_engines:
+    instrument_pool(shard_engine)
+app.add_middleware(MetricsMiddleware)
+
 # Include all routers with API prefix
 app.include_router(router, prefix="/api")
 app.include_router(auth_router, prefix="/api/auth")
 app.include_router(ai_router, prefix="/api")
+app.include_router(notifications_router, prefix="/api")
 
 @app.get("/", tags=["General"])
 def read_root():
     return {"message": "Intelligent Todo API is running", "version": "1.0.0"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint"""
+    return metrics_response()
+
 @app.get("/api/health", tags=["General"])
 def health_check():
     """Health check endpoint"""
@@ -132,7 +200,11 @@ def health_check():
     }
 
 if __name__ == "__main__":
+    import uvicorn
+    from database.sample_data import create_sample_data
+
     # Create sample data
+    init_db()
     create_sample_data()
     
     uvicorn.run(app, host="0.0.0.0", port=5000)
\ No newline at end of file
@@ -0,0 +1,286 @@
+"""Latency/throughput benchmark for the todo API.
+
+Seeds a database at one of the preset sizes (reused on later runs), then drives
+the main endpoints at each concurrency level and writes p50/p95/p99 latency and
+throughput as JSON, so two commits can be compared with --compare.
+
+    # in-process (ASGI transport, no sockets)
+    python -m benchmarks.api_bench --size 1k --concurrency 1,8,32
+
+    # over HTTP against gunicorn started with gunicorn.conf.py
+    python -m benchmarks.api_bench --size 100k --mode http --workers 4 --output after.json
+
+    # against an already running deployment seeded with the same data
+    python -m benchmarks.api_bench --mode http --base-url http://localhost:5000
+
+    python -m benchmarks.api_bench --size 1k --output after.json --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> (users, mean todos per user)
+SIZES = {
+    "1k": (10, 100),
+    "100k": (1000, 100),
+    "1m": (10000, 100),
+}
+
+BENCH_EMAIL = "user1@example.com"
+BENCH_PASSWORD = "password"
+
+
+def _scenarios(rng: random.Random) -> dict:
+    """name -> function returning (method, path, json body) for one request"""
+    def bulk():
+        return "POST", "/api/todos/bulk-update", {
+            "todo_ids": rng.sample(range(1, 101), 20),
+            "updates": {"priority": rng.choice(["low", "medium", "high", "urgent"])}
+        }
+
+    def import_():
+        return "POST", "/api/todos/import", [
+            {"title": f"Imported todo {i}", "priority": "low", "category": "imported"} for i in range(10)
+        ]
+
+    return {
+        "list": lambda: ("GET", "/api/todos?completed=false&priority=high&limit=50", None),
+        "search": lambda: ("GET", f"/api/search?q={rng.choice(['report', 'book', 'bill', 'plan'])}&limit=20", None),
+        "stats": lambda: ("GET", "/api/statistics", None),
+        "overdue": lambda: ("GET", "/api/todos/overdue", None),
+        "bulk": bulk,
+        "import": import_,
+        "export": lambda: ("GET", "/api/export", None),
+        "login": lambda: ("POST", "/api/auth/login", {"email": BENCH_EMAIL, "password": BENCH_PASSWORD}),
+    }
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def seed(size: str, database_url: str):
+    """Create the schema and load benchmark data unless the database already has it"""
+    from database.db_models import SessionLocal, UserDB, init_db
+    from database.sample_data import generate_sample_data
+
+    init_db()
+    db = SessionLocal()
+    try:
+        seeded = db.query(UserDB).filter(UserDB.email == BENCH_EMAIL).first() is not None
+    finally:
+        db.close()
+    if seeded:
+        print(f"Reusing seeded database {database_url}", file=sys.stderr)
+        return
+    users, per_user = SIZES[size]
+    counts = generate_sample_data(users, per_user, password=BENCH_PASSWORD)
+    print(f"Seeded {counts['users']} users / {counts['todos']} todos in {counts['seconds']}s", file=sys.stderr)
+
+
+async def run_scenario(client, name: str, make_request, concurrency: int, requests: int, headers: dict) -> dict:
+    latencies = []
+    status_codes = {}
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            method, path, body = make_request()
+            started = time.perf_counter()
+            response = await client.request(method, path, json=body, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            status_codes[response.status_code] = status_codes.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": sum(n for code, n in status_codes.items() if code >= 400),
+        "status_codes": {str(code): n for code, n in sorted(status_codes.items())},
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+async def run_all(client, scenario_names: list, concurrencies: list, requests: int, seed_value: int) -> list:
+    response = await client.post("/api/auth/login", json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD})
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    scenarios = _scenarios(random.Random(seed_value))
+    results = []
+    for name in scenario_names:
+        for concurrency in concurrencies:
+            # bcrypt makes login orders of magnitude slower; keep its run short
+            count = max(concurrency, requests // 10) if name == "login" else requests
+            result = await run_scenario(client, name, scenarios[name], concurrency, count, headers)
+            print(f"{name:>8} c={concurrency:<3} p50={result['p50_ms']:>8.2f}ms p95={result['p95_ms']:>8.2f}ms "
+                  f"p99={result['p99_ms']:>8.2f}ms {result['throughput_rps']:>8.1f} req/s errors={result['errors']}",
+                  file=sys.stderr)
+            results.append(result)
+    return results
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(workers: int) -> tuple:
+    import urllib.request
+
+    port = _free_port()
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), BIND=f"127.0.0.1:{port}", REQUEST_LOG_LEVEL="ERROR",
+               RATE_LIMIT_ENABLED="false")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {proc.returncode}")
+        try:
+            urllib.request.urlopen(f"{base_url}/", timeout=1).read()
+            return proc, base_url
+        except OSError:
+            time.sleep(0.1)
+    proc.send_signal(signal.SIGTERM)
+    raise RuntimeError("gunicorn did not start within 60s")
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> int:
+    """Print p95/throughput changes against a baseline report; return the number of regressions"""
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline["results"]}
+    regressions = 0
+    for result in current["results"]:
+        old = previous.get((result["scenario"], result["concurrency"]))
+        if not old or not old["p95_ms"] or not old["throughput_rps"]:
+            continue
+        p95_change = result["p95_ms"] / old["p95_ms"] - 1
+        rps_change = result["throughput_rps"] / old["throughput_rps"] - 1
+        regressed = p95_change > tolerance or rps_change < -tolerance
+        regressions += regressed
+        print(f"{result['scenario']:>8} c={result['concurrency']:<3} p95 {p95_change:+7.1%}  "
+              f"throughput {rps_change:+7.1%}{'  REGRESSION' if regressed else ''}", file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=SIZES, default="1k")
+    parser.add_argument("--mode", choices=["inprocess", "http"], default="inprocess")
+    parser.add_argument("--base-url", help="Benchmark a running server instead of starting one (http mode)")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers in http mode")
+    parser.add_argument("--database-url", help="Database to seed and use (default: a SQLite file per size)")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario and concurrency level")
+    parser.add_argument("--scenarios", default=",".join(_scenarios(random.Random()).keys()))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed p95/throughput change")
+    args = parser.parse_args()
+
+    import httpx
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.gettempdir(), f'todo-bench-{args.size}.db')}"
+    # Must be set before the app modules create the engine
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("REQUEST_LOG_LEVEL", "ERROR")
+    # Measure the API, not the rate limiter
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    sys.path.insert(0, BACKEND_DIR)
+
+    if not args.base_url:
+        seed(args.size, database_url)
+
+    concurrencies = [int(c) for c in args.concurrency.split(",")]
+    scenario_names = args.scenarios.split(",")
+    server = None
+
+    async def run():
+        nonlocal server
+        if args.mode == "inprocess":
+            from app import app
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+                return await run_all(client, scenario_names, concurrencies, args.requests, args.seed)
+        base_url = args.base_url
+        if not base_url:
+            server, base_url = _start_server(args.workers)
+        limits = httpx.Limits(max_connections=max(concurrencies))
+        async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+            return await run_all(client, scenario_names, concurrencies, args.requests, args.seed)
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        if server is not None:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "size": args.size,
+            "mode": args.mode,
+            "workers": args.workers if args.mode == "http" else None,
+            "database": database_url.split("@")[-1],
+            "python": platform.python_version(),
+            "requests_per_level": args.requests,
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Import-time budget check for the API entry point.
+
+Runs `python -X importtime -c "import app"` in a fresh interpreter, prints the
+slowest modules and fails if the total exceeds the budget or if an optional
+subsystem (AI, MCP) was imported eagerly.
+
+    python -m benchmarks.import_time              # report + check against default budget
+    python -m benchmarks.import_time --budget-ms 800 --module mcp.unified_server
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Packages that must only load on first use
+LAZY_MODULES = ["openai", "fastmcp", "httpx"]
+
+DEFAULT_BUDGET_MS = int(os.getenv("IMPORT_BUDGET_MS", "1500"))
+
+
+def measure_import(module: str) -> list:
+    """Return (module, self_us, cumulative_us) rows from -X importtime"""
+    env = dict(os.environ)
+    # Importing must not touch the database; point it somewhere harmless
+    env.setdefault("DATABASE_URL", "sqlite:///:memory:")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nested imports are indented two spaces per level after the separator space
+        rows.append((name[1:].rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app", help="Module to import (default: app)")
+    parser.add_argument("--budget-ms", type=int, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest modules to show")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    rows = measure_import(args.module)
+    total_ms = next(cum for name, _, cum in rows if name == args.module) / 1000
+    loaded = {r[0].strip() for r in rows}
+    eager = [m for m in LAZY_MODULES if m in loaded]
+    # Direct and second-level dependencies show which packages dominate the budget
+    shallow = [r for r in rows if r[0].startswith("  ") and not r[0].startswith("      ")]
+    slowest = sorted(shallow, key=lambda r: r[2], reverse=True)[:args.top]
+
+    report = {
+        "module": args.module,
+        "total_ms": round(total_ms, 1),
+        "budget_ms": args.budget_ms,
+        "eager_optional_imports": eager,
+        "slowest": [{"module": name.strip(), "cumulative_ms": round(cum / 1000, 1)} for name, _, cum in slowest]
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import {args.module}: {report['total_ms']} ms (budget {args.budget_ms} ms)")
+        for entry in report["slowest"]:
+            print(f"  {entry['cumulative_ms']:>8.1f} ms  {entry['module']}")
+
+    failed = False
+    if eager:
+        print(f"FAIL: optional subsystems imported eagerly: {', '.join(eager)}", file=sys.stderr)
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"FAIL: import took {total_ms:.1f} ms, budget is {args.budget_ms} ms", file=sys.stderr)
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Per-call overhead of the hot TodoDatabase lookups, legacy Query versus prebuilt select().
+
+Seeds a throwaway SQLite database (or the scratch database given with
+--database-url, e.g. PostgreSQL for the prepared statements), then times
+get_todo, get_todos_by_user, get_user_by_id and get_user_by_email as they are
+now against the db.query(...) versions they replaced, both returning the same
+Pydantic models. Each call runs in a fresh session, like a request, so the
+identity map does not answer it.
+
+    python -m benchmarks.query_overhead --calls 5000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+
+def _legacy(db, name: str, value):
+    """The lookups as they were: a Query built and compiled on every call"""
+    from database.database import db_todo_to_pydantic
+    from database.db_models import TodoArchiveDB, TodoDB, UserDB
+
+    if name == "get_todo":
+        db_todo = (db.query(TodoDB).filter(TodoDB.id == value).first()
+                   or db.query(TodoArchiveDB).filter(TodoArchiveDB.id == value).first())
+        return db_todo_to_pydantic(db_todo) if db_todo else None
+    if name == "get_todos_by_user":
+        db_todos = (
+            db.query(TodoDB).filter(TodoDB.user_id == value)
+            .order_by(TodoDB.created_at.desc(), TodoDB.id.desc()).all()
+        )
+        return [db_todo_to_pydantic(db_todo) for db_todo in db_todos]
+    if name == "get_user_by_id":
+        return db.query(UserDB).filter(UserDB.id == value).first()
+    return db.query(UserDB).filter(UserDB.email == value).first()
+
+
+def _current(db, name: str, value):
+    """The same lookups through the public TodoDatabase methods"""
+    from database.database import todo_db
+
+    return getattr(todo_db, name)(db, value)
+
+
+def _seed(users: int, todos_per_user: int):
+    from database.database import todo_db
+    from database.db_models import SessionLocal, init_db
+
+    init_db()
+    with SessionLocal() as db:
+        for u in range(users):
+            user = todo_db.create_user(db, {"email": f"user{u}@example.com", "name": f"User {u}", "password": "x"})
+            for i in range(todos_per_user):
+                todo_db.create_todo(db, {"title": f"Todo {i}", "user_id": user.id, "category": "bench"}, commit=False)
+            db.commit()
+
+
+def measure(calls: int, users: int) -> list:
+    from database.db_models import SessionLocal
+
+    arguments = {
+        "get_todo": lambda i: i % (users * 5) + 1,
+        "get_todos_by_user": lambda i: i % users + 1,
+        "get_user_by_id": lambda i: i % users + 1,
+        "get_user_by_email": lambda i: f"user{i % users}@example.com",
+    }
+    results = []
+    for name, argument in arguments.items():
+        row = {"lookup": name}
+        for label, lookup in (("legacy_us", _legacy), ("select_us", _current)):
+            db = SessionLocal()
+            # Warm up the statement cache and the connection
+            lookup(db, name, argument(0))
+            db.close()
+            started = time.perf_counter()
+            for i in range(calls):
+                db = SessionLocal()
+                lookup(db, name, argument(i))
+                db.close()
+            row[label] = round((time.perf_counter() - started) / calls * 1e6, 1)
+        row["saved_pct"] = round((1 - row["select_us"] / row["legacy_us"]) * 100, 1)
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=5000, help="Calls per lookup and variant")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--database-url", help="Empty scratch database to seed and use instead of a SQLite file")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="query-overhead-"), "bench.db")
+    os.environ.update(DATABASE_URL=args.database_url or f"sqlite:///{path}", CACHE_BACKEND="none")
+    _seed(args.users, 5)
+    print(json.dumps(measure(args.calls, args.users), indent=2))
+
+
+if __name__ == "__main__":
+    main()
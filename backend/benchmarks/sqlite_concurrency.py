@@ -0,0 +1,142 @@
+"""Concurrent writes against one SQLite file, with and without the performance mode.
+
+Runs several processes (like gunicorn workers), each with several threads acting
+as request handlers: look up the user (a read, as get_current_user does), then
+create or toggle a todo through database.writer.write(). Reports throughput,
+latency percentiles and how many writes failed with "database is locked".
+
+- baseline: rollback journal, fsync per commit, each request commits on its own
+- tuned: WAL + synchronous=NORMAL pragmas and the group-committing writer thread
+- coalesced: tuned, plus the writer lingers WRITE_COALESCE_MS for more writes and
+  commits with synchronous=FULL
+
+    python -m benchmarks.sqlite_concurrency --processes 4 --threads 8 --writes 200
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+
+MODES = {
+    "baseline": {"SQLITE_PERFORMANCE_MODE": "false", "SQLITE_WRITER_ENABLED": "false", "WRITE_COALESCING_ENABLED": "false"},
+    "tuned": {"SQLITE_PERFORMANCE_MODE": "true", "SQLITE_WRITER_ENABLED": "true", "WRITE_COALESCING_ENABLED": "false"},
+    "coalesced": {"SQLITE_PERFORMANCE_MODE": "true", "SQLITE_WRITER_ENABLED": "true", "WRITE_COALESCING_ENABLED": "true"},
+}
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _worker(threads: int, writes: int, seed: int, results):
+    # Imported here: the engine reads DATABASE_URL and the mode from the environment
+    from sqlalchemy.exc import OperationalError
+    from database.database import todo_db
+    from database.db_models import SessionLocal
+    from database.writer import write, writer_for
+
+    latencies, errors, locked = [], [], []
+
+    def run(thread_index: int):
+        rng = random.Random(seed * 1000 + thread_index)
+        for i in range(writes):
+            started = time.perf_counter()
+            db = SessionLocal()
+            try:
+                user_id = todo_db.get_user_by_id(db, 1).id
+                if i % 2 == 0:
+                    data = {"title": f"Concurrent {seed}-{thread_index}-{i}", "user_id": user_id, "category": "bench"}
+                    write(db, lambda session: todo_db.create_todo(session, data, commit=False))
+                else:
+                    todo_id = rng.randint(1, 100)
+                    update = {"completed": bool(rng.getrandbits(1))}
+                    write(db, lambda session: todo_db.update_user_todo(session, todo_id, user_id, update, commit=False))
+                latencies.append(time.perf_counter() - started)
+            except OperationalError as e:
+                db.rollback()
+                (locked if "database is locked" in str(e) else errors).append(str(e))
+            finally:
+                db.close()
+
+    pool = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    writer = writer_for(0)
+    writer.stop()
+    # Without the writer every successful write is its own commit
+    commits = writer.commits or len(latencies)
+    results.put({"latencies": latencies, "locked": len(locked), "errors": len(errors), "commits": commits})
+
+
+def _seed(database_url: str):
+    from database.db_models import SessionLocal, init_db
+    from database.database import todo_db
+
+    init_db()
+    db = SessionLocal()
+    try:
+        todo_db.create_user(db, {"email": "bench@example.com", "name": "Bench", "password": "x"})
+        for i in range(100):
+            todo_db.create_todo(db, {"title": f"Seed {i}", "user_id": 1, "category": "bench"}, commit=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def measure(mode: str, processes: int, threads: int, writes: int) -> dict:
+    path = os.path.join(tempfile.mkdtemp(prefix="sqlite-concurrency-"), "bench.db")
+    os.environ.update(MODES[mode], DATABASE_URL=f"sqlite:///{path}", REMINDERS_ENABLED="false")
+    # Fresh interpreters, so each mode imports the engine with its own settings
+    context = multiprocessing.get_context("spawn")
+    seeder = context.Process(target=_seed, args=(os.environ["DATABASE_URL"],))
+    seeder.start()
+    seeder.join()
+
+    results = context.Queue()
+    started = time.perf_counter()
+    workers = [context.Process(target=_worker, args=(threads, writes, p, results)) for p in range(processes)]
+    for worker in workers:
+        worker.start()
+    reports = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for report in reports for latency in report["latencies"])
+    return {
+        "mode": mode,
+        "writes": processes * threads * writes,
+        "succeeded": len(latencies),
+        "database_locked": sum(report["locked"] for report in reports),
+        "other_errors": sum(report["errors"] for report in reports),
+        "commits": sum(report["commits"] for report in reports),
+        "writes_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8, help="Request threads per process")
+    parser.add_argument("--writes", type=int, default=200, help="Writes per thread")
+    parser.add_argument("--mode", choices=list(MODES), action="append", help="Default: every mode")
+    args = parser.parse_args()
+
+    results = [measure(mode, args.processes, args.threads, args.writes) for mode in args.mode or MODES]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
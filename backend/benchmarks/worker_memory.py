@@ -0,0 +1,108 @@
+"""Boot time and per-worker memory of the gunicorn deployment (Linux only).
+
+Starts gunicorn twice -- once with the plain command line the image used to run,
+once with gunicorn.conf.py (preload + fork) -- waits until every worker is up,
+and reports boot time plus RSS, PSS and private memory per worker.
+
+    python -m benchmarks.worker_memory --workers 4
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    # gunicorn reads ./gunicorn.conf.py by default, so the baseline points at an empty config
+    "per-worker import": ["-c", os.devnull, "--worker-class", "uvicorn.workers.UvicornWorker"],
+    "preload + fork": ["-c", "gunicorn.conf.py"],
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _children(pid: int) -> list:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def _memory_kb(pid: int) -> dict:
+    """Rss/Pss/private memory from /proc/<pid>/smaps_rollup"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss_mb": round(values["Rss"] / 1024, 1),
+        "pss_mb": round(values["Pss"] / 1024, 1),
+        "private_mb": round((values["Private_Clean"] + values["Private_Dirty"]) / 1024, 1),
+    }
+
+
+def measure(mode: str, workers: int, settle: float) -> dict:
+    port = _free_port()
+    env = dict(os.environ, BIND=f"127.0.0.1:{port}")
+    env.setdefault("DATABASE_URL", "sqlite:////tmp/worker_memory_bench.db")
+    cmd = [sys.executable, "-m", "gunicorn", *MODES[mode], "--workers", str(workers),
+           "--bind", f"127.0.0.1:{port}", "app:app"]
+
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with {proc.returncode} in mode '{mode}'")
+            try:
+                if len(_children(proc.pid)) == workers:
+                    urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1).read()
+                    break
+            except OSError:
+                pass
+            time.sleep(0.02)
+        boot_seconds = time.perf_counter() - start
+
+        # Let every worker serve a request so lazily built state is counted
+        for _ in range(workers * 4):
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health", timeout=5).read()
+        time.sleep(settle)
+
+        per_worker = [_memory_kb(pid) for pid in _children(proc.pid)]
+        return {
+            "mode": mode,
+            "workers": workers,
+            "boot_seconds": round(boot_seconds, 2),
+            "master": _memory_kb(proc.pid),
+            "worker_avg": {
+                key: round(sum(w[key] for w in per_worker) / len(per_worker), 1)
+                for key in ("rss_mb", "pss_mb", "private_mb")
+            },
+        }
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--settle", type=float, default=1.0, help="Seconds to wait before sampling memory")
+    args = parser.parse_args()
+
+    results = [measure(mode, args.workers, args.settle) for mode in MODES]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,39 @@
-from typing import Dict, List, Optional
-from datetime import datetime
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+from datetime import datetime, date, timedelta
+import os
+import time
 
-import mcp
-from sqlalchemy.orm import Session
-from api.models import Todo, TodoStats, Priority
-from database.db_models import TodoDB, UserDB, PriorityEnum, get_db
+from sqlalchemy import (
+    and_, bindparam, case, delete, exists, func, insert, inspect, literal, or_, select, text, union_all, update
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, aliased
+from api.models import Todo, TodoStats, Priority, Notification, RetentionPolicy
+from api.instrumentation import record_conversion
+from api.cache import cached, invalidate_on_commit
+from api.coalesce import coalesce
+from api.events import publish_change
+from database.db_models import (
+    TodoDB, TodoArchiveDB, TodoTombstoneDB, UserDB, CategoryDB, NotificationDB, PriorityEnum, get_db,
+    engine, shard_for_new_user, use_shard
+)
+
+# On PostgreSQL run the hot lookups as server-side prepared statements, planned once per connection.
+# Turn off behind a transaction-pooling proxy (e.g. PgBouncer), where sessions are not kept per client.
+PG_PREPARED_STATEMENTS = (
+    engine.dialect.name == "postgresql"
+    and os.getenv("PG_PREPARED_STATEMENTS", "true").lower() == "true"
+)
+
+# updated_at and tombstone ids are assigned before commit, so a slow transaction can commit
+# changes behind a position a client already synced past. Sync positions therefore stay this
+# far behind the clock, and changes within the window are sent again on the next sync.
+SYNC_TOKEN_LAG_SECONDS = float(os.getenv("SYNC_TOKEN_LAG_SECONDS", "30"))
+
+# Rows deleted per transaction by purges, so none of them holds locks or grows the WAL for long
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "1000"))
 
 
 def convert_priority_to_enum(priority: Priority) -> PriorityEnum:
@@ -17,9 +46,18 @@ def convert_enum_to_priority(priority_enum: PriorityEnum) -> Priority:
     return Priority(priority_enum.value)
 
 
+def project_todo_row(fields: List[str], row) -> dict:
+    """Row of selected TodoDB columns as a JSON-ready dict"""
+    return {
+        field: value.value if isinstance(value, PriorityEnum) else value
+        for field, value in zip(fields, row)
+    }
+
+
 def db_todo_to_pydantic(db_todo: TodoDB) -> Todo:
     """Convert SQLAlchemy TodoDB to Pydantic Todo"""
-    return Todo(
+    started = time.perf_counter()
+    todo = Todo(
         id=db_todo.id,
         title=db_todo.title,
         description=db_todo.description,
@@ -33,38 +71,412 @@ def db_todo_to_pydantic(db_todo: TodoDB) -> Todo:
         created_at=db_todo.created_at,
         updated_at=db_todo.updated_at
     )
+    record_conversion(time.perf_counter() - started)
+    return todo
+
+
+# The hot lookups, built once: executing the same statement object skips rebuilding a
+# Query on every call and reuses its compiled SQL from the engine's statement cache.
+# name: (model, key column, ORDER BY, statement)
+LOOKUPS = {
+    "todo_by_id": (TodoDB, "id", None, select(TodoDB).where(TodoDB.id == bindparam("value"))),
+    "archived_todo_by_id": (
+        TodoArchiveDB, "id", None, select(TodoArchiveDB).where(TodoArchiveDB.id == bindparam("value"))
+    ),
+    # Newest first, like the todo list
+    "todos_by_user": (
+        TodoDB, "user_id", "created_at DESC, id DESC",
+        select(TodoDB).where(TodoDB.user_id == bindparam("value")).order_by(TodoDB.created_at.desc(), TodoDB.id.desc())
+    ),
+    "user_by_id": (UserDB, "id", None, select(UserDB).where(UserDB.id == bindparam("value"))),
+    "user_by_email": (UserDB, "email", None, select(UserDB).where(UserDB.email == bindparam("value"))),
+}
 
 
 class TodoDatabase:
     def __init__(self):
-        pass
+        # EXECUTE statements of the PostgreSQL prepared lookups, loading the same entity
+        self._executes = {
+            name: select(model).from_statement(text(f"EXECUTE {name}(:value)"))
+            for name, (model, _, _, _) in LOOKUPS.items()
+        }
+
+    def _lookup(self, db: Session, name: str, value):
+        """Result of one of the LOOKUPS: a prepared statement on PostgreSQL, else the prebuilt select"""
+        model, column, order_by, statement = LOOKUPS[name]
+        if PG_PREPARED_STATEMENTS:
+            connection = db.connection(bind_arguments={"mapper": inspect(model)})
+            # Prepared statements live as long as the DBAPI connection, so track them on its pool record
+            prepared = connection.info.setdefault("prepared_lookups", set())
+            if name not in prepared:
+                table = model.__table__
+                columns = ", ".join(table_column.name for table_column in table.columns)
+                sql = f"PREPARE {name} AS SELECT {columns} FROM {table.name} WHERE {column} = $1"
+                if order_by:
+                    sql += f" ORDER BY {order_by}"
+                connection.exec_driver_sql(sql)
+                prepared.add(name)
+            statement = self._executes[name]
+        return db.execute(statement, {"value": value}).scalars()
+
+    def _todo_changed(self, db: Session, user_id: Optional[int], data: dict):
+        """Once the session commits: invalidate cached reads and notify the user's change feed"""
+        # Invalidated first, so clients that refetch on the delta get fresh data
+        invalidate_on_commit(db, user_id)
+        publish_change(db, user_id, data)
+
+    def _category_id(self, db: Session, user_id: Optional[int], name: Optional[str]) -> Optional[int]:
+        """Id of the user's category row for `name`, created on first use"""
+        if user_id is None or not name:
+            return None
+        lookup = db.query(CategoryDB.id).filter(CategoryDB.user_id == user_id, CategoryDB.name == name)
+        category_id = lookup.scalar()
+        if category_id is None:
+            dialect_insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+            # A concurrent request may create the same category; let the unique constraint settle it
+            db.execute(
+                dialect_insert(CategoryDB)
+                .values(user_id=user_id, name=name, todo_count=0)
+                .on_conflict_do_nothing(index_elements=["user_id", "name"])
+            )
+            category_id = lookup.scalar()
+        return category_id
 
-    def create_todo(self, db: Session, todo_data: dict) -> Todo:
+    def _count_in_category(self, db: Session, category_id: Optional[int], delta: int):
+        if category_id is not None:
+            db.query(CategoryDB).filter(CategoryDB.id == category_id).update(
+                {CategoryDB.todo_count: CategoryDB.todo_count + delta}, synchronize_session=False
+            )
+
+    def create_todo(self, db: Session, todo_data: dict, commit: bool = True) -> Todo:
         # Convert priority if present
         if "priority" in todo_data:
             todo_data["priority"] = convert_priority_to_enum(todo_data["priority"])
         
         db_todo = TodoDB(**todo_data)
+        db_todo.category_id = self._category_id(db, db_todo.user_id, db_todo.category)
+        self._count_in_category(db, db_todo.category_id, 1)
         db.add(db_todo)
-        db.commit()
-        db.refresh(db_todo)
-        return db_todo_to_pydantic(db_todo)
+        # Flush assigns the id and defaults, so the todo can be converted and
+        # published with the commit instead of re-selected after it
+        db.flush()
+        todo = db_todo_to_pydantic(db_todo)
+        self._todo_changed(db, todo.user_id, {"op": "created", "id": todo.id, "todo": todo.model_dump(mode="json")})
+        # commit=False leaves the change in the caller's transaction (see api.utils.run_batch)
+        if commit:
+            db.commit()
+        return todo
 
     def get_todo(self, db: Session, todo_id: int) -> Optional[Todo]:
-        db_todo = db.query(TodoDB).filter(TodoDB.id == todo_id).first()
+        db_todo = self._lookup(db, "todo_by_id", todo_id).first()
+        if db_todo is None:
+            # Direct links to archived todos keep working; a primary key lookup either way
+            db_todo = self._lookup(db, "archived_todo_by_id", todo_id).first()
         return db_todo_to_pydantic(db_todo) if db_todo else None
 
+    def _todo_source(self, include_archived: bool = False, user_id: Optional[int] = None):
+        """TodoDB, or with `include_archived` an alias of it over todos UNION ALL todos_archive,
+        holding only `user_id`'s rows when given so each side scans its user_id index"""
+        if not include_archived:
+            return TodoDB
+        todos, archive = TodoDB.__table__, TodoArchiveDB.__table__
+        hot = select(todos)
+        cold = select(*(archive.c[column.name] for column in todos.columns))
+        if user_id is not None:
+            hot = hot.where(todos.c.user_id == user_id)
+            cold = cold.where(archive.c.user_id == user_id)
+        return aliased(TodoDB, union_all(hot, cold).subquery("todos_all"))
 
     def get_all_todos(self, db: Session) -> List[Todo]:
         db_todos = db.query(TodoDB).all()
         return [db_todo_to_pydantic(db_todo) for db_todo in db_todos]
 
+    def _project(self, query, fields: List[str], todos=TodoDB) -> List[dict]:
+        """Run a TodoDB query selecting only `fields` (Todo field names)"""
+        rows = query.with_entities(*(getattr(todos, field) for field in fields)).all()
+        return [project_todo_row(fields, row) for row in rows]
+
     def get_todos_by_user(self, db: Session, user_id: int) -> List[Todo]:
-        """Get all todos for a specific user"""
-        db_todos = db.query(TodoDB).filter(TodoDB.user_id == user_id).all()
+        """Get all todos for a specific user, newest first"""
+        db_todos = self._lookup(db, "todos_by_user", user_id).all()
         return [db_todo_to_pydantic(db_todo) for db_todo in db_todos]
 
-    def update_todo(self, db: Session, todo_id: int, update_data: dict) -> Optional[Todo]:
+    def _filtered_query(
+        self,
+        db: Session,
+        user_id: Optional[int] = None,
+        completed: Optional[bool] = None,
+        priority: Optional[Priority] = None,
+        category: Optional[str] = None,
+        due_before: Optional[date] = None,
+        todos=TodoDB
+    ):
+        query = db.query(todos)
+        if user_id is not None:
+            query = query.filter(todos.user_id == user_id)
+        if completed is not None:
+            query = query.filter(todos.completed == completed)
+        if priority is not None:
+            query = query.filter(todos.priority == convert_priority_to_enum(priority))
+        if category is not None:
+            # Match the category row once, then todos by its integer key
+            query = query.join(CategoryDB, CategoryDB.id == todos.category_id).filter(CategoryDB.name == category)
+            if user_id is not None:
+                query = query.filter(CategoryDB.user_id == user_id)
+        if due_before is not None:
+            query = query.filter(todos.due_date <= due_before)
+        return query
+
+    def get_todos_filtered(
+        self,
+        db: Session,
+        user_id: int,
+        completed: Optional[bool] = None,
+        priority: Optional[Priority] = None,
+        category: Optional[str] = None,
+        due_before: Optional[date] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+        include_archived: bool = False
+    ) -> List[Todo]:
+        """Get a user's todos matching the filters, newest first, with offset pagination.
+
+        With `fields`, only those columns are selected and dicts are returned.
+        """
+        todos = self._todo_source(include_archived, user_id)
+        query = self._filtered_query(db, user_id, completed, priority, category, due_before, todos)
+        # Ids break ties between todos created in the same instant, so pages do not overlap
+        query = query.order_by(todos.created_at.desc(), todos.id.desc()).offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        if fields:
+            return self._project(query, fields, todos)
+        return [db_todo_to_pydantic(db_todo) for db_todo in query.all()]
+
+    def search_todos(
+        self,
+        db: Session,
+        user_id: int,
+        text: str,
+        include_completed: bool = True,
+        limit: Optional[int] = 50,
+        fields: Optional[List[str]] = None,
+        include_archived: bool = False
+    ) -> List[Todo]:
+        """Case-insensitive substring search over a user's todos' title, description and category.
+
+        Ranked in SQL: title matches score 3, description 2, category 1; ties by id.
+        """
+        todos = self._todo_source(include_archived, user_id)
+        needle = text.lower()
+        title_match = func.lower(todos.title).contains(needle, autoescape=True)
+        description_match = func.lower(todos.description).contains(needle, autoescape=True)
+        category_match = func.lower(todos.category).contains(needle, autoescape=True)
+        score = (
+            case((title_match, 3), else_=0)
+            + case((description_match, 2), else_=0)
+            + case((category_match, 1), else_=0)
+        )
+        query = db.query(todos).filter(todos.user_id == user_id, or_(title_match, description_match, category_match))
+        if not include_completed:
+            query = query.filter(todos.completed == False)
+        query = query.order_by(score.desc(), todos.id)
+        if limit:
+            query = query.limit(limit)
+        if fields:
+            return self._project(query, fields, todos)
+        return [db_todo_to_pydantic(db_todo) for db_todo in query.all()]
+
+    @cached("categories")
+    def get_categories(self, db: Session, user_id: int) -> List[str]:
+        """Names of the user's categories that have todos, from the categories table"""
+        rows = (
+            db.query(CategoryDB.name)
+            .filter(CategoryDB.user_id == user_id, CategoryDB.todo_count > 0)
+            .order_by(CategoryDB.name)
+            .all()
+        )
+        return [name for (name,) in rows]
+
+    def get_todos_page(
+        self,
+        db: Session,
+        user_id: Optional[int] = None,
+        completed: Optional[bool] = None,
+        priority: Optional[Priority] = None,
+        category: Optional[str] = None,
+        due_before: Optional[date] = None,
+        cursor: Optional[int] = None,
+        limit: int = 50,
+        fields: Optional[List[str]] = None
+    ) -> Tuple[List[Todo], Optional[int]]:
+        """Get one page of todos (newest first) and the cursor for the next page.
+
+        With `fields` (which must include "id"), only those columns are selected and
+        dicts are returned.
+        """
+        query = self._filtered_query(db, user_id, completed, priority, category, due_before)
+        if cursor is not None:
+            query = query.filter(TodoDB.id < cursor)
+
+        # Fetch one extra row to know whether another page exists
+        query = query.order_by(TodoDB.id.desc()).limit(limit + 1)
+        if fields:
+            rows = self._project(query, fields)
+            next_cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+            return rows[:limit], next_cursor
+        db_todos = query.all()
+        next_cursor = db_todos[limit - 1].id if len(db_todos) > limit else None
+        return [db_todo_to_pydantic(db_todo) for db_todo in db_todos[:limit]], next_cursor
+
+    def get_open_todos_by_due_date(
+        self,
+        db: Session,
+        user_id: int,
+        due_from: Optional[date] = None,
+        due_before: Optional[date] = None,
+        after: Optional[Tuple[date, int]] = None,
+        limit: int = 50
+    ) -> Tuple[List[Todo], Optional[Tuple[date, int]]]:
+        """Incomplete todos with due_from <= due_date < due_before, ordered by (due_date, id).
+
+        Served by the (user_id, completed, due_date) index, so the cost follows the
+        page size. `after` is the (due_date, id) of the last todo on the previous page.
+        """
+        query = db.query(TodoDB).filter(
+            TodoDB.user_id == user_id,
+            TodoDB.completed == False,
+            TodoDB.due_date.isnot(None)
+        )
+        if due_from is not None:
+            query = query.filter(TodoDB.due_date >= due_from)
+        if due_before is not None:
+            query = query.filter(TodoDB.due_date < due_before)
+        if after is not None:
+            after_date, after_id = after
+            query = query.filter(or_(
+                TodoDB.due_date > after_date,
+                and_(TodoDB.due_date == after_date, TodoDB.id > after_id)
+            ))
+
+        db_todos = query.order_by(TodoDB.due_date, TodoDB.id).limit(limit + 1).all()
+        next_after = None
+        if len(db_todos) > limit:
+            last = db_todos[limit - 1]
+            next_after = (last.due_date, last.id)
+        return [db_todo_to_pydantic(db_todo) for db_todo in db_todos[:limit]], next_after
+
+    def get_changes(
+        self,
+        db: Session,
+        user_id: int,
+        since: Optional[Tuple[datetime, int, int]] = None,
+        limit: int = 500
+    ) -> Tuple[List[Todo], List[int], Tuple[datetime, int, int], bool]:
+        """Todos changed and ids deleted after a sync position.
+
+        A position is (updated_at, todo id, tombstone id): changed todos are read in
+        (updated_at, id) order from the (user_id, updated_at, id) index and deletions
+        from the user's tombstones by id, so a sync costs the number of changes. With
+        no position every todo is returned and earlier deletions are skipped. The next
+        position does not pass changes made within SYNC_TOKEN_LAG_SECONDS, which are
+        returned again next time, unless a whole page is that recent.
+        Returns (changed, deleted ids, next position, has_more).
+        """
+        horizon = datetime.utcnow() - timedelta(seconds=SYNC_TOKEN_LAG_SECONDS)
+        query = db.query(TodoDB).filter(TodoDB.user_id == user_id)
+        tombstones = db.query(TodoTombstoneDB).filter(TodoTombstoneDB.user_id == user_id)
+        if since is not None:
+            updated_after, todo_after, tombstone_after = since
+            query = query.filter(or_(
+                TodoDB.updated_at > updated_after,
+                and_(TodoDB.updated_at == updated_after, TodoDB.id > todo_after)
+            ))
+        else:
+            updated_after, todo_after = datetime.min, 0
+            tombstone_after = db.query(func.max(TodoTombstoneDB.id)).filter(
+                TodoTombstoneDB.user_id == user_id, TodoTombstoneDB.deleted_at < horizon
+            ).scalar() or 0
+
+        db_todos = query.order_by(TodoDB.updated_at, TodoDB.id).limit(limit + 1).all()
+        db_tombstones = (
+            tombstones.filter(TodoTombstoneDB.id > tombstone_after)
+            .order_by(TodoTombstoneDB.id)
+            .limit(limit + 1)
+            .all()
+        )
+        todos_more, tombstones_more = len(db_todos) > limit, len(db_tombstones) > limit
+        db_todos, db_tombstones = db_todos[:limit], db_tombstones[:limit]
+
+        settled_todos = [db_todo for db_todo in db_todos if db_todo.updated_at < horizon]
+        if settled_todos or todos_more:
+            last = (settled_todos or db_todos)[-1]
+            updated_after, todo_after = last.updated_at, last.id
+        settled_tombstones = [tombstone for tombstone in db_tombstones if tombstone.deleted_at < horizon]
+        if settled_tombstones or tombstones_more:
+            tombstone_after = (settled_tombstones or db_tombstones)[-1].id
+        # Tombstones are sent again within the lag window, by then an id may be live again
+        # (reused on SQLite, or moved back from the archive): the live row wins
+        deleted_ids = list(dict.fromkeys(t.todo_id for t in db_tombstones))
+        live_ids = {db_todo.id for db_todo in db_todos}
+        if deleted_ids:
+            live_ids.update(
+                todo_id for (todo_id,) in db.query(TodoDB.id).filter(
+                    TodoDB.user_id == user_id, TodoDB.id.in_(deleted_ids)
+                )
+            )
+        deleted = [todo_id for todo_id in deleted_ids if todo_id not in live_ids]
+        has_more = todos_more or tombstones_more
+        return (
+            [db_todo_to_pydantic(db_todo) for db_todo in db_todos],
+            deleted,
+            (updated_after, todo_after, tombstone_after),
+            has_more
+        )
+
+    @cached("summary")
+    def get_summary(self, db: Session, user_id: Optional[int] = None, top_categories: int = 5) -> dict:
+        """Aggregate counts computed in SQL, so the result size does not grow with the table"""
+        base = db.query(TodoDB)
+        if user_id is not None:
+            base = base.filter(TodoDB.user_id == user_id)
+
+        total = base.count()
+        completed = base.filter(TodoDB.completed == True).count()
+        overdue = base.filter(
+            TodoDB.completed == False,
+            TodoDB.due_date < date.today()
+        ).count()
+
+        if user_id is not None:
+            # Maintained counts: no scan of the user's todos
+            categories = (
+                db.query(CategoryDB.name, CategoryDB.todo_count)
+                .filter(CategoryDB.user_id == user_id, CategoryDB.todo_count > 0)
+                .order_by(CategoryDB.todo_count.desc())
+                .limit(top_categories)
+                .all()
+            )
+        else:
+            categories = (
+                db.query(TodoDB.category, func.count(TodoDB.id))
+                .filter(TodoDB.category.isnot(None))
+                .group_by(TodoDB.category)
+                .order_by(func.count(TodoDB.id).desc())
+                .limit(top_categories)
+                .all()
+            )
+
+        return {
+            "total": total,
+            "completed": completed,
+            "pending": total - completed,
+            "overdue": overdue,
+            "top_categories": {category: count for category, count in categories}
+        }
+
+    def update_todo(self, db: Session, todo_id: int, update_data: dict, commit: bool = True) -> Optional[Todo]:
         db_todo = db.query(TodoDB).filter(TodoDB.id == todo_id).first()
         if not db_todo:
             return None
@@ -76,70 +488,455 @@ class TodoDatabase:
         # Update fields
         for field, value in update_data.items():
             setattr(db_todo, field, value)
+
+        if "category" in update_data:
+            category_id = self._category_id(db, db_todo.user_id, db_todo.category)
+            if category_id != db_todo.category_id:
+                self._count_in_category(db, db_todo.category_id, -1)
+                self._count_in_category(db, category_id, 1)
+                db_todo.category_id = category_id
         
         db_todo.updated_at = datetime.utcnow()
+        db.flush()
+        todo = db_todo_to_pydantic(db_todo)
+        self._todo_changed(db, todo.user_id, {"op": "updated", "id": todo.id, "todo": todo.model_dump(mode="json")})
+        if commit:
+            db.commit()
+        return todo
+
+    def update_user_todo(
+        self,
+        db: Session,
+        todo_id: int,
+        user_id: int,
+        update_data: dict,
+        commit: bool = True
+    ) -> Optional[Todo]:
+        """Update a todo owned by `user_id`; None if there is none.
+
+        Without a category change this is one UPDATE ... RETURNING. A category change
+        first reads the previous category id with SELECT ... FOR UPDATE (and looks up or
+        creates the new category) so the counts can be moved: SQLite's RETURNING only
+        sees the updated row, so the old id cannot come back from the UPDATE itself.
+        """
+        todos = TodoDB.__table__
+        owned = and_(todos.c.id == todo_id, todos.c.user_id == user_id)
+        values = dict(update_data)
+        if "priority" in values:
+            values["priority"] = convert_priority_to_enum(values["priority"])
+        if "category" in values:
+            previous = db.execute(select(todos.c.category_id).where(owned).with_for_update()).first()
+            if previous is None:
+                if self._restore_archived(db, todo_id, user_id):
+                    return self.update_user_todo(db, todo_id, user_id, update_data, commit)
+                return None
+            values["category_id"] = self._category_id(db, user_id, values["category"])
+        values["updated_at"] = datetime.utcnow()
+
+        row = db.execute(update(todos).where(owned).values(**values).returning(*todos.c)).first()
+        if row is None:
+            if self._restore_archived(db, todo_id, user_id):
+                return self.update_user_todo(db, todo_id, user_id, update_data, commit)
+            return None
+        if "category" in values and values["category_id"] != previous.category_id:
+            self._count_in_category(db, previous.category_id, -1)
+            self._count_in_category(db, values["category_id"], 1)
+        todo = db_todo_to_pydantic(row)
+        self._todo_changed(db, user_id, {"op": "updated", "id": todo.id, "todo": todo.model_dump(mode="json")})
+        if commit:
+            db.commit()
+        return todo
+
+    def delete_user_todo(self, db: Session, todo_id: int, user_id: int, commit: bool = True) -> Optional[Todo]:
+        """Delete a todo owned by `user_id` with one DELETE ... RETURNING; None if there is none"""
+        todos = TodoDB.__table__
+        row = db.execute(
+            delete(todos).where(todos.c.id == todo_id, todos.c.user_id == user_id).returning(*todos.c)
+        ).first()
+        if row is None:
+            if self._restore_archived(db, todo_id, user_id):
+                return self.delete_user_todo(db, todo_id, user_id, commit)
+            return None
+        todo = db_todo_to_pydantic(row)
+        self._count_in_category(db, row.category_id, -1)
+        db.add(TodoTombstoneDB(todo_id=todo.id, user_id=user_id, deleted_at=datetime.utcnow()))
+        self._todo_changed(db, user_id, {"op": "deleted", "id": todo.id})
+        if commit:
+            db.commit()
+        return todo
+
+    def todo_exists(self, db: Session, todo_id: int) -> bool:
+        return db.query(
+            or_(exists().where(TodoDB.id == todo_id), exists().where(TodoArchiveDB.id == todo_id))
+        ).scalar()
+
+    def _restore_archived(self, db: Session, todo_id: int, user_id: int) -> bool:
+        """Move a user's todo back from todos_archive, so it can be edited or deleted there"""
+        todos, archive = TodoDB.__table__, TodoArchiveDB.__table__
+        columns = [column.name for column in todos.columns]
+        owned = and_(archive.c.id == todo_id, archive.c.user_id == user_id)
+        restored = db.execute(
+            insert(todos).from_select(columns, select(*(archive.c[name] for name in columns)).where(owned))
+        ).rowcount
+        if not restored:
+            return False
+        category_id = db.execute(delete(archive).where(owned).returning(archive.c.category_id)).scalar()
+        self._count_in_category(db, category_id, 1)
+        return True
+
+    def archive_todos(
+        self, db: Session, completed_before: Optional[datetime], limit: int = 500,
+        user_ids: Optional[List[int]] = None, exclude_user_ids: List[int] = ()
+    ) -> int:
+        """Move up to `limit` archived todos, and todos completed before `completed_before` (if given),
+        to todos_archive in one transaction; returns how many were moved. `user_ids` and
+        `exclude_user_ids` restrict it to, or exclude, some users.
+
+        Clients see them as deleted in delta sync and on the change stream; reads with
+        include_archived still return them. Rows are moved by a DELETE ... RETURNING that
+        re-checks the policy, so todos edited since they were picked (reopened, unarchived,
+        or locked by a concurrent edit on PostgreSQL) stay in place.
+        """
+        todos, archive = TodoDB.__table__, TodoArchiveDB.__table__
+        users = self._user_filter(todos, user_ids, exclude_user_ids)
+        due = todos.c.archived == True
+        if completed_before is not None:
+            due = or_(due, and_(todos.c.completed == True, todos.c.updated_at < completed_before))
+        # An id already in the archive (reused by an old SQLite table) cannot move until that row is gone
+        movable = ~exists().where(archive.c.id == todos.c.id)
+        # Two index range scans rather than one OR that would scan the table
+        ids = db.execute(select(todos.c.id).where(todos.c.archived == True, movable, *users).limit(limit)).scalars().all()
+        if len(ids) < limit and completed_before is not None:
+            ids += db.execute(
+                select(todos.c.id)
+                .where(todos.c.completed == True, todos.c.updated_at < completed_before, todos.c.archived == False,
+                       movable, *users)
+                .limit(limit - len(ids))
+            ).scalars().all()
+        if not ids:
+            return 0
+
+        now = datetime.utcnow()
+        rows = db.execute(
+            delete(todos).where(todos.c.id.in_(ids), due, *users).returning(*todos.c)
+        ).mappings().all()
+        if not rows:
+            db.rollback()
+            return 0
+        db.execute(insert(archive), [{**row, "archived_at": now} for row in rows])
+        db.execute(insert(TodoTombstoneDB), [
+            {"todo_id": row["id"], "user_id": row["user_id"], "deleted_at": now} for row in rows
+        ])
+        for category_id, count in Counter(row["category_id"] for row in rows if row["category_id"] is not None).items():
+            self._count_in_category(db, category_id, -count)
+        for row in rows:
+            self._todo_changed(db, row["user_id"], {"op": "deleted", "id": row["id"]})
         db.commit()
-        db.refresh(db_todo)
-        return db_todo_to_pydantic(db_todo)
+        return len(rows)
+
+    def delete_archived_todos(
+        self, db: Session, archived_before: datetime, limit: int = 500,
+        user_ids: Optional[List[int]] = None, exclude_user_ids: List[int] = ()
+    ) -> int:
+        """Delete up to `limit` todos archived before `archived_before` in one transaction;
+        returns how many were deleted. They were tombstoned when they were archived.
+        """
+        archive = TodoArchiveDB.__table__
+        ids = db.execute(
+            select(archive.c.id)
+            .where(archive.c.archived_at < archived_before, *self._user_filter(archive, user_ids, exclude_user_ids))
+            .limit(limit)
+        ).scalars().all()
+        if not ids:
+            return 0
+        expired = archive.c.id.in_(ids)
+        for user_id in db.execute(select(archive.c.user_id).where(expired).distinct()).scalars():
+            invalidate_on_commit(db, user_id)
+        db.execute(delete(archive).where(expired))
+        db.commit()
+        return len(ids)
+
+    @staticmethod
+    def _user_filter(table, user_ids: Optional[List[int]], exclude_user_ids: List[int]) -> list:
+        """WHERE clauses restricting `table` to `user_ids` and leaving out `exclude_user_ids`"""
+        clauses = []
+        if user_ids is not None:
+            clauses.append(table.c.user_id.in_(user_ids))
+        if exclude_user_ids:
+            clauses.append(or_(table.c.user_id.is_(None), table.c.user_id.notin_(exclude_user_ids)))
+        return clauses
 
-    def delete_todo(self, db: Session, todo_id: int) -> Optional[Todo]:
+    def delete_todo(self, db: Session, todo_id: int, commit: bool = True) -> Optional[Todo]:
         db_todo = db.query(TodoDB).filter(TodoDB.id == todo_id).first()
         if not db_todo:
             return None
         
         todo_to_return = db_todo_to_pydantic(db_todo)
         db.delete(db_todo)
-        db.commit()
+        self._count_in_category(db, db_todo.category_id, -1)
+        db.add(TodoTombstoneDB(todo_id=db_todo.id, user_id=db_todo.user_id, deleted_at=datetime.utcnow()))
+        self._todo_changed(db, todo_to_return.user_id, {"op": "deleted", "id": todo_to_return.id})
+        if commit:
+            db.commit()
         return todo_to_return
 
-    def clear_all(self, db: Session) -> int:
-        count = db.query(TodoDB).count()
-        db.query(TodoDB).delete()
+    def _delete_in_batches(
+        self, db: Session, table, where, batch_size: int, before_delete: Optional[Callable] = None,
+        progress: Optional[Callable[[int], None]] = None
+    ) -> int:
+        """Delete the rows of `table` matching `where`, committing every `batch_size` rows;
+        `progress` is called with the running total after each commit.
+        """
+        deleted = 0
+        while True:
+            ids = db.execute(select(table.c.id).where(where).limit(batch_size)).scalars().all()
+            if not ids:
+                return deleted
+            batch = table.c.id.in_(ids)
+            if before_delete is not None:
+                before_delete(batch)
+            db.execute(delete(table).where(batch))
+            db.commit()
+            deleted += len(ids)
+            if progress is not None:
+                progress(deleted)
+
+    def purge_user_todos(
+        self, db: Session, user_id: Optional[int], batch_size: int = PURGE_BATCH_SIZE,
+        progress: Optional[Callable[[int], None]] = None
+    ) -> int:
+        """Delete all of a user's todos, archived ones included, `batch_size` per transaction;
+        returns how many were deleted. `progress` is called with the running total after each batch.
+        """
+        todos, archive = TodoDB.__table__, TodoArchiveDB.__table__
+
+        def tombstone(batch):
+            db.execute(insert(TodoTombstoneDB).from_select(
+                ["todo_id", "user_id", "deleted_at"],
+                select(todos.c.id, todos.c.user_id, literal(datetime.utcnow())).where(batch)
+            ))
+            for category_id, count in db.execute(
+                select(todos.c.category_id, func.count()).where(batch, todos.c.category_id.isnot(None))
+                .group_by(todos.c.category_id)
+            ):
+                self._count_in_category(db, category_id, -count)
+            invalidate_on_commit(db, user_id)
+
+        deleted = self._delete_in_batches(db, todos, todos.c.user_id == user_id, batch_size, tombstone, progress)
+        # Archived todos were tombstoned when they were archived
+        deleted += self._delete_in_batches(
+            db, archive, archive.c.user_id == user_id, batch_size,
+            progress=(lambda count: progress(deleted + count)) if progress is not None else None
+        )
+        db.query(CategoryDB).filter(CategoryDB.user_id == user_id).delete()
+        self._todo_changed(db, user_id, {"op": "cleared"})
         db.commit()
-        return count
-
-    def get_stats(self, db: Session) -> TodoStats:
-        """Calculate todo statistics"""
-        todos = self.get_all_todos(db)
-        total = len(todos)
-        completed = len([t for t in todos if t.completed])
-        pending = total - completed
-        
-        by_priority = {}
-        for priority in Priority:
-            by_priority[priority.value] = len([t for t in todos if t.priority == priority])
-        
-        by_category = {}
-        categories = set(t.category for t in todos if t.category)
-        for category in categories:
-            by_category[category] = len([t for t in todos if t.category == category])
-        
+        return deleted
+
+    def purge_user_rows(
+        self, db: Session, user_id: int, batch_size: int = PURGE_BATCH_SIZE, progress: Optional[Callable] = None
+    ) -> int:
+        """Delete everything stored for a user on `db`'s shard; returns the number of todos deleted"""
+        deleted = self.purge_user_todos(db, user_id, batch_size, progress)
+        for model in (TodoTombstoneDB, NotificationDB):
+            table = model.__table__
+            self._delete_in_batches(db, table, table.c.user_id == user_id, batch_size)
+        return deleted
+
+    def delete_account(self, db: Session, user_id: int) -> Optional[int]:
+        """Delete a users row, so the account's tokens stop working; returns the shard holding its
+        data, still to be purged with purge_user_rows, or None if there is no such user"""
+        user = db.query(UserDB).filter(UserDB.id == user_id).first()
+        if user is None:
+            return None
+        shard = user.shard or 0
+        db.delete(user)
+        db.commit()
+        return shard
+
+    def delete_user(
+        self, db: Session, user_id: int, batch_size: int = PURGE_BATCH_SIZE,
+        progress: Optional[Callable[[int], None]] = None
+    ) -> Optional[int]:
+        """Delete a user account and purge its data in batches; returns the number of todos deleted,
+        or None if there is no such user.
+
+        The users row goes first, so the account's tokens stop working before its data is purged.
+        Rows written by requests still in flight, or left by an interrupted purge, are removed by
+        purge_orphans.
+        """
+        shard = self.delete_account(db, user_id)
+        if shard is None:
+            return None
+        use_shard(db, shard)
+        return self.purge_user_rows(db, user_id, batch_size, progress)
+
+    def purge_orphans(self, db: Session, batch_size: int = PURGE_BATCH_SIZE) -> Dict[int, int]:
+        """Purge rows on `db`'s shard whose user no longer exists (user_id has no foreign key,
+        since users live on the first shard); returns the todos deleted per user.
+        """
+        user_ids = set()
+        for model in (TodoDB, TodoArchiveDB, TodoTombstoneDB, NotificationDB, CategoryDB):
+            user_ids.update(
+                user_id for (user_id,) in db.query(model.user_id).filter(model.user_id.isnot(None)).distinct()
+            )
+        existing = set()
+        candidates = sorted(user_ids)
+        for start in range(0, len(candidates), batch_size):
+            chunk = candidates[start:start + batch_size]
+            existing.update(user_id for (user_id,) in db.query(UserDB.id).filter(UserDB.id.in_(chunk)))
+        return {
+            user_id: self.purge_user_rows(db, user_id, batch_size)
+            for user_id in candidates if user_id not in existing
+        }
+
+    @cached("stats")
+    @coalesce()
+    def get_stats(self, db: Session, user_id: int) -> TodoStats:
+        """Statistics of a user's todos, counted in SQL"""
+        by_priority = {priority.value: 0 for priority in Priority}
+        total = completed = 0
+        for priority, done, count in (
+            db.query(TodoDB.priority, TodoDB.completed, func.count(TodoDB.id))
+            .filter(TodoDB.user_id == user_id)
+            .group_by(TodoDB.priority, TodoDB.completed)
+        ):
+            total += count
+            completed += count if done else 0
+            if priority is not None:
+                by_priority[priority.value] += count
+        by_category = dict(
+            db.query(CategoryDB.name, CategoryDB.todo_count)
+            .filter(CategoryDB.user_id == user_id, CategoryDB.todo_count > 0)
+        )
         completion_rate = (completed / total * 100) if total > 0 else 0
-        
+
         return TodoStats(
             total=total,
             completed=completed,
-            pending=pending,
+            pending=total - completed,
             by_priority=by_priority,
             by_category=by_category,
             completion_rate=round(completion_rate, 2)
         )
 
+    def record_due_notifications(
+        self,
+        db: Session,
+        kind: str,
+        due_from: date,
+        due_before: date,
+        limit: int = 1000
+    ) -> List[Notification]:
+        """Create `kind` notifications for incomplete todos due in [due_from, due_before)
+        that have not been notified for their current due date yet.
+
+        Only the given due-date window is scanned (ix_todos_completed_due), so each
+        sweep costs the window, not the table.
+        """
+        already_notified = exists().where(
+            NotificationDB.todo_id == TodoDB.id,
+            NotificationDB.kind == kind,
+            NotificationDB.due_date == TodoDB.due_date
+        )
+        db_todos = (
+            db.query(TodoDB)
+            .filter(
+                TodoDB.completed == False,
+                TodoDB.due_date >= due_from,
+                TodoDB.due_date < due_before,
+                TodoDB.user_id.isnot(None),
+                ~already_notified
+            )
+            .order_by(TodoDB.due_date, TodoDB.id)
+            .limit(limit)
+            .all()
+        )
+        now = datetime.utcnow()
+        db_notifications = [
+            NotificationDB(
+                user_id=db_todo.user_id,
+                todo_id=db_todo.id,
+                kind=kind,
+                title=db_todo.title,
+                due_date=db_todo.due_date,
+                created_at=now
+            )
+            for db_todo in db_todos
+        ]
+        db.add_all(db_notifications)
+        # Convert after flush (ids assigned) but before commit expires the objects
+        db.flush()
+        notifications = [Notification.model_validate(n, from_attributes=True) for n in db_notifications]
+        db.commit()
+        return notifications
+
+    def get_notifications(
+        self,
+        db: Session,
+        user_id: Optional[int] = None,
+        after_id: int = 0,
+        limit: int = 100
+    ) -> List[Notification]:
+        """Notifications with id > after_id, oldest first; all users when user_id is None"""
+        query = db.query(NotificationDB).filter(NotificationDB.id > after_id)
+        if user_id is not None:
+            query = query.filter(NotificationDB.user_id == user_id)
+        db_notifications = query.order_by(NotificationDB.id).limit(limit).all()
+        return [Notification.model_validate(n, from_attributes=True) for n in db_notifications]
+
+    def get_last_notification_id(self, db: Session) -> int:
+        return db.query(func.max(NotificationDB.id)).scalar() or 0
+
     def create_user(self, db: Session, user_data: dict):
         """Create a new user"""
         db_user = UserDB(**user_data)
         db.add(db_user)
+        db.flush()
+        # New users are spread over every shard; the users row is the directory entry
+        db_user.shard = shard_for_new_user(db_user.id)
         db.commit()
         db.refresh(db_user)
         return db_user
 
     def get_user_by_email(self, db: Session, email: str):
         """Get user by email"""
-        return db.query(UserDB).filter(UserDB.email == email).first()
+        return self._lookup(db, "user_by_email", email).first()
 
     def get_user_by_id(self, db: Session, user_id: int):
         """Get user by ID"""
-        return db.query(UserDB).filter(UserDB.id == user_id).first()
+        return self._lookup(db, "user_by_id", user_id).first()
+
+    def get_retention_policy(self, db: Session, user_id: int) -> Optional[RetentionPolicy]:
+        """The user's own retention settings"""
+        user = self.get_user_by_id(db, user_id)
+        return RetentionPolicy.model_validate(user, from_attributes=True) if user else None
+
+    def set_retention_policy(self, db: Session, user_id: int, policy: RetentionPolicy) -> Optional[RetentionPolicy]:
+        """Replace the user's retention settings"""
+        user = self.get_user_by_id(db, user_id)
+        if user is None:
+            return None
+        user.archive_completed_after_days = policy.archive_completed_after_days
+        user.delete_archived_after_days = policy.delete_archived_after_days
+        db.commit()
+        return policy
+
+    def get_retention_overrides(self, db: Session, shard: int = 0) -> List[Tuple[int, Optional[int], Optional[int]]]:
+        """(user id, archive after days, delete after days) of the users on `shard` with their own policy"""
+        return [
+            tuple(row) for row in db.query(
+                UserDB.id, UserDB.archive_completed_after_days, UserDB.delete_archived_after_days
+            ).filter(
+                func.coalesce(UserDB.shard, 0) == shard,
+                or_(UserDB.archive_completed_after_days.isnot(None), UserDB.delete_archived_after_days.isnot(None))
+            ).order_by(UserDB.id)
+        ]
+
+    def use_user_shard(self, db: Session, user_id: int):
+        """Point `db` at the shard holding the user's todos, for callers without get_current_user"""
+        shard = db.query(UserDB.shard).filter(UserDB.id == user_id).scalar()
+        use_shard(db, shard or 0)
 
 
 # Global database instance
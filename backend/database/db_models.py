@@ -1,6 +1,12 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Date, Enum
+from sqlalchemy import (
+    create_engine, Column, Integer, String, Boolean, DateTime, Date, Enum, Index, UniqueConstraint,
+    exists, func, inspect, insert, literal, select, text, update
+)
+from sqlalchemy import event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.sql.util import find_tables
 from datetime import datetime
 import enum
 import os
@@ -34,13 +40,81 @@ def get_database_url():
 
 DATABASE_URL = get_database_url()
 
-if DATABASE_URL.startswith('sqlite'):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-else:
+# SQLite production mode, applied to every new connection: WAL lets readers run
+# alongside the writer, synchronous=NORMAL syncs the WAL at checkpoints instead of
+# on every commit (a crash may lose the last commits but never corrupts the file)
+SQLITE_PERFORMANCE_MODE = os.getenv("SQLITE_PERFORMANCE_MODE", "true").lower() == "true"
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Engine "connect" listener applying the SQLite performance pragmas"""
+    cursor = dbapi_connection.cursor()
+    # Wait for locks instead of failing with "database is locked" straight away
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    if SQLITE_PERFORMANCE_MODE:
+        # Lets the archiver return free pages in small steps instead of a locking VACUUM. Only
+        # takes effect on a new database, so before WAL mode writes the header; existing ones
+        # switch with `python -m api.archiver --vacuum`
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        # Negative values are KiB rather than pages
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+def _create_engine(url: str):
+    if url.startswith('sqlite'):
+        sqlite_engine = create_engine(url, connect_args={"check_same_thread": False})
+        event.listen(sqlite_engine, "connect", set_sqlite_pragmas)
+        return sqlite_engine
     # PostgreSQL configuration
-    engine = create_engine(DATABASE_URL)
+    return create_engine(url)
+
+engine = _create_engine(DATABASE_URL)
+
+# User sharding: each user's todos (and their categories, tombstones, archive and
+# notifications) live on one shard. Shard 0 is DATABASE_URL, which also holds the
+# users table, whose `shard` column is the directory; DATABASE_SHARDS lists the
+# URLs of shards 1..N-1. Capacity grows by adding URLs: new users are spread over
+# every shard and `python -m database.shards` moves existing ones.
+SHARD_URLS = [DATABASE_URL] + [url.strip() for url in os.getenv("DATABASE_SHARDS", "").split(",") if url.strip()]
+shard_engines = [engine] + [_create_engine(url) for url in SHARD_URLS[1:]]
+# Todo ids on shard i start at i * SHARD_ID_SPACING, so they are unique across shards.
+# Ids are 32-bit (SERIAL on PostgreSQL): 67M todos per shard and at most 32 shards.
+SHARD_ID_SPACING = 2 ** 26
+MAX_SHARDS = 2 ** 31 // SHARD_ID_SPACING
+if len(SHARD_URLS) > MAX_SHARDS:
+    raise RuntimeError(f"DATABASE_SHARDS lists {len(SHARD_URLS) - 1} shards; at most {MAX_SHARDS - 1} fit the todo id space")
+# Tables that exist only on shard 0
+GLOBAL_TABLES = {"users", "scheduler_leases"}
+
+def shard_for_new_user(user_id: int) -> int:
+    return user_id % len(shard_engines)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+class ShardedSession(Session):
+    """Session sending the global tables to shard 0 and every other table to the
+    shard selected with use_shard() (shard 0 until then)"""
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if len(shard_engines) == 1:
+            return engine
+        if mapper is not None and mapper.local_table.name in GLOBAL_TABLES:
+            return engine
+        if clause is not None and any(
+            getattr(table, "name", None) in GLOBAL_TABLES for table in find_tables(clause, include_crud=True)
+        ):
+            return engine
+        return shard_engines[self.info.get("shard", 0)]
+
+def use_shard(db: Session, shard: int):
+    """Route the session's per-user tables to `shard`; call before touching them"""
+    db.info["shard"] = shard
+
+SessionLocal = sessionmaker(class_=ShardedSession, autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 # Priority enum for SQLAlchemy
@@ -59,6 +133,11 @@ class UserDB(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     password = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    shard = Column(Integer, nullable=True)  # Shard holding the user's todos; NULL means 0
+    shard_moving = Column(Boolean, nullable=True)  # Set while database.shards moves the user
+    # Retention policy; NULL uses the server default, 0 keeps todos forever
+    archive_completed_after_days = Column(Integer, nullable=True)
+    delete_archived_after_days = Column(Integer, nullable=True)
 
 class TodoDB(Base):
     __tablename__ = "todos"
@@ -70,14 +149,221 @@ class TodoDB(Base):
     priority = Column(Enum(PriorityEnum), default=PriorityEnum.medium)
     due_date = Column(Date, nullable=True)
     category = Column(String, nullable=True)
+    category_id = Column(Integer, nullable=True)  # CategoryDB row for (user_id, category)
     user_id = Column(Integer, nullable=True)  # Added user_id for user association
     starred = Column(Boolean, default=False)  # Added starred field
     archived = Column(Boolean, default=False)  # Added archived field
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+    __table_args__ = (
+        # Overdue / due-soon range scans: WHERE user_id = ? AND completed = ? AND due_date ... ORDER BY due_date
+        Index("ix_todos_user_completed_due", "user_id", "completed", "due_date"),
+        # Reminder sweeps across all users: WHERE completed = ? AND due_date BETWEEN ...
+        Index("ix_todos_completed_due", "completed", "due_date"),
+        # Todo list: WHERE user_id = ? ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?
+        Index("ix_todos_user_created", "user_id", "created_at", "id"),
+        # Delta sync: WHERE user_id = ? AND (updated_at, id) > (?, ?) ORDER BY updated_at, id
+        Index("ix_todos_user_updated", "user_id", "updated_at", "id"),
+        # Category filters: WHERE user_id = ? AND category_id = ?
+        Index("ix_todos_user_category", "user_id", "category_id"),
+        # Archive mover: WHERE archived = ? / WHERE completed = ? AND updated_at < ?
+        Index("ix_todos_archived", "archived"),
+        Index("ix_todos_completed_updated", "completed", "updated_at"),
+        # Never hand out an id again once its row moved to todos_archive (new SQLite tables;
+        # PostgreSQL sequences never reuse ids)
+        {"sqlite_autoincrement": True},
+    )
+
+class TodoArchiveDB(Base):
+    """Cold storage for archived and long-completed todos, moved out of `todos` by the
+    archiver so hot queries do not scan them; same columns plus archived_at"""
+    __tablename__ = "todos_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String, nullable=False)
+    description = Column(String, nullable=True)
+    completed = Column(Boolean, default=False)
+    priority = Column(Enum(PriorityEnum), default=PriorityEnum.medium)
+    due_date = Column(Date, nullable=True)
+    category = Column(String, nullable=True)
+    category_id = Column(Integer, nullable=True)
+    user_id = Column(Integer, nullable=True)
+    starred = Column(Boolean, default=False)
+    archived = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_todos_archive_user_id", "user_id", "id"),
+        # Retention deletes archived todos by age
+        Index("ix_todos_archive_archived_at", "archived_at"),
+    )
+
+class CategoryDB(Base):
+    """Each user's category names with the number of todos in each, kept up to date by TodoDatabase"""
+    __tablename__ = "categories"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    name = Column(String, nullable=False)
+    todo_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "name", name="uq_categories_user_name"),
+    )
+
+class TodoTombstoneDB(Base):
+    """Deleted todo ids, so delta sync can tell clients what to remove"""
+    __tablename__ = "todo_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    todo_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=True)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_todo_tombstones_user_id", "user_id", "id"),
+    )
+
+class NotificationDB(Base):
+    __tablename__ = "notifications"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    todo_id = Column(Integer, nullable=False)
+    kind = Column(String, nullable=False)  # "due_soon" or "overdue"
+    title = Column(String, nullable=False)
+    due_date = Column(Date, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # One notification per todo, kind and due date; a rescheduled todo notifies again
+        UniqueConstraint("todo_id", "kind", "due_date", name="uq_notifications_todo_kind_due"),
+        Index("ix_notifications_user_id", "user_id", "id"),
+    )
+
+class SchedulerLeaseDB(Base):
+    """Leader lease for background jobs on databases without advisory locks"""
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+def init_db():
+    """Create any missing tables.
+
+    Called from the app lifespan hook or explicitly via `python -m database.migrate`,
+    never at import time, so importing the models does not need a live database.
+    Every shard gets the per-user tables; shard 0 also the global ones.
+    """
+    for shard, shard_engine in enumerate(shard_engines):
+        tables = [
+            table for table in Base.metadata.sorted_tables
+            if shard == 0 or table.name not in GLOBAL_TABLES
+        ]
+        Base.metadata.create_all(bind=shard_engine, tables=tables)
+        # create_all skips tables that already exist, so add columns and indexes introduced since
+        _add_missing_columns(shard_engine, tables)
+        _autoincrement_todo_ids(shard_engine)
+        for table in tables:
+            for index in table.indexes:
+                index.create(bind=shard_engine, checkfirst=True)
+        with shard_engine.begin() as connection:
+            if shard:
+                _reserve_id_range(connection, shard * SHARD_ID_SPACING)
+            backfill_categories(connection)
+
+def _reserve_id_range(connection, start: int):
+    """Make new todo ids on this shard start at `start` at the earliest"""
+    if connection.dialect.name == "postgresql":
+        connection.execute(text(
+            "SELECT setval(pg_get_serial_sequence('todos', 'id'), "
+            "GREATEST(:start, (SELECT COALESCE(MAX(id), 0) FROM todos)))"
+        ), {"start": start})
+    else:
+        # sqlite_sequence backs AUTOINCREMENT tables
+        connection.execute(text("UPDATE sqlite_sequence SET seq = :start WHERE name = 'todos' AND seq < :start"),
+                           {"start": start})
+        connection.execute(text(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT 'todos', MAX(:start, COALESCE(MAX(id), 0)) FROM todos "
+            "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'todos')"
+        ), {"start": start})
+
+def _autoincrement_todo_ids(engine):
+    """Rebuild a SQLite todos table created without AUTOINCREMENT, which reuses the highest
+    id once that row moved to todos_archive, with its sequence past every archived id"""
+    if engine.dialect.name != "sqlite":
+        return
+    todos = TodoDB.__table__
+    with engine.begin() as connection:
+        table_sql = connection.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'todos'")
+        ).scalar()
+        if "AUTOINCREMENT" in table_sql.upper():
+            return
+        create_sql = str(CreateTable(todos).compile(dialect=engine.dialect))
+        # Left by an interrupted rebuild
+        connection.execute(text("DROP TABLE IF EXISTS todos_new"))
+        connection.execute(text(create_sql.replace("CREATE TABLE todos ", "CREATE TABLE todos_new ", 1)))
+        columns = ", ".join(column.name for column in todos.columns)
+        connection.execute(text(f"INSERT INTO todos_new ({columns}) SELECT {columns} FROM todos"))
+        # Drops the indexes too; init_db recreates them on the new table
+        connection.execute(text("DROP TABLE todos"))
+        connection.execute(text("ALTER TABLE todos_new RENAME TO todos"))
+        connection.execute(text("DELETE FROM sqlite_sequence WHERE name = 'todos'"))
+        connection.execute(text(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT 'todos', MAX("
+            "(SELECT COALESCE(MAX(id), 0) FROM todos), (SELECT COALESCE(MAX(id), 0) FROM todos_archive))"
+        ))
+    print("Rebuilt the todos table with AUTOINCREMENT ids")
+
+def _add_missing_columns(engine, tables):
+    """Add nullable model columns missing from existing tables"""
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+def backfill_categories(connection):
+    """Link todos written without a category_id (older rows, bulk loads) to their
+    category rows, creating those, and recount every category"""
+    todos, categories = TodoDB.__table__, CategoryDB.__table__
+    unlinked = (todos.c.category_id.is_(None), todos.c.category.isnot(None), todos.c.user_id.isnot(None))
+    if not connection.execute(select(exists().where(*unlinked))).scalar():
+        return
+
+    category_exists = exists().where(categories.c.user_id == todos.c.user_id, categories.c.name == todos.c.category)
+    connection.execute(insert(categories).from_select(
+        ["user_id", "name", "todo_count"],
+        select(todos.c.user_id, todos.c.category, literal(0))
+        .where(*unlinked, ~category_exists)
+        .group_by(todos.c.user_id, todos.c.category)
+    ))
+    connection.execute(
+        update(todos)
+        .where(*unlinked)
+        .values(
+            category_id=select(categories.c.id)
+            .where(categories.c.user_id == todos.c.user_id, categories.c.name == todos.c.category)
+            .scalar_subquery(),
+            # Not a user-visible change; keep it out of delta sync
+            updated_at=todos.c.updated_at
+        )
+    )
+    connection.execute(
+        update(categories).values(
+            todo_count=select(func.count())
+            .where(todos.c.user_id == categories.c.user_id, todos.c.category_id == categories.c.id)
+            .scalar_subquery()
+        )
+    )
 
 # Dependency to get database session
 def get_db():
@@ -0,0 +1,98 @@
+"""Leader election for background jobs that must run in only one worker.
+
+PostgreSQL uses a session-level advisory lock held on a dedicated connection, so
+leadership ends as soon as the leader's process or connection dies. Other
+databases (SQLite) fall back to a lease row in `scheduler_leases` that the leader
+renews on every tick and that expires if it stops.
+"""
+import os
+import socket
+import uuid
+import zlib
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from database.db_models import SchedulerLeaseDB, SessionLocal, engine
+
+
+class LeaderElection:
+    def __init__(self, name: str, lease_seconds: float):
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock_key = zlib.crc32(name.encode("utf-8"))
+        self._lock_connection = None
+
+    def acquire(self) -> bool:
+        """Become or stay leader; call once per tick. Returns whether this process leads"""
+        try:
+            if engine.dialect.name == "postgresql":
+                return self._acquire_advisory_lock()
+            return self._acquire_lease()
+        except SQLAlchemyError:
+            self.release()
+            return False
+
+    def release(self):
+        if self._lock_connection is not None:
+            connection, self._lock_connection = self._lock_connection, None
+            # The lock belongs to the database session, not the connection object: unlock it
+            # before the connection goes back to the pool, or discard the connection
+            try:
+                connection.execute(select(func.pg_advisory_unlock(self._lock_key)))
+                connection.close()
+            except SQLAlchemyError:
+                connection.invalidate()
+                connection.close()
+        elif engine.dialect.name != "postgresql":
+            try:
+                with SessionLocal() as db:
+                    db.query(SchedulerLeaseDB).filter(
+                        SchedulerLeaseDB.name == self.name,
+                        SchedulerLeaseDB.holder == self.holder
+                    ).delete()
+                    db.commit()
+            except SQLAlchemyError:
+                pass
+
+    def _acquire_advisory_lock(self) -> bool:
+        if self._lock_connection is not None:
+            # Still leader as long as the connection holding the lock is alive
+            self._lock_connection.execute(select(1))
+            return True
+        connection = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            locked = connection.execute(select(func.pg_try_advisory_lock(self._lock_key))).scalar()
+        except SQLAlchemyError:
+            # Unknown whether the lock was taken; never pool a connection that may hold it
+            connection.invalidate()
+            connection.close()
+            raise
+        if locked:
+            self._lock_connection = connection
+            return True
+        connection.close()
+        return False
+
+    def _acquire_lease(self) -> bool:
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.lease_seconds)
+        with SessionLocal() as db:
+            renewed = db.query(SchedulerLeaseDB).filter(
+                SchedulerLeaseDB.name == self.name,
+                or_(SchedulerLeaseDB.holder == self.holder, SchedulerLeaseDB.expires_at < now)
+            ).update({"holder": self.holder, "expires_at": expires_at}, synchronize_session=False)
+            if renewed:
+                db.commit()
+                return True
+            if db.get(SchedulerLeaseDB, self.name) is not None:
+                return False
+            db.add(SchedulerLeaseDB(name=self.name, holder=self.holder, expires_at=expires_at))
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another worker created the lease first
+                return False
+            return True
@@ -0,0 +1,17 @@
+"""Create the database schema.
+
+Run this once per deploy (for example as an ECS one-off task) before starting
+the workers, and set AUTO_MIGRATE=false on the app so workers skip it:
+
+    python -m database.migrate
+"""
+from database.db_models import DATABASE_URL, init_db
+
+
+def main():
+    init_db()
+    print(f"Database schema is up to date ({DATABASE_URL.split('@')[-1]})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Work queued on a session and run once its outermost transaction commits.
+
+The change feed (deltas to publish) and the read cache (versions to bump) queue
+per-session work that must only happen after the data is committed. Session
+events alone are not enough for that: releasing a savepoint fires
+`after_commit` and rolling one back fires `after_rollback`, although neither
+ends the real transaction. Here items queued inside a savepoint that rolls back
+are dropped, everything else waits for the root commit, and a root rollback or
+close drops it all.
+
+    defer(db, "changes", item)         # queue an item under a key
+
+    @on_commit("changes")
+    def dispatch(items): ...           # called with the key's items after the root commit
+"""
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_handlers: Dict[str, Callable[[List[Any]], None]] = {}
+
+
+def on_commit(key: str):
+    """Register the handler of `key`'s items"""
+    def register(handler: Callable[[List[Any]], None]):
+        _handlers[key] = handler
+        return handler
+    return register
+
+
+def defer(session: Session, key: str, item: Any):
+    """Queue `item` for the handler of `key`, run when the session's root transaction commits"""
+    session.info.setdefault("pending", {}).setdefault(key, []).append(item)
+
+
+@event.listens_for(Session, "after_transaction_create")
+def _mark_savepoint(session, transaction):
+    if transaction.nested:
+        # What was queued before the savepoint, kept if it rolls back
+        pending = session.info.get("pending", {})
+        session.info.setdefault("savepoint_marks", {})[transaction] = {key: len(items) for key, items in pending.items()}
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _rollback_savepoint(session, previous_transaction):
+    marks = session.info.get("savepoint_marks", {}).pop(previous_transaction, None)
+    if marks is None:
+        return
+    for key, items in session.info.get("pending", {}).items():
+        del items[marks.get(key, 0):]
+
+
+@event.listens_for(Session, "after_commit")
+def _run_pending(session):
+    if session.in_nested_transaction():
+        return
+    session.info.pop("savepoint_marks", None)
+    # Keys run in the order they were first queued in the session
+    for key, items in session.info.pop("pending", {}).items():
+        if items:
+            _handlers[key](items)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_pending(session, transaction):
+    # After a root commit this is already empty; after a rollback or close it is dropped
+    if transaction.parent is None:
+        session.info.pop("pending", None)
+        session.info.pop("savepoint_marks", None)
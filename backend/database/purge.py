@@ -0,0 +1,88 @@
+"""Delete user data in short batches.
+
+    python -m database.purge user --user 42              # all of the user's todos
+    python -m database.purge user --user 42 --account    # the account and everything stored for it
+    python -m database.purge orphans                     # rows of users that no longer exist
+
+Every transaction deletes at most PURGE_BATCH_SIZE rows (or --batch-size), so a
+purge never holds locks or grows the WAL for long, and progress is printed after
+each batch. POST /todos/purge, DELETE /todos and DELETE /auth/me run the same
+purges as background tasks after responding, logging progress as JSON lines.
+`user_id` has no foreign key (users live on the first shard), so rows written by
+requests still in flight while an account was deleted, or left by an interrupted
+purge, are only removed by `orphans`.
+"""
+import argparse
+import json
+from typing import Callable
+
+from api.instrumentation import json_logger
+from database.database import PURGE_BATCH_SIZE, todo_db
+from database.db_models import SessionLocal, shard_engines
+
+logger = json_logger("todo.purge")
+
+
+def log_progress(job: str, user_id: int) -> Callable[[int], None]:
+    """Progress callback logging the running total of deleted todos after each batch"""
+    def progress(count: int):
+        logger.info(json.dumps({"job": job, "user_id": user_id, "todos_deleted": count}))
+    return progress
+
+
+def purge_todos_task(user_id: int):
+    """Background task of POST /todos/purge and DELETE /todos, in a session of its own"""
+    try:
+        with SessionLocal() as db:
+            todo_db.use_user_shard(db, user_id)
+            deleted = todo_db.purge_user_todos(db, user_id, progress=log_progress("purge_todos", user_id))
+    except Exception as e:
+        logger.error(json.dumps({"job": "purge_todos", "user_id": user_id, "error": str(e)}))
+        raise
+    logger.info(json.dumps({"job": "purge_todos", "user_id": user_id, "todos_deleted": deleted, "done": True}))
+
+
+def purge_account_task(user_id: int, shard: int):
+    """Background task of DELETE /auth/me: purge the data of a deleted account on its shard.
+    If it fails, `orphans` removes what is left"""
+    try:
+        with SessionLocal(info={"shard": shard}) as db:
+            deleted = todo_db.purge_user_rows(db, user_id, progress=log_progress("delete_account", user_id))
+    except Exception as e:
+        logger.error(json.dumps({"job": "delete_account", "user_id": user_id, "error": str(e)}))
+        raise
+    logger.info(json.dumps({"job": "delete_account", "user_id": user_id, "todos_deleted": deleted, "done": True}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=PURGE_BATCH_SIZE, help="Rows deleted per transaction")
+    commands = parser.add_subparsers(dest="command", required=True)
+    user = commands.add_parser("user", help="Purge one user's todos")
+    user.add_argument("--user", type=int, required=True)
+    user.add_argument("--account", action="store_true", help="Also delete the account and its other data")
+    commands.add_parser("orphans", help="Purge rows whose user no longer exists, on every shard")
+    args = parser.parse_args()
+
+    def progress(count):
+        print(f"{count} todos deleted")
+
+    if args.command == "user":
+        with SessionLocal() as db:
+            if args.account:
+                deleted = todo_db.delete_user(db, args.user, args.batch_size, progress)
+                if deleted is None:
+                    raise SystemExit(f"No user {args.user}")
+            else:
+                todo_db.use_user_shard(db, args.user)
+                deleted = todo_db.purge_user_todos(db, args.user, args.batch_size, progress)
+        print(f"Purged {deleted} todos of user {args.user}")
+    else:
+        for shard in range(len(shard_engines)):
+            with SessionLocal(info={"shard": shard}) as db:
+                for user_id, deleted in todo_db.purge_orphans(db, args.batch_size).items():
+                    print(f"Shard {shard}: purged user {user_id} ({deleted} todos)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,25 @@
+"""Sample data for development and generated datasets for load testing.
+
+`create_sample_data` creates the demo user and three todos. `generate_sample_data`
+(also available as a CLI) bulk-loads any number of users and todos with realistic,
+seed-deterministic distributions:
+
+    python -m database.sample_data --users 100000 --todos-per-user 20 --seed 42
+"""
+import argparse
+import csv
+import io
+import math
+import random
+import time
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, Optional
+
+from sqlalchemy import func, insert, text
 from sqlalchemy.orm import Session
 from api.models import TodoCreate, Priority
 from database.database import todo_db
-from database.db_models import get_db
+from database.db_models import TodoDB, UserDB, PriorityEnum, backfill_categories, engine, get_db, init_db
 from api.auth import get_password_hash
 
 
@@ -52,3 +70,231 @@ def create_sample_data():
         print(f"Created {len(sample_todos)} sample todos for demo user")
     
     db.close()
+
+
+
+# Weights loosely follow what production data looks like: most todos are medium
+# priority, a few categories dominate, and older todos are more likely done
+PRIORITY_WEIGHTS = [
+    (PriorityEnum.low, 0.30),
+    (PriorityEnum.medium, 0.45),
+    (PriorityEnum.high, 0.20),
+    (PriorityEnum.urgent, 0.05),
+]
+CATEGORIES = ["work", "personal", "shopping", "health", "finance", "home", "learning", "travel", "family", "errands"]
+# Zipf-like: the first category is ten times as common as the last
+CATEGORY_WEIGHTS = [1 / (rank + 1) for rank in range(len(CATEGORIES))]
+TITLES = [
+    "Review project proposal", "Buy groceries", "Call dentist", "Finish project report",
+    "Pay electricity bill", "Plan team meeting", "Renew passport", "Read a book",
+    "Update budget spreadsheet", "Book flight tickets", "Clean the garage", "Prepare presentation",
+    "Reply to emails", "Schedule car service", "Water the plants", "Submit expense report"
+]
+DESCRIPTION_WORDS = [
+    "follow", "up", "with", "team", "before", "deadline", "check", "notes", "draft",
+    "send", "update", "confirm", "details", "review", "the", "latest", "version"
+]
+
+HISTORY_DAYS = 365
+DUE_DATE_RATE = 0.55
+CATEGORY_RATE = 0.8
+STARRED_RATE = 0.08
+ARCHIVE_AFTER_DAYS = 90
+ARCHIVED_RATE = 0.3
+
+TODO_COLUMNS = [
+    "id", "title", "description", "completed", "priority", "due_date", "category",
+    "user_id", "starred", "archived", "created_at", "updated_at"
+]
+USER_COLUMNS = ["id", "name", "email", "password", "created_at"]
+
+
+def generate_users(rng: random.Random, first_id: int, count: int, password_hash: str,
+                   anchor: datetime, email_prefix: str = "user") -> List[dict]:
+    """Users with emails numbered by id, e.g. user1@example.com"""
+    users = []
+    for n in range(count):
+        user_id = first_id + n
+        users.append({
+            "id": user_id,
+            "name": f"User {user_id}",
+            "email": f"{email_prefix}{user_id}@example.com",
+            "password": password_hash,
+            "created_at": anchor - timedelta(days=rng.randint(HISTORY_DAYS, 2 * HISTORY_DAYS))
+        })
+    return users
+
+
+def generate_todos(rng: random.Random, user_id: int, count: int, first_id: int, anchor: datetime) -> Iterator[dict]:
+    """Todos for one user with realistic priority, category, due date and completion mixes"""
+    priorities = [p for p, _ in PRIORITY_WEIGHTS]
+    priority_weights = [w for _, w in PRIORITY_WEIGHTS]
+    for n in range(count):
+        age_days = rng.random() * HISTORY_DAYS
+        created_at = anchor - timedelta(days=age_days)
+        # Completion rises from ~20% for new todos to ~85% for year-old ones
+        completed = rng.random() < 0.2 + 0.65 * age_days / HISTORY_DAYS
+        due_date = None
+        if rng.random() < DUE_DATE_RATE:
+            due_date = (created_at + timedelta(days=rng.expovariate(1 / 14))).date()
+        updated_at = created_at
+        if completed:
+            updated_at = created_at + timedelta(days=rng.random() * age_days)
+        archived = completed and (anchor - updated_at).days > ARCHIVE_AFTER_DAYS and rng.random() < ARCHIVED_RATE
+        description = None
+        if rng.random() < 0.6:
+            description = " ".join(rng.choices(DESCRIPTION_WORDS, k=rng.randint(3, 40)))
+        yield {
+            "id": first_id + n,
+            "title": rng.choice(TITLES),
+            "description": description,
+            "completed": completed,
+            "priority": rng.choices(priorities, priority_weights)[0],
+            "due_date": due_date,
+            "category": rng.choices(CATEGORIES, CATEGORY_WEIGHTS)[0] if rng.random() < CATEGORY_RATE else None,
+            "user_id": user_id,
+            "starred": rng.random() < STARRED_RATE,
+            "archived": archived,
+            "created_at": created_at,
+            "updated_at": updated_at
+        }
+
+
+def _todo_count(rng: random.Random, mean: float) -> int:
+    """Heavy-tailed todos per user (log-normal): most users have a few, some have hundreds"""
+    if mean <= 0:
+        return 0
+    sigma = 1.0
+    return int(rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma))
+
+
+def _copy_rows(db: Session, table: str, columns: List[str], rows: List[dict]):
+    """Load rows with PostgreSQL COPY, much faster than INSERT for millions of rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        values = []
+        for column in columns:
+            value = row[column]
+            if value is None:
+                values.append("")
+            elif isinstance(value, PriorityEnum):
+                values.append(value.value)
+            else:
+                values.append(value)
+        writer.writerow(values)
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def _write_batch(db: Session, model, columns: List[str], rows: List[dict], use_copy: bool):
+    if not rows:
+        return
+    if use_copy:
+        _copy_rows(db, model.__tablename__, columns, rows)
+    else:
+        # Core insert on the table: one executemany per batch (the ORM bulk path
+        # splits rows into many smaller statements)
+        db.execute(insert(model.__table__), rows)
+    db.commit()
+
+
+def generate_sample_data(
+    num_users: int,
+    todos_per_user: float = 20,
+    seed: int = 42,
+    anchor: Optional[date] = None,
+    batch_size: int = 10000,
+    password: str = "password",
+    email_prefix: str = "user",
+    progress: bool = False
+) -> dict:
+    """Bulk-load generated users and todos; the same seed and anchor give the same rows.
+
+    Rows are appended after the current highest ids. Uses COPY on PostgreSQL and
+    batched executemany elsewhere. Returns the number of users and todos created.
+    """
+    rng = random.Random(seed)
+    anchor_dt = datetime.combine(anchor or date.today(), datetime.min.time())
+    use_copy = engine.dialect.name == "postgresql"
+    # One bcrypt hash shared by every generated user; hashing per user would dominate the load
+    password_hash = get_password_hash(password)
+
+    # A dedicated connection, so the load-only settings below never reach the app's pool
+    connection = engine.connect()
+    db = Session(bind=connection)
+    if engine.dialect.name == "sqlite":
+        # Durability does not matter for generated data; skip the per-commit fsync
+        db.execute(text("PRAGMA synchronous=OFF"))
+    started = time.perf_counter()
+    todos_created = 0
+    try:
+        next_user_id = (db.query(func.max(UserDB.id)).scalar() or 0) + 1
+        next_todo_id = (db.query(func.max(TodoDB.id)).scalar() or 0) + 1
+        todo_batch = []
+        for batch_start in range(0, num_users, batch_size):
+            users = generate_users(rng, next_user_id + batch_start, min(batch_size, num_users - batch_start),
+                                   password_hash, anchor_dt, email_prefix)
+            _write_batch(db, UserDB, USER_COLUMNS, users, use_copy)
+            for user in users:
+                count = _todo_count(rng, todos_per_user)
+                todo_batch.extend(generate_todos(rng, user["id"], count, next_todo_id, anchor_dt))
+                next_todo_id += count
+                if len(todo_batch) >= batch_size:
+                    _write_batch(db, TodoDB, TODO_COLUMNS, todo_batch, use_copy)
+                    todos_created += len(todo_batch)
+                    todo_batch = []
+            if progress:
+                elapsed = time.perf_counter() - started
+                print(f"{batch_start + len(users)}/{num_users} users, {todos_created} todos, "
+                      f"{todos_created / elapsed:.0f} todos/s")
+        _write_batch(db, TodoDB, TODO_COLUMNS, todo_batch, use_copy)
+        todos_created += len(todo_batch)
+
+        # Bulk writes bypass TodoDatabase; build the per-user category index in one pass
+        backfill_categories(db.connection())
+        db.commit()
+
+        if use_copy:
+            # Explicit ids bypass the sequences; move them past the loaded rows
+            for table in ("users", "todos"):
+                db.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                                f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"))
+            db.commit()
+    finally:
+        db.close()
+        connection.invalidate()
+        connection.close()
+
+    return {"users": num_users, "todos": todos_created, "seconds": round(time.perf_counter() - started, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate users and todos for load testing")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--todos-per-user", type=float, default=20, help="Mean todos per user")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--anchor", type=date.fromisoformat, help="Date treated as today (YYYY-MM-DD); "
+                        "set it for byte-identical data across days")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--password", default="password", help="Password for every generated user")
+    parser.add_argument("--email-prefix", default="user")
+    args = parser.parse_args()
+
+    init_db()
+    result = generate_sample_data(
+        args.users,
+        todos_per_user=args.todos_per_user,
+        seed=args.seed,
+        anchor=args.anchor,
+        batch_size=args.batch_size,
+        password=args.password,
+        email_prefix=args.email_prefix,
+        progress=True
+    )
+    print(f"Created {result['users']} users and {result['todos']} todos in {result['seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Shard status and moving users between shards.
+
+    python -m database.shards status
+    python -m database.shards move --user 42 --to 2
+    python -m database.shards rebalance --dry-run
+
+After adding a URL to DATABASE_SHARDS (and running `python -m database.migrate`),
+new users are spread over every shard; `rebalance` moves existing users from the
+fullest shards to the emptiest until their todo counts are within one user of
+each other.
+
+Moving a user marks them as moving (their requests get 503 with Retry-After),
+waits SHARD_MOVE_GRACE_SECONDS for in-flight requests, copies their rows to the
+target shard in one transaction, flips the directory entry and deletes the
+source rows. The target shard assigns new todo, category and tombstone ids
+(copying ids would push its id sequence into another shard's range), and
+notification history is not copied, so clients should run a full sync (without
+a delta token) after their account moved.
+"""
+import argparse
+import json
+import os
+import time
+from typing import Dict, List, Tuple
+
+from sqlalchemy import delete, func, insert, select
+
+from database.db_models import (
+    CategoryDB, NotificationDB, SessionLocal, TodoArchiveDB, TodoDB, TodoTombstoneDB, UserDB, shard_engines
+)
+
+SHARD_MOVE_GRACE_SECONDS = float(os.getenv("SHARD_MOVE_GRACE_SECONDS", "5"))
+# Per-user tables, in the order they are copied
+USER_TABLES = [CategoryDB.__table__, TodoDB.__table__, TodoArchiveDB.__table__,
+               TodoTombstoneDB.__table__, NotificationDB.__table__]
+
+
+def shard_status() -> List[dict]:
+    """Users and todos on each shard"""
+    with SessionLocal() as db:
+        users = dict(db.query(func.coalesce(UserDB.shard, 0), func.count(UserDB.id)).group_by(func.coalesce(UserDB.shard, 0)).all())
+    status = []
+    for shard in range(len(shard_engines)):
+        with SessionLocal(info={"shard": shard}) as db:
+            status.append({
+                "shard": shard,
+                "users": users.get(shard, 0),
+                "todos": db.query(func.count(TodoDB.id)).scalar(),
+                "archived_todos": db.query(func.count(TodoArchiveDB.id)).scalar(),
+            })
+    return status
+
+
+def _copy_user_rows(source, target, user_id: int):
+    """Copy a user's rows from the source to the target session (not committed)"""
+    categories, todos, archive, tombstones = (table.__table__ for table in (CategoryDB, TodoDB, TodoArchiveDB, TodoTombstoneDB))
+    # Leftovers of an interrupted earlier move
+    for table in USER_TABLES:
+        target.execute(delete(table).where(table.c.user_id == user_id))
+
+    category_ids = {}
+    for row in source.execute(select(categories).where(categories.c.user_id == user_id)).mappings():
+        category_ids[row["id"]] = target.execute(
+            insert(categories).values(user_id=user_id, name=row["name"], todo_count=row["todo_count"])
+            .returning(categories.c.id)
+        ).scalar()
+
+    for table in (todos, archive):
+        for row in source.execute(select(table).where(table.c.user_id == user_id).order_by(table.c.id)).mappings():
+            values = {
+                column.name: row[column.name] for column in todos.c if column.name != "id"
+            }
+            values["category_id"] = category_ids.get(row["category_id"])
+            todo_id = target.execute(insert(todos).values(**values).returning(todos.c.id)).scalar()
+            if table is archive:
+                # Allocated from the hot table's sequence, like every archived todo id
+                target.execute(delete(todos).where(todos.c.id == todo_id))
+                target.execute(insert(archive).values(**values, id=todo_id, archived_at=row["archived_at"]))
+
+    rows = [
+        {"todo_id": row["todo_id"], "user_id": user_id, "deleted_at": row["deleted_at"]}
+        for row in source.execute(
+            select(tombstones).where(tombstones.c.user_id == user_id).order_by(tombstones.c.id)
+        ).mappings()
+    ]
+    if rows:
+        target.execute(insert(tombstones), rows)
+
+
+def move_user(user_id: int, target_shard: int, grace_seconds: float = SHARD_MOVE_GRACE_SECONDS) -> bool:
+    """Move a user's rows to `target_shard`; returns False if they are already there"""
+    if not 0 <= target_shard < len(shard_engines):
+        raise ValueError(f"No shard {target_shard}; there are {len(shard_engines)}")
+    with SessionLocal() as directory:
+        user = directory.get(UserDB, user_id)
+        if user is None:
+            raise ValueError(f"No user {user_id}")
+        source_shard = user.shard or 0
+        if source_shard == target_shard:
+            return False
+        user.shard_moving = True
+        directory.commit()
+        try:
+            # Let requests that resolved the old shard before the flag was set finish
+            time.sleep(grace_seconds)
+            with SessionLocal(info={"shard": source_shard}) as source, \
+                    SessionLocal(info={"shard": target_shard}) as target:
+                _copy_user_rows(source, target, user_id)
+                target.commit()
+                user.shard = target_shard
+                user.shard_moving = None
+                directory.commit()
+                for table in USER_TABLES:
+                    source.execute(delete(table).where(table.c.user_id == user_id))
+                source.commit()
+        except Exception:
+            directory.rollback()
+            user.shard_moving = None
+            directory.commit()
+            raise
+    return True
+
+
+def plan_rebalance() -> List[Tuple[int, int, int]]:
+    """(user_id, from shard, to shard) moves evening out todo counts across shards"""
+    users_by_shard: Dict[int, Dict[int, int]] = {}
+    for shard in range(len(shard_engines)):
+        with SessionLocal(info={"shard": shard}) as db:
+            users_by_shard[shard] = dict(
+                db.query(TodoDB.user_id, func.count(TodoDB.id))
+                .filter(TodoDB.user_id.isnot(None))
+                .group_by(TodoDB.user_id)
+                .all()
+            )
+    load = {shard: sum(users.values()) for shard, users in users_by_shard.items()}
+    moves = []
+    while True:
+        fullest = max(load, key=load.get)
+        emptiest = min(load, key=load.get)
+        gap = load[fullest] - load[emptiest]
+        # The biggest user whose move narrows the gap
+        candidates = [
+            (count, user_id) for user_id, count in users_by_shard[fullest].items() if 0 < count < gap
+        ]
+        if not candidates:
+            return moves
+        count, user_id = max(candidates, key=lambda candidate: min(candidate[0], gap - candidate[0]))
+        del users_by_shard[fullest][user_id]
+        users_by_shard[emptiest][user_id] = count
+        load[fullest] -= count
+        load[emptiest] += count
+        moves.append((user_id, fullest, emptiest))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="Users and todos per shard")
+    move = commands.add_parser("move", help="Move one user to another shard")
+    move.add_argument("--user", type=int, required=True)
+    move.add_argument("--to", type=int, required=True, help="Target shard")
+    rebalance = commands.add_parser("rebalance", help="Move users until shards hold similar todo counts")
+    rebalance.add_argument("--dry-run", action="store_true", help="Only print the planned moves")
+    rebalance.add_argument("--max-moves", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == "status":
+        print(json.dumps(shard_status(), indent=2))
+    elif args.command == "move":
+        moved = move_user(args.user, args.to)
+        print(f"User {args.user} {'moved' if moved else 'already is'} on shard {args.to}")
+    else:
+        moves = plan_rebalance()[:args.max_moves]
+        for user_id, source, target in moves:
+            print(f"User {user_id}: shard {source} -> {target}")
+            if not args.dry_run:
+                move_user(user_id, target)
+        print(json.dumps(shard_status(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Group-commit writer thread for todo mutations.
+
+Todo creates, updates and deletes can be handed to one writer thread per worker and shard,
+which runs whatever has been queued in a single transaction, each write in its
+own savepoint so one failure does not sink the others, and pays one commit (one
+WAL sync) for the whole batch. Callers block until their write is committed, so
+responses are only sent for committed writes, each with its own result.
+
+It is used in two cases:
+
+- SQLite (SQLITE_WRITER_ENABLED, on by default). SQLite allows one writer at a
+  time. When request threads each commit on their own, transactions that started
+  by reading have to upgrade to the write lock, and that upgrade fails immediately
+  with "database is locked" whenever another connection committed in between
+  (busy_timeout does not help there). The writer opens its transactions with
+  BEGIN IMMEDIATE, so it waits for the lock instead.
+- Write coalescing (WRITE_COALESCING_ENABLED, any database). For bursts of small
+  writes such as checkbox toggles the writer also lingers WRITE_COALESCE_MS after
+  the first queued write to collect more before committing, trading a few
+  milliseconds of latency for far fewer commits. On SQLite it then commits with
+  synchronous=FULL, so every acknowledged write has been synced to disk.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+
+from database.db_models import DATABASE_URL, SHARD_URLS, SessionLocal, set_sqlite_pragmas
+
+SQLITE_WRITER_ENABLED = (
+    DATABASE_URL.startswith("sqlite")
+    and os.getenv("SQLITE_WRITER_ENABLED", "true").lower() == "true"
+)
+WRITE_COALESCING_ENABLED = os.getenv("WRITE_COALESCING_ENABLED", "false").lower() == "true"
+# How long the writer waits after the first queued write for more to join its batch
+WRITE_COALESCE_MS = float(os.getenv("WRITE_COALESCE_MS", "5"))
+# Writes committed together at most
+WRITER_MAX_BATCH = int(os.getenv("WRITER_MAX_BATCH", "200"))
+# How long a caller waits for its write before giving up
+WRITER_TIMEOUT_SECONDS = float(os.getenv("WRITER_TIMEOUT_SECONDS", "30"))
+
+WriteFunction = Callable[[Session], Any]
+
+
+def _begin_immediate(connection):
+    connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+    # Let SQLAlchemy emit BEGIN (and SAVEPOINT) itself instead of pysqlite's deferred BEGIN
+    dbapi_connection.isolation_level = None
+
+
+def _synchronous_full(dbapi_connection, connection_record):
+    dbapi_connection.execute("PRAGMA synchronous=FULL")
+
+
+class TodoWriter:
+    def __init__(
+        self,
+        shard: int = 0,
+        max_batch: int = WRITER_MAX_BATCH,
+        linger: float = WRITE_COALESCE_MS / 1000 if WRITE_COALESCING_ENABLED else 0
+    ):
+        self.shard = shard
+        self.database_url = SHARD_URLS[shard]
+        self.max_batch = max_batch
+        self.linger = linger
+        self._queue: "queue.Queue[Optional[Tuple[WriteFunction, Future]]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._session_factory = None
+        # Transactions committed so far, for benchmarks
+        self.commits = 0
+
+    def _create_session_factory(self):
+        if not self.database_url.startswith("sqlite"):
+            return lambda: SessionLocal(info={"shard": self.shard})
+        engine = create_engine(self.database_url, connect_args={"check_same_thread": False})
+        event.listen(engine, "connect", set_sqlite_pragmas)
+        event.listen(engine, "connect", _disable_pysqlite_transactions)
+        if self.linger:
+            # Listeners run in order, so this overrides synchronous=NORMAL
+            event.listen(engine, "connect", _synchronous_full)
+        event.listen(engine, "begin", _begin_immediate)
+        return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def _ensure_started(self):
+        # Started on first use, so each forked gunicorn worker gets its own thread
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self._session_factory is None:
+                self._session_factory = self._create_session_factory()
+            self._thread = threading.Thread(target=self._run, name="todo-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, fn: WriteFunction) -> Future:
+        """Queue `fn(session)`; the future resolves with its result once committed"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((fn, future))
+        return future
+
+    def run(self, fn: WriteFunction, timeout: float = WRITER_TIMEOUT_SECONDS) -> Any:
+        """Run `fn(session)` on the writer thread and wait for the commit"""
+        return self.submit(fn).result(timeout)
+
+    def stop(self):
+        """Commit everything queued so far and stop the thread"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._thread = None
+
+    def _next_batch(self) -> Tuple[List[Tuple[WriteFunction, Future]], bool]:
+        """Block for one write, then take what else arrives within the linger window"""
+        batch = []
+        item = self._queue.get()
+        deadline = time.monotonic() + self.linger
+        while item is not None:
+            batch.append(item)
+            if len(batch) >= self.max_batch:
+                break
+            try:
+                remaining = deadline - time.monotonic()
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+        return batch, item is None
+
+    def _run(self):
+        while True:
+            batch, stopping = self._next_batch()
+            if batch:
+                self._commit_batch(batch)
+            if stopping:
+                return
+
+    def _commit_batch(self, batch: List[Tuple[WriteFunction, Future]]):
+        results = []
+        session = self._session_factory()
+        try:
+            for fn, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    with session.begin_nested():
+                        results.append((future, fn(session), None))
+                except Exception as e:
+                    results.append((future, None, e))
+            session.commit()
+            self.commits += 1
+        except Exception as e:
+            session.rollback()
+            for future, _, _ in results:
+                future.set_exception(e)
+            return
+        finally:
+            session.close()
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+# Writer per shard, created on first use
+_writers: Dict[int, TodoWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def writer_for(shard: int = 0) -> TodoWriter:
+    with _writers_lock:
+        if shard not in _writers:
+            _writers[shard] = TodoWriter(shard)
+        return _writers[shard]
+
+
+def stop_writers():
+    """Commit the writes still queued on every shard's writer and stop them"""
+    for writer in list(_writers.values()):
+        writer.stop()
+
+
+def write(db: Session, fn: WriteFunction) -> Any:
+    """Run `fn(session)` and commit it: on the writer thread of `db`'s shard when enabled, else in `db`
+
+    `fn` must not commit itself (pass commit=False to the TodoDatabase methods).
+    """
+    if SQLITE_WRITER_ENABLED or WRITE_COALESCING_ENABLED:
+        return writer_for(db.info.get("shard", 0)).run(fn)
+    try:
+        result = fn(db)
+    except Exception:
+        # Like the writer's savepoint: a failed write leaves nothing behind
+        db.rollback()
+        raise
+    db.commit()
+    return result
@@ -0,0 +1,130 @@
+"""Gunicorn configuration for production.
+
+The app is imported once in the master (preload_app) and workers are forked from
+it, so imported modules, the OpenAPI schema and other warm state are shared
+copy-on-write instead of being rebuilt by every worker.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Environment overrides:
+- WEB_CONCURRENCY: fixed number of workers (skips auto sizing)
+- WORKER_MEMORY_MB: memory budgeted per worker when auto sizing (default 150)
+- BIND: listen address (default 0.0.0.0:5000)
+- FORWARDED_ALLOW_IPS: proxies (addresses or CIDR networks) whose X-Forwarded-For
+  is trusted for the client address (default 127.0.0.1; k8s-backend.yaml sets
+  the ingress CIDR)
+"""
+import gc
+import os
+import shutil
+import tempfile
+
+# Schema creation runs once in the master (see when_ready) instead of in every
+# worker's lifespan hook. Must be set before the app is preloaded.
+os.environ.setdefault("AUTO_MIGRATE", "false")
+
+# Workers write Prometheus samples here so /metrics can aggregate all of them.
+# Must exist before prometheus_client is imported by the preloaded app, and start
+# empty so samples from a previous run are not reported.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "todo-prometheus"))
+shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+# Rate limit buckets in a file shared by all workers, so limits do not multiply by
+# the worker count
+os.environ.setdefault("RATE_LIMIT_BACKEND", "sqlite")
+# Cached reads shared by the workers, and invalidated for all of them on writes
+os.environ.setdefault("CACHE_BACKEND", "sqlite")
+
+WORKER_MEMORY_MB = int(os.getenv("WORKER_MEMORY_MB", "150"))
+
+
+def _available_cpus() -> int:
+    """CPUs this container may use, honouring cgroup quotas and CPU affinity"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def _available_memory_mb() -> int:
+    """Memory limit of this container in MB, falling back to physical memory"""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+            # Unlimited cgroups report "max" or a huge sentinel value
+            if value != "max" and int(value) < 1 << 60:
+                return int(value) // (1024 * 1024)
+        except (OSError, ValueError):
+            continue
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+
+
+def default_workers() -> int:
+    """2 * CPUs + 1, capped by how many workers fit in memory"""
+    if os.getenv("WEB_CONCURRENCY"):
+        return max(1, int(os.environ["WEB_CONCURRENCY"]))
+    by_cpu = 2 * _available_cpus() + 1
+    # Keep a worker's worth of headroom for the master process
+    by_memory = _available_memory_mb() // WORKER_MEMORY_MB - 1
+    return max(1, min(by_cpu, by_memory))
+
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = default_workers()
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+# Behind the ALB / nginx every connection comes from the proxy; take the client
+# address from the X-Forwarded-For hop the trusted proxy appended, so rate limits
+# and logs see real clients instead of one shared proxy address
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+
+def when_ready(server):
+    """Runs in the master after the app is preloaded, before any worker is forked"""
+    from sqlalchemy.exc import OperationalError
+    from database.db_models import init_db, shard_engines
+
+    try:
+        init_db()
+    except OperationalError as e:
+        server.log.warning("Skipping schema creation, database unavailable: %s", e)
+
+    # Connections must not be shared across processes; drop the master's pools
+    for shard_engine in shard_engines:
+        shard_engine.dispose()
+
+    # Build the OpenAPI schema once so workers inherit it
+    from app import app
+    app.openapi()
+
+    # Move everything allocated so far out of the GC's reach, so collections in
+    # the workers do not touch (and un-share) these pages
+    gc.freeze()
+    server.log.info("Preloaded app, starting %d workers", workers)
+
+
+def post_fork(server, worker):
+    """Give each worker its own connection pool without closing the master's sockets"""
+    from database.db_models import shard_engines
+    for shard_engine in shard_engines:
+        shard_engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges (in-flight requests, pool usage) from /metrics"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -3,22 +3,33 @@
 Unified server that runs both FastAPI app and MCP server on the same port.
 """
 
-import uvicorn
+import os
+import sys
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from datetime import datetime
-import httpx
-from fastmcp import FastMCP
-from starlette.requests import Request
-from starlette.responses import PlainTextResponse
-from db_models import SessionLocal
-from routes import router
-from sample_data import create_sample_data
+
+# Make the backend packages importable when run as `python mcp/unified_server.py`.
+# Appended rather than prepended so this directory does not shadow the `mcp` SDK.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db_models import SessionLocal, init_db
+from api.routes import router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_db()
+    # The MCP server's session manager runs for as long as the app
+    async with mcp_app.lifespan():
+        yield
 
 # Create FastAPI app
 app = FastAPI(
     title="Intelligent Todo API with MCP", 
     description="A comprehensive todo application with advanced AI features and MCP integration",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Include the todo routes
@@ -34,7 +45,7 @@ def health_check():
     db = SessionLocal()
     try:
         # Simple database connectivity check
-        from database import todo_db
+        from database.database import todo_db
         todos = todo_db.get_all_todos(db)
         todo_count = len(todos)
     except Exception:
@@ -49,92 +60,54 @@ def health_check():
         "version": "2.0.0"
     }
 
-# Create MCP server instance
-mcp = FastMCP("Intelligent Todo MCP Server")
+def create_mcp_server():
+    """Build the MCP server; fastmcp is only imported once this is called."""
+    from fastmcp import FastMCP
+    from starlette.requests import Request
+    from starlette.responses import PlainTextResponse
+    from api.mcp_tools import register_tools
 
-@mcp.custom_route("/mcp-health", methods=["GET"])
-async def mcp_health_check(request: Request) -> PlainTextResponse:
-    return PlainTextResponse("MCP Server OK")
+    mcp = FastMCP("Intelligent Todo MCP Server")
 
-@mcp.tool(name="get_all_tasks", description="get all tasks from the todo database")
-def get_todo():
-    """Fetches all todos from the database."""
-    db = SessionLocal()
-    try:
-        from database import todo_db
-        todos = todo_db.get_all_todos(db)
-    except Exception:
-        todos = []
-    finally:
-        db.close()
-    return todos
+    @mcp.custom_route("/mcp-health", methods=["GET"])
+    async def mcp_health_check(request: Request) -> PlainTextResponse:
+        return PlainTextResponse("MCP Server OK")
 
-@mcp.tool(name="get_todo_by_id", description="get a todo by its ID")
-def get_todo_by_id(todo_id: int) -> dict:
-    """Fetches a todo by its ID."""
-    db = SessionLocal()
-    try:
-        from database import todo_db
-        todo = todo_db.get_todo_by_id(db, todo_id)
-    except Exception:
-        todo = {}
-    finally:
-        db.close()
-    return todo
+    register_tools(mcp)
+    return mcp
 
-@mcp.resource("request://structures")
-def get_sample_requests() -> dict:
-    """Samples for request json structures"""
-    return {
-        "create_todo": {
-            "title": "Buy groceries",
-            "description": "Milk, Bread, Eggs",
-            "priority": "medium",
-            "due_date": "2025-08-05",
-            "category": "Shopping"
-        },
-        "update_todo": {
-            "title": "Buy groceries and fruits",
-            "description": "Milk, Bread, Eggs, Apples",
-            "priority": "high",
-            "due_date": "2025-08-06",
-            "category": "Shopping"
-        },
-        "bulk_update": {
-            "todo_ids": [1, 2],
-            "updates": {
-                "priority": "urgent",
-                "completed": True
-            }
-        },
-        "import_todos": [
-            {
-                "title": "Read a book",
-                "description": "Start reading 'Atomic Habits'",
-                "priority": "low",
-                "due_date": "2025-08-15",
-                "category": "Personal"
-            },
-            {
-                "title": "Finish project report",
-                "description": "Complete the final draft and send to manager",
-                "priority": "high",
-                "due_date": "2025-08-10",
-                "category": "Work"
-            }
-        ],
-        "search_todos": {
-            "q": "project",
-            "include_completed": True,
-            "limit": 10
-        }
-    }
+
+class LazyMCPApp:
+    """ASGI app for /mcp that builds the MCP server when the app starts instead of at import."""
+
+    def __init__(self):
+        self._app = None
+
+    @asynccontextmanager
+    async def lifespan(self):
+        """Build the MCP HTTP app and run its lifespan (session manager) until shutdown"""
+        self._app = create_mcp_server().http_app(path="/")
+        try:
+            async with self._app.lifespan(self._app):
+                yield
+        finally:
+            self._app = None
+
+    async def __call__(self, scope, receive, send):
+        if self._app is None:
+            raise RuntimeError("The MCP server only runs inside the app lifespan")
+        await self._app(scope, receive, send)
 
 # Mount MCP server as a sub-application
-app.mount("/mcp", mcp)
+mcp_app = LazyMCPApp()
+app.mount("/mcp", mcp_app)
 
 if __name__ == "__main__":
+    import uvicorn
+    from database.sample_data import create_sample_data
+
     # Create sample data
+    init_db()
     create_sample_data()
     
     print("Starting unified server with both FastAPI and MCP on port 8000...")
@@ -0,0 +1,57 @@
+"""Test setup: two throwaway SQLite shards, background jobs and rate limiting off.
+
+Configuration is read at import, so the environment is set here before any app
+module is imported.
+
+    cd backend && python -m pytest -q
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_data_dir = tempfile.mkdtemp(prefix="todo-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{_data_dir}/shard0.db",
+    DATABASE_SHARDS=f"sqlite:///{_data_dir}/shard1.db",
+    CACHE_BACKEND="memory",
+    RATE_LIMIT_ENABLED="false",
+    REMINDERS_ENABLED="false",
+    ARCHIVE_ENABLED="false",
+    REQUEST_INSTRUMENTATION="false",
+    SHARD_MOVE_GRACE_SECONDS="0",
+)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def signup(client):
+    """Sign up a user; returns (user id, Authorization headers)"""
+    def create(email: str):
+        response = client.post("/api/auth/signup", json={"email": email, "password": "secret123", "name": "Test"})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        return body["user"]["id"], {"Authorization": f"Bearer {body['access_token']}"}
+    return create
+
+
+@pytest.fixture
+def published(monkeypatch):
+    """Todo deltas handed to the broker, as (user id, data) pairs"""
+    from api.events import broker
+
+    events = []
+    monkeypatch.setattr(broker, "publish", lambda topic, user_id, event: events.append((user_id, event["data"])))
+    return events
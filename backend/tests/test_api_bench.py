@@ -0,0 +1,44 @@
+import asyncio
+
+from benchmarks import api_bench
+
+
+def _report(p95_ms: float, throughput_rps: float) -> dict:
+    return {"results": [{"scenario": "list", "concurrency": 8, "p95_ms": p95_ms, "throughput_rps": throughput_rps}]}
+
+
+def test_percentiles_pick_the_nearest_rank():
+    values = [i / 100 for i in range(1, 101)]
+    assert (api_bench._percentile(values, 50), api_bench._percentile(values, 99)) == (0.51, 0.99)
+    assert api_bench._percentile([], 95) == 0.0
+
+
+def test_compare_flags_only_changes_beyond_the_tolerance():
+    baseline = _report(p95_ms=10.0, throughput_rps=100.0)
+    assert api_bench.compare(_report(10.5, 95.0), baseline, tolerance=0.10) == 0
+    assert api_bench.compare(_report(12.0, 100.0), baseline, tolerance=0.10) == 1
+    assert api_bench.compare(_report(10.0, 80.0), baseline, tolerance=0.10) == 1
+
+
+def test_run_scenario_sends_the_requested_count_and_counts_errors():
+    class Response:
+        def __init__(self, status_code):
+            self.status_code = status_code
+
+    class Client:
+        def __init__(self):
+            self.calls = 0
+
+        async def request(self, method, path, json=None, headers=None):
+            self.calls += 1
+            status_code = 429 if self.calls % 5 == 0 else 200
+            await asyncio.sleep(0)
+            return Response(status_code)
+
+    client = Client()
+    result = asyncio.run(api_bench.run_scenario(client, "list", lambda: ("GET", "/api/todos", None), 4, 20, {}))
+
+    assert client.calls == result["requests"] == 20
+    assert result["status_codes"] == {"200": 16, "429": 4}
+    assert result["errors"] == 4
+    assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
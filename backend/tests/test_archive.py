@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, update
+
+from database.database import todo_db
+from database.db_models import SessionLocal, TodoArchiveDB, TodoDB
+
+
+def test_archive_moves_due_todos_and_publishes_deletions(client, signup, published):
+    user_id, headers = signup("archive@example.com")
+    ids = [client.post("/api/todos", json={"title": title}, headers=headers).json()["id"]
+           for title in ("old", "clashing", "open")]
+    old, clashing, open_todo = ids
+    with SessionLocal() as db:
+        todo_db.use_user_shard(db, user_id)
+        db.execute(update(TodoDB).where(TodoDB.id.in_([old, clashing]))
+                   .values(completed=True, updated_at=datetime.utcnow() - timedelta(days=60)))
+        # An archived row holding the same id, as left by a table that reused ids
+        db.execute(insert(TodoArchiveDB).values(id=clashing, title="stale", user_id=user_id))
+        db.commit()
+    published.clear()
+
+    with SessionLocal() as db:
+        todo_db.use_user_shard(db, user_id)
+        moved = todo_db.archive_todos(db, datetime.utcnow() - timedelta(days=30), user_ids=[user_id])
+
+    assert moved == 1
+    assert published == [(user_id, {"op": "deleted", "id": old})]
+    listed = [todo["id"] for todo in client.get("/api/todos", headers=headers).json()]
+    assert sorted(listed) == sorted([clashing, open_todo])
+    archived = client.get("/api/todos", params={"include_archived": "true"}, headers=headers).json()
+    assert old in [todo["id"] for todo in archived]
@@ -0,0 +1,59 @@
+from database.database import todo_db
+from database.db_models import SHARD_ID_SPACING, SessionLocal, TodoDB
+
+
+def test_best_effort_batch_skips_the_failed_operation(client, signup, monkeypatch):
+    user_id, headers = signup("batch@example.com")
+    existing = client.post("/api/todos", json={"title": "existing"}, headers=headers).json()["id"]
+
+    from api.events import broker
+    published = []
+
+    def record(topic, user, event):
+        # Deltas go out only once the whole batch is committed
+        with SessionLocal() as other:
+            todo_db.use_user_shard(other, user)
+            published.append((event["data"]["op"], other.get(TodoDB, existing).title))
+    monkeypatch.setattr(broker, "publish", record)
+
+    response = client.post("/api/batch", headers=headers, json={"mode": "best_effort", "operations": [
+        {"op": "update", "id": existing, "data": {"title": "renamed"}},
+        {"op": "update", "id": 999999, "data": {"title": "missing"}},
+        {"op": "create", "data": {"title": "new"}},
+    ]})
+
+    body = response.json()
+    assert body["committed"] is True
+    assert [result["status"] for result in body["results"]] == [200, 404, 200]
+    assert body["results"][1]["error"] == "Todo not found"
+    assert published == [("updated", "renamed"), ("created", "renamed")]
+    titles = [todo["title"] for todo in client.get("/api/todos", headers=headers).json()]
+    assert sorted(titles) == ["new", "renamed"]
+
+
+def test_atomic_batch_is_one_write_and_rolls_back_entirely(client, signup, published):
+    from database.writer import writer_for
+
+    user_id, headers = signup("atomic@example.com")
+    existing = client.post("/api/todos", json={"title": "existing"}, headers=headers).json()["id"]
+    published.clear()
+
+    body = client.post("/api/batch", headers=headers, json={"mode": "atomic", "operations": [
+        {"op": "update", "id": existing, "data": {"title": "renamed"}},
+        {"op": "delete", "id": 999999},
+        {"op": "create", "data": {"title": "never"}},
+    ]}).json()
+
+    assert body["committed"] is False
+    assert [result["status"] for result in body["results"]] == [424, 404, 424]
+    assert published == []
+    assert [todo["title"] for todo in client.get("/api/todos", headers=headers).json()] == ["existing"]
+
+    writer = writer_for(0 if existing < SHARD_ID_SPACING else 1)
+    commits = writer.commits
+    client.post("/api/batch", headers=headers, json={"operations": [
+        {"op": "update", "id": existing, "data": {"title": "renamed"}},
+        {"op": "create", "data": {"title": "new"}},
+    ]})
+    # Both operations were committed by the writer thread, together
+    assert writer.commits == commits + 1
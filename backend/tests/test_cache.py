@@ -0,0 +1,82 @@
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+
+from api import cache as cache_module
+from api.cache import Cache, LRUCache, RedisCacheBackend, SQLiteCacheBackend, cached
+
+ADAPTER = TypeAdapter(List[str])
+
+
+class FakeRedis:
+    """The get/set/incr subset of redis.Redis, in memory"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+
+def test_lru_evicts_the_least_recently_used_and_expires_entries():
+    lru = LRUCache(max_entries=2)
+    lru.set("a", 1, ttl=60)
+    lru.set("b", 2, ttl=60)
+    assert lru.get("a") == 1
+    lru.set("c", 3, ttl=60)
+    assert (lru.get("a"), lru.get("b"), lru.get("c")) == (1, None, 3)
+    lru.set("old", 4, ttl=0)
+    assert lru.get("old") is None
+
+
+@pytest.mark.parametrize("shared", ["redis", "sqlite"])
+def test_a_bump_in_one_worker_invalidates_the_others(shared, tmp_path):
+    if shared == "redis":
+        backend = RedisCacheBackend(FakeRedis())
+    else:
+        backend = SQLiteCacheBackend(str(tmp_path / "cache.db"))
+    # Two workers: separate local tiers over one shared tier
+    first, second = Cache(backend), Cache(backend)
+    computed = []
+
+    def read(worker: Cache, value: str):
+        def compute():
+            computed.append(value)
+            return [value]
+        return worker.get_or_compute("categories", "user:1", "[]", compute, ADAPTER)
+
+    assert read(first, "v1") == ["v1"]
+    # Answered by the shared tier, not recomputed
+    assert read(second, "v2") == ["v1"]
+    first.bump("user:1")
+    assert read(second, "v3") == ["v3"]
+    assert read(first, "v4") == ["v3"]
+    assert computed == ["v1", "v3"]
+
+
+def test_writes_invalidate_only_the_writers_cached_reads(client, signup, monkeypatch):
+    monkeypatch.setattr(cache_module, "cache", Cache())
+    calls = []
+
+    @cached("test_reads")
+    def read(user_id: int) -> List[str]:
+        calls.append(user_id)
+        return [str(len(calls))]
+
+    user_id, headers = signup("cache-writer@example.com")
+    other_id, _ = signup("cache-bystander@example.com")
+    read(user_id), read(other_id)
+    read(user_id), read(other_id)
+    assert calls == [user_id, other_id]
+
+    client.post("/api/todos", json={"title": "bump"}, headers=headers)
+    read(user_id), read(other_id)
+    assert calls == [user_id, other_id, user_id]
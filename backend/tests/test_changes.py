@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+from database.database import todo_db
+from database.db_models import SessionLocal, TodoDB
+
+
+def _insert_todo(user_id: int, title: str, updated_at: datetime) -> int:
+    with SessionLocal() as db:
+        todo_db.use_user_shard(db, user_id)
+        todo = TodoDB(title=title, user_id=user_id, created_at=updated_at, updated_at=updated_at)
+        db.add(todo)
+        db.commit()
+        return todo.id
+
+
+def test_sync_token_holds_back_for_late_commits(client, signup):
+    user_id, headers = signup("changes@example.com")
+    settled = _insert_todo(user_id, "settled", datetime.utcnow() - timedelta(hours=1))
+    recent = client.post("/api/todos", json={"title": "recent"}, headers=headers).json()["id"]
+
+    first = client.get("/api/todos/changes", headers=headers).json()
+    assert [todo["id"] for todo in first["changed"]] == [settled, recent]
+
+    # A transaction that stamped its row before the first sync but committed after it
+    late = _insert_todo(user_id, "late", datetime.utcnow() - timedelta(seconds=1))
+
+    second = client.get("/api/todos/changes", params={"since": first["next_token"]}, headers=headers).json()
+    # The settled todo is behind the token; the recent window is scanned again
+    assert sorted(todo["id"] for todo in second["changed"]) == sorted([recent, late])
+    assert second["has_more"] is False
+
+
+def test_recent_deletions_are_sent_again(client, signup):
+    _, headers = signup("tombstones@example.com")
+    todo_id = client.post("/api/todos", json={"title": "doomed"}, headers=headers).json()["id"]
+    token = client.get("/api/todos/changes", headers=headers).json()["next_token"]
+
+    client.delete(f"/api/todos/{todo_id}", headers=headers)
+    first = client.get("/api/todos/changes", params={"since": token}, headers=headers).json()
+    second = client.get("/api/todos/changes", params={"since": first["next_token"]}, headers=headers).json()
+    assert first["deleted"] == second["deleted"] == [todo_id]
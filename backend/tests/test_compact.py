@@ -0,0 +1,45 @@
+import sqlite3
+
+from sqlalchemy import create_engine, event, insert
+
+from api import archiver
+from database.db_models import SessionLocal, TodoDB, set_sqlite_pragmas, shard_engines
+
+
+def _free_pages(shard: int) -> int:
+    return sqlite3.connect(shard_engines[shard].url.database).execute("PRAGMA freelist_count").fetchone()[0]
+
+
+def test_compact_reclaims_free_pages_in_incremental_steps(client, monkeypatch):
+    monkeypatch.setattr(archiver, "ARCHIVE_VACUUM_FREE_RATIO", 0)
+    monkeypatch.setattr(archiver, "ARCHIVE_VACUUM_STEP_PAGES", 50)
+    monkeypatch.setattr(archiver, "ARCHIVE_BATCH_PAUSE_SECONDS", 0)
+    with SessionLocal(info={"shard": 1}) as db:
+        db.execute(insert(TodoDB), [{"title": "x" * 2000, "user_id": 0} for _ in range(500)])
+        db.commit()
+        db.query(TodoDB).filter(TodoDB.user_id == 0).delete()
+        db.commit()
+    assert _free_pages(1) > 50
+
+    assert archiver.compact(1) > 0
+    assert _free_pages(1) == 0
+
+
+def test_vacuum_switches_an_existing_database_to_incremental(tmp_path):
+    path = tmp_path / "old.db"
+    old = sqlite3.connect(path)
+    old.execute("PRAGMA journal_mode=WAL")
+    old.execute("CREATE TABLE t (x)")
+    old.close()
+
+    engine = create_engine(f"sqlite:///{path}")
+    event.listen(engine, "connect", set_sqlite_pragmas)
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 0
+
+    shard_engines.append(engine)
+    try:
+        archiver.vacuum(len(shard_engines) - 1)
+    finally:
+        shard_engines.pop()
+    assert sqlite3.connect(path).execute("PRAGMA auto_vacuum").fetchone()[0] == 2
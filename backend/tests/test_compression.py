@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import event
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from api import compression
+from api.compression import CompressionMiddleware, choose_encoding
+
+
+@pytest.fixture
+def app_client():
+    def sized(request):
+        return PlainTextResponse("x" * int(request.query_params["size"]))
+
+    def streamed(request):
+        chunks = (f"chunk {n}\n" * 50 for n in range(3))
+        return StreamingResponse(chunks, media_type=request.query_params.get("type", "text/plain"))
+
+    app = Starlette(routes=[Route("/sized", sized), Route("/streamed", streamed)])
+    return TestClient(CompressionMiddleware(app, minimum_size=100))
+
+
+def test_choose_encoding_honours_quality_and_brotli_availability(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert choose_encoding("br, gzip") == "gzip"
+    assert choose_encoding("gzip;q=0, deflate") is None
+    monkeypatch.setattr(compression, "brotli", object())
+    assert choose_encoding("gzip, br;q=0.5") == "br"
+    assert choose_encoding("br;q=0, gzip") == "gzip"
+
+
+def test_only_bodies_above_the_threshold_are_compressed(app_client):
+    small = app_client.get("/sized", params={"size": 99}, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+    large = app_client.get("/sized", params={"size": 100}, headers={"Accept-Encoding": "gzip"})
+    assert large.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in large.headers["vary"].lower()
+    assert large.text == "x" * 100
+
+    plain = app_client.get("/sized", params={"size": 100}, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+
+def test_streams_are_compressed_chunk_by_chunk_except_event_streams(app_client):
+    streamed = app_client.get("/streamed", headers={"Accept-Encoding": "gzip"})
+    assert streamed.headers["content-encoding"] == "gzip"
+    assert "content-length" not in streamed.headers
+    assert streamed.text.count("chunk") == 150
+
+    events = app_client.get("/streamed", params={"type": "text/event-stream"}, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in events.headers
+
+
+def test_fields_select_only_those_columns(client, signup):
+    from database.db_models import shard_engines
+
+    _, headers = signup("fields@example.com")
+    client.post("/api/todos", json={"title": "slim", "description": "long " * 50}, headers=headers)
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "todos" in statement:
+            statements.append(statement)
+
+    for shard_engine in shard_engines:
+        event.listen(shard_engine, "before_cursor_execute", capture)
+    try:
+        response = client.get("/api/todos", params={"fields": "title"}, headers=headers)
+    finally:
+        for shard_engine in shard_engines:
+            event.remove(shard_engine, "before_cursor_execute", capture)
+
+    assert response.json() == [{"id": response.json()[0]["id"], "title": "slim"}]
+    assert statements and all("description" not in statement for statement in statements)
+    assert client.get("/api/todos", params={"fields": "title,secret"}, headers=headers).status_code == 400
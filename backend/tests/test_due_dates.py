@@ -0,0 +1,45 @@
+from datetime import date, timedelta
+
+import pytest
+
+from api.utils import decode_due_cursor, encode_due_cursor
+
+
+def _days(n: int) -> str:
+    return (date.today() + timedelta(days=n)).isoformat()
+
+
+def _pages(client, path: str, headers: dict, **params) -> list:
+    """Titles of every page, following X-Next-Cursor"""
+    pages = []
+    params["limit"] = 1
+    while True:
+        response = client.get(path, params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        pages.append([todo["title"] for todo in response.json()])
+        if "X-Next-Cursor" not in response.headers:
+            return pages
+        params["cursor"] = response.headers["X-Next-Cursor"]
+
+
+def test_due_cursor_round_trips_and_rejects_garbage():
+    position = (date(2025, 8, 6), 42)
+    assert encode_due_cursor(position) == "2025-08-06_42"
+    assert decode_due_cursor(encode_due_cursor(position)) == position
+    assert encode_due_cursor(None) is None and decode_due_cursor("") is None
+    with pytest.raises(ValueError):
+        decode_due_cursor("yesterday")
+
+
+def test_overdue_and_due_soon_are_open_todos_of_the_user_by_due_date(client, signup):
+    _, headers = signup("due@example.com")
+    _, other = signup("due-other@example.com")
+    for title, due in (("late", -2), ("later", -5), ("today", 0), ("soon", 2), ("far", 20)):
+        client.post("/api/todos", json={"title": title, "due_date": _days(due)}, headers=headers)
+    done = client.post("/api/todos", json={"title": "done", "due_date": _days(-1)}, headers=headers).json()
+    client.put(f"/api/todos/{done['id']}", json={"completed": True}, headers=headers)
+    client.post("/api/todos", json={"title": "not mine", "due_date": _days(-1)}, headers=other)
+
+    assert _pages(client, "/api/todos/overdue", headers) == [["later"], ["late"]]
+    assert _pages(client, "/api/todos/due-soon", headers, days=3) == [["today"], ["soon"]]
+    assert client.get("/api/todos/overdue", params={"cursor": "bogus"}, headers=headers).status_code == 400
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+
+from api import events
+from api.events import EventBroker, format_sse
+
+
+def test_format_sse_frames_id_event_and_json_data():
+    assert format_sse({"id": 3, "event": "todo", "data": {"op": "deleted", "id": 7}}) == (
+        'id: 3\nevent: todo\ndata: {"op": "deleted", "id": 7}\n\n'
+    )
+    assert format_sse({"event": "todo", "data": {}}) == "event: todo\ndata: {}\n\n"
+
+
+def test_broker_delivers_from_other_threads_to_that_user_only():
+    broker = EventBroker()
+
+    async def scenario():
+        mine = broker.subscribe("todos", 1)
+        theirs = broker.subscribe("todos", 2)
+        # Sync endpoints publish from the threadpool
+        thread = threading.Thread(target=broker.publish, args=("todos", 1, {"event": "todo", "data": {"op": "x"}}))
+        thread.start()
+        thread.join()
+        event = await asyncio.wait_for(mine.get(), timeout=1)
+        broker.unsubscribe("todos", 1, mine)
+        return event, theirs.empty(), broker.has_subscribers("todos", 1)
+
+    assert asyncio.run(scenario()) == ({"event": "todo", "data": {"op": "x"}}, True, False)
+
+
+def test_slow_subscribers_lose_the_oldest_events(monkeypatch):
+    monkeypatch.setattr(events, "SUBSCRIBER_QUEUE_SIZE", 2)
+    broker = EventBroker()
+
+    async def scenario():
+        queue = broker.subscribe("todos", 1)
+        for n in range(4):
+            broker.publish("todos", 1, {"event": "todo", "data": n})
+        await asyncio.sleep(0)
+        return [queue.get_nowait()["data"] for _ in range(queue.qsize())]
+
+    assert asyncio.run(scenario()) == [2, 3]
+
+
+def test_todo_writes_publish_deltas_after_commit(client, signup, published):
+    user_id, headers = signup("deltas@example.com")
+    todo_id = client.post("/api/todos", json={"title": "watched"}, headers=headers).json()["id"]
+    client.put(f"/api/todos/{todo_id}", json={"completed": True}, headers=headers)
+    client.delete(f"/api/todos/{todo_id}", headers=headers)
+
+    ops = [(owner, data["op"], data["id"]) for owner, data in published]
+    assert ops == [(user_id, "created", todo_id), (user_id, "updated", todo_id), (user_id, "deleted", todo_id)]
+    assert published[1][1]["todo"]["completed"] is True
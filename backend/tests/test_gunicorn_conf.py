@@ -0,0 +1,49 @@
+import importlib.util
+import os
+
+import pytest
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gunicorn.conf.py")
+
+
+@pytest.fixture
+def config(monkeypatch, tmp_path):
+    """gunicorn.conf.py loaded as a module, without leaking its environment defaults"""
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path / "prometheus"))
+    for name, value in (("AUTO_MIGRATE", "false"), ("RATE_LIMIT_BACKEND", "memory"), ("CACHE_BACKEND", "memory")):
+        monkeypatch.setenv(name, value)
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    spec = importlib.util.spec_from_file_location("gunicorn_conf", CONFIG_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_web_concurrency_fixes_the_worker_count(config, monkeypatch):
+    assert (config.workers, config.preload_app) == (3, True)
+    monkeypatch.setenv("WEB_CONCURRENCY", "0")
+    assert config.default_workers() == 1
+
+
+def test_workers_are_capped_by_memory_then_cpus(config, monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY")
+    monkeypatch.setattr(config, "_available_cpus", lambda: 4)
+    # 600 MB fits four 150 MB workers, less one for the master
+    monkeypatch.setattr(config, "_available_memory_mb", lambda: 600)
+    assert config.default_workers() == 3
+    monkeypatch.setattr(config, "_available_memory_mb", lambda: 64_000)
+    assert config.default_workers() == 9
+
+
+def test_post_fork_drops_inherited_pools_without_closing_them(config, monkeypatch):
+    import database.db_models
+
+    calls = []
+
+    class Engine:
+        def dispose(self, close=True):
+            calls.append(close)
+
+    monkeypatch.setattr(database.db_models, "shard_engines", [Engine(), Engine()])
+    config.post_fork(server=None, worker=None)
+    assert calls == [False, False]
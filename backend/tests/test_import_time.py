@@ -0,0 +1,12 @@
+import pytest
+
+from benchmarks.import_time import DEFAULT_BUDGET_MS, LAZY_MODULES, measure_import
+
+
+@pytest.mark.parametrize("module", ["app", "mcp.unified_server"])
+def test_import_stays_within_budget(module):
+    rows = measure_import(module)
+    loaded = {name.strip() for name, _, _ in rows}
+    assert not loaded & set(LAZY_MODULES), "optional subsystems imported eagerly"
+    total_ms = next(cumulative for name, _, cumulative in rows if name == module) / 1000
+    assert total_ms <= DEFAULT_BUDGET_MS
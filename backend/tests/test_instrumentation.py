@@ -0,0 +1,53 @@
+import json
+import logging
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import declarative_base
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from api.instrumentation import N_PLUS_ONE_THRESHOLD, TimingMiddleware, instrument_engine, logger, record_conversion
+
+
+def _app(queries: int):
+    engine = create_engine("sqlite://")
+    instrument_engine(engine, declarative_base())
+
+    def endpoint(request):
+        with engine.connect() as connection:
+            for i in range(queries):
+                connection.execute(text("SELECT :i"), {"i": i})
+        record_conversion(0.002)
+        return PlainTextResponse("ok")
+
+    return TimingMiddleware(Starlette(routes=[Route("/", endpoint)]))
+
+
+@pytest.fixture
+def request_log(caplog, monkeypatch):
+    """Records of the todo.requests logger, which normally writes straight to stderr"""
+    monkeypatch.setattr(logger, "propagate", True)
+    caplog.set_level(logging.INFO, logger=logger.name)
+    return caplog
+
+
+def test_server_timing_counts_the_request_queries(request_log):
+    response = TestClient(_app(queries=2)).get("/")
+
+    header = response.headers["server-timing"]
+    assert header.startswith("app;dur=") and 'desc="2 queries, 0 rows"' in header
+    assert "convert;dur=2.00" in header
+    record = json.loads(request_log.records[-1].message)
+    assert (record["path"], record["status"], record["sql_count"]) == ("/", 200, 2)
+    assert "n_plus_one" not in record
+
+
+def test_repeated_statements_are_flagged_as_n_plus_one(request_log):
+    TestClient(_app(queries=N_PLUS_ONE_THRESHOLD)).get("/")
+
+    warning = request_log.records[-1]
+    assert warning.levelno == logging.WARNING
+    assert json.loads(warning.message)["n_plus_one"] == [{"statement": "SELECT ?", "count": N_PLUS_ONE_THRESHOLD}]
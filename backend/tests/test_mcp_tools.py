@@ -0,0 +1,41 @@
+import pytest
+
+
+def test_get_tasks_pages_with_only_the_requested_fields(client, signup):
+    from api.mcp_tools import get_tasks
+
+    user_id, headers = signup("mcp@example.com")
+    ids = [client.post("/api/todos", json={"title": f"mcp {i}"}, headers=headers).json()["id"] for i in range(3)]
+
+    first = get_tasks(user_id=user_id, fields=["title"], limit=2)
+    assert first["todos"] == [{"id": ids[2], "title": "mcp 2"}, {"id": ids[1], "title": "mcp 1"}]
+    rest = get_tasks(user_id=user_id, fields=["title"], cursor=first["next_cursor"], limit=2)
+    assert rest == {"todos": [{"id": ids[0], "title": "mcp 0"}], "next_cursor": None}
+
+    full = get_tasks(user_id=user_id, limit=1)["todos"][0]
+    assert full["priority"] == "medium" and isinstance(full["created_at"], str)
+    with pytest.raises(ValueError):
+        get_tasks(user_id=user_id, fields=["password"])
+
+
+def test_register_tools_adds_every_tool_once():
+    from api import mcp_tools
+
+    class Recorder:
+        def __init__(self):
+            self.tools, self.resources = {}, {}
+
+        def tool(self, name, description):
+            return lambda fn: self.tools.setdefault(name, fn)
+
+        def resource(self, uri):
+            return lambda fn: self.resources.setdefault(uri, fn)
+
+    mcp = Recorder()
+    mcp_tools.register_tools(mcp)
+    assert mcp.tools == {
+        "get_all_tasks": mcp_tools.get_tasks,
+        "get_tasks_summary": mcp_tools.get_tasks_summary,
+        "get_todo_by_id": mcp_tools.get_todo_by_id,
+    }
+    assert mcp.resources["request://structures"]()["bulk_update"]["updates"]["completed"] is True
@@ -0,0 +1,36 @@
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+
+from api import metrics
+
+
+def test_route_template_puts_path_parameters_back():
+    scope = {"endpoint": object(), "path": "/api/todos/7/subtasks/7", "path_params": {"todo_id": 7}}
+    # The last matching segment is the parameter
+    assert metrics.route_template(scope) == "/api/todos/7/subtasks/{todo_id}"
+    assert metrics.route_template({"path": "/nope"}) == "unmatched"
+
+
+def test_requests_are_labelled_by_route_template(client, signup):
+    _, headers = signup("metrics@example.com")
+    todo_id = client.post("/api/todos", json={"title": "measured"}, headers=headers).json()["id"]
+    client.get(f"/api/todos/{todo_id}", headers=headers)
+
+    body = client.get("/metrics").text
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/todos/{todo_id}",status="200"}' in body
+    assert f"/api/todos/{todo_id}\"" not in body
+
+
+def test_slow_queries_and_pool_usage_are_counted(monkeypatch):
+    engine = create_engine("sqlite://")
+    metrics.instrument_pool(engine)
+    monkeypatch.setattr(metrics, "SLOW_QUERY_SECONDS", 0.0)
+    slow_before = REGISTRY.get_sample_value("db_slow_queries_total")
+    in_use_before = REGISTRY.get_sample_value("db_pool_connections_in_use")
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        assert REGISTRY.get_sample_value("db_pool_connections_in_use") == in_use_before + 1
+
+    assert REGISTRY.get_sample_value("db_slow_queries_total") == slow_before + 1
+    assert REGISTRY.get_sample_value("db_pool_connections_in_use") == in_use_before
@@ -0,0 +1,66 @@
+from sqlalchemy import text
+
+from database.db_models import SessionLocal, TodoDB
+from database.database import todo_db
+from database.pending import defer, on_commit
+from database.writer import write
+
+handled = []
+
+
+@on_commit("test_items")
+def _handle(items):
+    handled.append(list(items))
+
+
+def test_savepoint_release_waits_for_root_commit():
+    handled.clear()
+    with SessionLocal() as db:
+        db.execute(text("SELECT 1"))
+        with db.begin_nested():
+            defer(db, "test_items", 1)
+        assert handled == []
+        db.commit()
+    assert handled == [[1]]
+
+
+def test_savepoint_rollback_drops_only_its_items():
+    handled.clear()
+    with SessionLocal() as db:
+        defer(db, "test_items", 1)
+        savepoint = db.begin_nested()
+        defer(db, "test_items", 2)
+        savepoint.rollback()
+        with db.begin_nested():
+            defer(db, "test_items", 3)
+        db.commit()
+    assert handled == [[1, 3]]
+
+
+def test_root_rollback_and_close_drop_everything():
+    handled.clear()
+    with SessionLocal() as db:
+        defer(db, "test_items", 1)
+        db.rollback()
+        defer(db, "test_items", 2)
+    with SessionLocal() as db:
+        db.commit()
+    assert handled == []
+
+
+def test_writer_publishes_after_commit(signup, monkeypatch):
+    user_id, _ = signup("writer@example.com")
+    seen = []
+
+    def check_committed(topic, user, event):
+        # Another session only sees the todo once the writer's batch has committed
+        with SessionLocal() as other:
+            todo_db.use_user_shard(other, user)
+            seen.append(other.get(TodoDB, event["data"]["todo"]["id"]) is not None)
+
+    from api.events import broker
+    monkeypatch.setattr(broker, "publish", check_committed)
+    with SessionLocal() as db:
+        todo_db.use_user_shard(db, user_id)
+        write(db, lambda session: todo_db.create_todo(session, {"title": "t", "user_id": user_id}, commit=False))
+    assert seen == [True]
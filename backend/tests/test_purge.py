@@ -0,0 +1,45 @@
+from sqlalchemy import func
+
+from database.db_models import SessionLocal, TodoDB
+
+
+def _todo_count(user_id: int) -> int:
+    with SessionLocal(info={"shard": 0}) as shard0, SessionLocal(info={"shard": 1}) as shard1:
+        return sum(db.query(func.count(TodoDB.id)).filter(TodoDB.user_id == user_id).scalar() for db in (shard0, shard1))
+
+
+def test_purge_runs_after_the_response(client, signup, published):
+    user_id, headers = signup("purge@example.com")
+    for i in range(3):
+        client.post("/api/todos", json={"title": f"todo {i}"}, headers=headers)
+
+    response = client.post("/api/todos/purge", headers=headers)
+
+    assert response.status_code == 202
+    assert response.json() == {"message": "Purge started"}
+    assert _todo_count(user_id) == 0
+    assert published[-1] == (user_id, {"op": "cleared"})
+
+
+def test_delete_account_revokes_tokens_then_purges(client, signup):
+    user_id, headers = signup("leaving@example.com")
+    client.post("/api/todos", json={"title": "last words"}, headers=headers)
+
+    response = client.delete("/api/auth/me", headers=headers)
+
+    assert response.status_code == 202
+    assert client.get("/api/todos", headers=headers).status_code == 401
+    assert _todo_count(user_id) == 0
+
+
+def test_clear_all_only_clears_your_own_todos(client, signup):
+    user_id, headers = signup("clear-mine@example.com")
+    other_id, other_headers = signup("clear-theirs@example.com")
+    client.post("/api/todos", json={"title": "mine"}, headers=headers)
+    client.post("/api/todos", json={"title": "theirs"}, headers=other_headers)
+
+    assert client.delete("/api/todos").status_code in (401, 403)
+    response = client.delete("/api/todos", headers=headers)
+
+    assert response.status_code == 202
+    assert (_todo_count(user_id), _todo_count(other_id)) == (0, 1)
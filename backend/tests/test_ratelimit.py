@@ -0,0 +1,14 @@
+from api.ratelimit import MemoryBucketBackend
+
+
+def test_memory_buckets_evict_the_least_recently_used():
+    backend = MemoryBucketBackend()
+    backend.max_keys = 2
+    assert backend.take("a", 1, rate=0.001, burst=1)[0]
+    assert backend.take("b", 1, rate=0.001, burst=1)[0]
+    # Touching "a" makes "b" the oldest, so "c" evicts it and "a" stays empty
+    assert not backend.take("a", 1, rate=0.001, burst=1)[0]
+    assert backend.take("c", 1, rate=0.001, burst=1)[0]
+
+    assert list(backend._buckets) == ["a", "c"]
+    assert not backend.take("a", 1, rate=0.001, burst=1)[0]
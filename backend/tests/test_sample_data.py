@@ -0,0 +1,46 @@
+import random
+from datetime import date, datetime
+
+from sqlalchemy import create_engine, func, select
+
+from database import sample_data
+from database.db_models import Base, CategoryDB, TodoDB, UserDB
+
+ANCHOR = datetime(2025, 6, 1)
+
+
+def test_same_seed_generates_the_same_todos():
+    first = list(sample_data.generate_todos(random.Random(7), user_id=1, count=50, first_id=100, anchor=ANCHOR))
+    second = list(sample_data.generate_todos(random.Random(7), user_id=1, count=50, first_id=100, anchor=ANCHOR))
+    other = list(sample_data.generate_todos(random.Random(8), user_id=1, count=50, first_id=100, anchor=ANCHOR))
+
+    assert first == second != other
+    assert [todo["id"] for todo in first] == list(range(100, 150))
+    assert set(first[0]) == set(sample_data.TODO_COLUMNS)
+
+
+def test_generated_todos_follow_the_configured_mix():
+    todos = list(sample_data.generate_todos(random.Random(1), user_id=1, count=5000, first_id=1, anchor=ANCHOR))
+
+    share = lambda predicate: sum(1 for todo in todos if predicate(todo)) / len(todos)
+    assert 0.40 < share(lambda todo: todo["priority"].value == "medium") < 0.50
+    assert 0.75 < share(lambda todo: todo["category"] is not None) < 0.85
+    assert 0.50 < share(lambda todo: todo["due_date"] is not None) < 0.60
+    # Archived todos are always completed ones
+    assert all(todo["completed"] for todo in todos if todo["archived"])
+    assert all(todo["created_at"] <= ANCHOR for todo in todos)
+
+
+def test_bulk_load_writes_users_todos_and_category_counts(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'generated.db'}")
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(sample_data, "engine", engine)
+    monkeypatch.setattr(sample_data, "get_password_hash", lambda password: "hash")
+
+    counts = sample_data.generate_sample_data(20, todos_per_user=5, seed=3, anchor=date(2025, 6, 1), batch_size=7)
+
+    with engine.connect() as connection:
+        assert connection.execute(select(func.count()).select_from(UserDB)).scalar() == counts["users"] == 20
+        assert connection.execute(select(func.count()).select_from(TodoDB)).scalar() == counts["todos"]
+        categorized = select(func.count()).select_from(TodoDB).where(TodoDB.category.isnot(None))
+        assert connection.execute(select(func.sum(CategoryDB.todo_count))).scalar() == connection.execute(categorized).scalar()
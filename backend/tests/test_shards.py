@@ -0,0 +1,42 @@
+from sqlalchemy import select
+
+from database import shards
+from database.db_models import SHARD_ID_SPACING, SessionLocal, TodoDB, UserDB
+
+
+def _todos_on(shard: int, user_id: int) -> list:
+    with SessionLocal(info={"shard": shard}) as db:
+        return db.scalars(select(TodoDB.title).where(TodoDB.user_id == user_id).order_by(TodoDB.id)).all()
+
+
+def _titles(client, headers) -> list:
+    return sorted(todo["title"] for todo in client.get("/api/todos", headers=headers).json())
+
+
+def test_users_are_routed_to_their_shard_and_can_move(client, signup):
+    users = [signup("shard-a@example.com"), signup("shard-b@example.com")]
+    by_shard = {user_id % 2: (user_id, headers) for user_id, headers in users}
+    assert set(by_shard) == {0, 1}
+
+    for shard, (user_id, headers) in by_shard.items():
+        for title in (f"{shard}-first", f"{shard}-second"):
+            todo = client.post("/api/todos", json={"title": title, "category": "work"}, headers=headers).json()
+            assert (todo["id"] >= SHARD_ID_SPACING) == (shard == 1)
+        assert _todos_on(shard, user_id) == [f"{shard}-first", f"{shard}-second"]
+        assert _todos_on(1 - shard, user_id) == []
+
+    moving_id, moving_headers = by_shard[1]
+    assert shards.move_user(moving_id, 0) is True
+    assert shards.move_user(moving_id, 0) is False
+
+    with SessionLocal() as db:
+        user = db.get(UserDB, moving_id)
+        assert (user.shard, user.shard_moving) == (0, None)
+    assert _todos_on(1, moving_id) == []
+    assert _todos_on(0, moving_id) == ["1-first", "1-second"]
+    assert _titles(client, moving_headers) == ["1-first", "1-second"]
+    assert client.get("/api/categories", headers=moving_headers).json() == ["work"]
+
+    client.post("/api/todos", json={"title": "1-after-move"}, headers=moving_headers)
+    assert _todos_on(0, moving_id)[-1] == "1-after-move"
+    assert _titles(client, by_shard[0][1]) == ["0-first", "0-second"]
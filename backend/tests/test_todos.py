@@ -0,0 +1,50 @@
+def test_todo_list_is_newest_first_across_pages(client, signup):
+    _, headers = signup("list@example.com")
+    ids = [client.post("/api/todos", json={"title": f"todo {i}"}, headers=headers).json()["id"] for i in range(5)]
+
+    pages = [
+        [todo["id"] for todo in client.get("/api/todos", params={"offset": offset, "limit": 2}, headers=headers).json()]
+        for offset in (0, 2, 4)
+    ]
+    newest = ids[::-1]
+    assert pages == [newest[0:2], newest[2:4], newest[4:]]
+
+
+def test_search_and_export_only_see_your_own_todos(client, signup):
+    _, mine = signup("own@example.com")
+    _, theirs = signup("other@example.com")
+    kept = client.post("/api/todos", json={"title": "shared word mine"}, headers=mine).json()["id"]
+    client.post("/api/todos", json={"title": "shared word theirs", "archived": True}, headers=theirs)
+
+    for path, params in (("/api/search", {"q": "shared word"}), ("/api/export", {})):
+        assert client.get(path, params=params).status_code == 401
+        response = client.get(path, params={**params, "include_archived": "true", "fields": "title"}, headers=mine)
+        assert [todo["id"] for todo in response.json()] == [kept]
+
+
+def test_statistics_are_per_user_and_refresh_after_a_write(client, signup):
+    _, alice = signup("stats-alice@example.com")
+    _, bob = signup("stats-bob@example.com")
+    client.post("/api/todos", json={"title": "a", "priority": "high", "category": "work"}, headers=alice)
+    client.post("/api/todos", json={"title": "b", "priority": "high"}, headers=bob)
+
+    stats = client.get("/api/statistics", headers=alice).json()
+    assert (stats["total"], stats["completed"], stats["by_priority"]["high"]) == (1, 0, 1)
+    assert stats["by_category"] == {"work": 1}
+    assert client.get("/api/statistics").status_code in (401, 403)
+
+    todo_id = client.get("/api/todos", headers=alice).json()[0]["id"]
+    client.put(f"/api/todos/{todo_id}", json={"completed": True}, headers=alice)
+    stats = client.get("/api/statistics", headers=alice).json()
+    assert (stats["completed"], stats["pending"], stats["completion_rate"]) == (1, 0, 100.0)
+
+
+def test_todos_by_user_lookup_is_newest_first(client, signup):
+    from database.database import todo_db
+    from database.db_models import SessionLocal
+
+    user_id, headers = signup("by-user@example.com")
+    ids = [client.post("/api/todos", json={"title": f"todo {i}"}, headers=headers).json()["id"] for i in range(3)]
+    with SessionLocal() as db:
+        todo_db.use_user_shard(db, user_id)
+        assert [todo.id for todo in todo_db.get_todos_by_user(db, user_id)] == ids[::-1]
@@ -0,0 +1,67 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import text
+
+from database.writer import TodoWriter
+
+
+@pytest.fixture
+def make_writer(tmp_path):
+    """TodoWriters over a scratch SQLite file with an `items` table, stopped afterwards"""
+    path = tmp_path / "writes.db"
+    with sqlite3.connect(path) as connection:
+        connection.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT NOT NULL)")
+    writers = []
+
+    def create(**options):
+        writer = TodoWriter(**options)
+        writer.database_url = f"sqlite:///{path}"
+        writers.append(writer)
+        return writer
+
+    yield create
+    for writer in writers:
+        writer.stop()
+
+
+def _insert(name):
+    def fn(session):
+        return session.execute(text("INSERT INTO items (name) VALUES (:name) RETURNING id"), {"name": name}).scalar()
+    return fn
+
+
+def _names(writer) -> list:
+    with writer._session_factory() as session:
+        return [name for (name,) in session.execute(text("SELECT name FROM items ORDER BY id"))]
+
+
+def test_writes_within_the_linger_window_share_one_commit(make_writer):
+    writer = make_writer(linger=0.2)
+    futures = [writer.submit(_insert(f"todo {n}")) for n in range(10)]
+
+    assert [future.result(5) for future in futures] == list(range(1, 11))
+    assert writer.commits == 1
+    assert _names(writer) == [f"todo {n}" for n in range(10)]
+
+
+def test_a_failing_write_only_rolls_back_its_savepoint(make_writer):
+    writer = make_writer(linger=0.2)
+    first = writer.submit(_insert("kept"))
+    failing = writer.submit(_insert(None))
+    last = writer.submit(_insert("also kept"))
+
+    assert (first.result(5), last.result(5)) == (1, 2)
+    with pytest.raises(Exception, match="NOT NULL"):
+        failing.result(5)
+    assert writer.commits == 1
+    assert _names(writer) == ["kept", "also kept"]
+
+
+def test_batches_are_capped_at_max_batch(make_writer):
+    writer = make_writer(linger=0.2, max_batch=3)
+    futures = [writer.submit(_insert(f"todo {n}")) for n in range(7)]
+
+    for future in futures:
+        future.result(5)
+    assert writer.commits == 3